@@ -4,11 +4,15 @@ Requires all tools to be installed - see requirements.txt
 """
 
 import anthropic
+import concurrent.futures
 import subprocess
 import tempfile
 import os
+import sys
 import json
 import ast
+import threading
+import time
 from typing import Dict, List, Optional
 
 
@@ -18,7 +22,26 @@ class EnhancedVerificationAgent:
     All tools must be installed - this agent does not adapt to missing tools.
     """
 
-    def __init__(self, api_key: str, force_tools: List[str] = None, esbmc_path: str = None, use_finetuned: bool = False):
+    # Wall-clock limit per tool call when a batch of tool calls runs concurrently
+    TOOL_TIMEOUTS = {
+        "run_python_interpreter": 30,
+        "run_mypy": 60,
+        "run_pylint": 60,
+        "run_flake8": 60,
+        "run_bandit": 60,
+        "analyze_ast": 30,
+        "run_deadlock_detector": 60,
+        "convert_python_to_c": 300,
+        "run_esbmc": 600,
+        "run_finetuned_analyzer": 300,
+    }
+    DEFAULT_TOOL_TIMEOUT = 120
+
+    # Tools that write fixed file names in the working directory run one at a time
+    SERIAL_TOOLS = {"convert_python_to_c", "run_esbmc"}
+
+    def __init__(self, api_key: str, force_tools: List[str] = None, esbmc_path: str = None, use_finetuned: bool = False,
+                 use_portfolio: bool = False, use_verdict_cache: bool = True, tool_jobs: int = None):
         self.client = anthropic.Anthropic(api_key=api_key)
         self.model = "claude-sonnet-4-5-20250929"
         self.force_tools = force_tools or []
@@ -26,6 +49,19 @@ class EnhancedVerificationAgent:
         # ESBMC executable path (default to 'esbmc' in PATH)
         self.esbmc_path = esbmc_path or os.environ.get('ESBMC_PATH', 'esbmc')
 
+        # Race several ESBMC strategies instead of the adaptive unwind search
+        self.use_portfolio = use_portfolio
+
+        # Reuse conclusive ESBMC verdicts for unchanged C code and options
+        self.use_verdict_cache = use_verdict_cache
+
+        # Best unwind bounds per code and function, loaded on first use
+        self.bound_memory = None
+
+        # Tool calls from one response run concurrently on up to tool_jobs threads
+        self.tool_jobs = tool_jobs or min(8, os.cpu_count() or 1)
+        self._serial_tool_lock = threading.Lock()
+
         # Fine-tuned analyzer (optional)
         self.finetuned_analyzer = None
         if use_finetuned:
@@ -378,15 +414,9 @@ Begin comprehensive verification. Start with AST analysis."""
             tool_results_content = []
             print(f"\n[{iteration + 1}.3] 🏃 Tool Results:\n")
 
-            for tool_use in tool_uses:
+            # Tools run concurrently; results are reported in the order Claude asked for them
+            for tool_use, result in zip(tool_uses, self._execute_tools(tool_uses)):
                 tool_name = tool_use.name
-                tool_input = tool_use.input
-
-                # Extract code and additional parameters
-                tool_params = dict(tool_input)  # Make a copy
-                code = tool_params.pop("code", "")
-
-                result = self._execute_tool(tool_name, code, **tool_params)
 
                 # Track tool results
                 if tool_name not in all_tool_results:
@@ -493,6 +523,55 @@ Include:
             "verified": self._determine_if_verified(final_verdict_text)
         }
 
+    def _execute_tools(self, tool_uses) -> List[Dict]:
+        """Execute a batch of tool_use blocks concurrently and return the results in order"""
+        calls = []
+        for tool_use in tool_uses:
+            # Extract code and additional parameters
+            tool_params = dict(tool_use.input)  # Make a copy
+            code = tool_params.pop("code", "")
+            calls.append((tool_use.name, code, tool_params))
+
+        if self.tool_jobs <= 1 or len(calls) == 1:
+            return [self._execute_tool(name, code, **params) for name, code, params in calls]
+
+        started = {}
+
+        def run(index, name, code, params):
+            if name in self.SERIAL_TOOLS:
+                with self._serial_tool_lock:
+                    started[index] = time.time()
+                    return self._execute_tool(name, code, **params)
+            started[index] = time.time()
+            return self._execute_tool(name, code, **params)
+
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=min(self.tool_jobs, len(calls)))
+        futures = [pool.submit(run, i, name, code, params) for i, (name, code, params) in enumerate(calls)]
+        results = []
+        try:
+            for i, future in enumerate(futures):
+                name = calls[i][0]
+                limit = self.TOOL_TIMEOUTS.get(name, self.DEFAULT_TOOL_TIMEOUT)
+                while True:
+                    try:
+                        results.append(future.result(timeout=0.5))
+                        break
+                    except concurrent.futures.TimeoutError:
+                        # The limit counts from when the tool started, not from when it was queued
+                        began = started.get(i)
+                        if began is not None and time.time() - began > limit:
+                            results.append({
+                                "tool": name,
+                                "success": False,
+                                "output": f"Tool timed out after {limit}s",
+                                "timeout_occurred": True
+                            })
+                            break
+        finally:
+            # A timed-out tool keeps its thread until its own subprocess timeout fires
+            pool.shutdown(wait=False)
+        return results
+
     def _execute_tool(self, tool_name: str, code: str, **kwargs) -> Dict:
         """Execute verification tool - assumes all tools are installed"""
 
@@ -985,90 +1064,28 @@ Requirements:
                 check_overflow = True
                 print(f"      🔍 Auto-enabled overflow checking (detected arithmetic with nondeterministic inputs)")
 
+        if self.use_portfolio:
+            return self._run_esbmc_portfolio(
+                output_file,
+                timeout=30 if not (check_overflow or check_memory_leak) else 60,
+                check_overflow=check_overflow,
+                check_deadlock=check_deadlock,
+                check_memory_leak=check_memory_leak
+            )
+
         try:
-            # Try with moderate unwind first
-            unwind = 10
             esbmc_timeout = 30 if not (check_overflow or check_memory_leak) else 60
-
-            print(f"      🔍 Starting verification with unwind={unwind}, timeout={esbmc_timeout}s")
             if check_overflow:
                 print(f"      ⚠️  Overflow checking enabled")
 
-            result = self._run_esbmc_attempt(
+            return self._run_esbmc_adaptive(
                 output_file, code,
-                unwind=unwind,
-                timeout=esbmc_timeout,
+                step_timeout=esbmc_timeout,
                 check_overflow=check_overflow,
                 check_deadlock=check_deadlock,
                 check_memory_leak=check_memory_leak
             )
 
-            # Check for unwinding assertion (needs more unwind)
-            if 'unwinding assertion' in result.get('output', ''):
-                print(f"      ⚠️  Unwinding assertion detected - loop needs more iterations")
-                print(f"      🔄 Retrying with unwind=20 (max)...")
-
-                result = self._run_esbmc_attempt(
-                    output_file, code,
-                    unwind=20,
-                    timeout=esbmc_timeout,
-                    check_overflow=check_overflow,
-                    check_deadlock=check_deadlock,
-                    check_memory_leak=check_memory_leak
-                )
-
-                # Still unwinding assertion? Report to Claude
-                if 'unwinding assertion' in result.get('output', ''):
-                    unwinding_guidance = "\n\n" + "="*60 + "\n"
-                    unwinding_guidance += "⚠️  UNWINDING LIMIT REACHED (max=20)\n"
-                    unwinding_guidance += "="*60 + "\n"
-                    unwinding_guidance += "The loop requires more than 20 iterations to fully verify.\n\n"
-                    unwinding_guidance += "💡 Suggestions:\n"
-                    unwinding_guidance += "1. Add explicit loop bounds to the C code\n"
-                    unwinding_guidance += "2. Add __ESBMC_assume() constraints to limit iterations\n"
-                    unwinding_guidance += "3. Simplify the loop logic if possible\n"
-                    unwinding_guidance += "4. Use convert_python_to_c again with bounded loops\n"
-
-                    result['output'] = result.get('output', '') + unwinding_guidance
-                    result['unwinding_limit_reached'] = True
-
-            # Check if it timed out (actual timeout, not verification failure!)
-            if self._esbmc_timed_out(result):
-                print(f"      ⏱️  Timeout detected")
-
-                # Try with smaller unwind and basic checks
-                print(f"      🔄 Retry with unwind=5 and basic checks only...")
-                result = self._run_esbmc_attempt(
-                    output_file, code,
-                    unwind=5,
-                    timeout=30,
-                    check_overflow=False,
-                    check_deadlock=False,
-                    check_memory_leak=False
-                )
-
-                if self._esbmc_timed_out(result):
-                    # Give up and report to Claude
-                    timeout_guidance = "\n\n" + "="*60 + "\n"
-                    timeout_guidance += "⏱️  VERIFICATION TIMEOUT\n"
-                    timeout_guidance += "="*60 + "\n"
-                    timeout_guidance += "The C code is too complex for ESBMC to verify in the time limit.\n\n"
-                    timeout_guidance += "💡 Suggestions:\n"
-                    timeout_guidance += "1. Regenerate simpler C code:\n"
-                    timeout_guidance += "   - Add bounds to nondeterministic values (__ESBMC_assume(n < 1000))\n"
-                    timeout_guidance += "   - Add loop bounds (counter with break statement)\n"
-                    timeout_guidance += "   - Simplify complex expressions\n"
-                    timeout_guidance += "   - Remove unnecessary code paths\n"
-                    timeout_guidance += "2. Use convert_python_to_c again with these constraints\n"
-                    timeout_guidance += "3. Then retry ESBMC with the simpler code\n"
-
-                    result['output'] = result.get('output', '') + timeout_guidance
-                    result['success'] = False
-                    result['timeout_occurred'] = True
-                    return result
-
-            return result
-
         except FileNotFoundError:
             esbmc_location = f"at {self.esbmc_path}" if self.esbmc_path != 'esbmc' else "in PATH"
             return {
@@ -1081,15 +1098,111 @@ Requirements:
                          "This is optional for basic verification."
             }
 
+    def _run_esbmc_adaptive(self, filename: str, code: str, step_timeout: int, check_overflow: bool = False,
+                            check_deadlock: bool = False, check_memory_leak: bool = False,
+                            function: str = "main", max_steps: int = 5) -> Dict:
+        """Adaptive unwind-bound search (see scripts/unwind_bounds.py)
+
+        Each step runs --incremental-bmc up to a bound k within step_timeout. The next k and
+        the per-loop --unwindset bounds are chosen from ESBMC's unwinding report, and the bound
+        that gives a verdict is remembered for this code and function.
+        """
+        unwind_bounds = self._import_script("unwind_bounds")
+        from esbmc_portfolio import parse_verdict, SUCCESS, FAILED
+
+        if self.bound_memory is None:
+            self.bound_memory = unwind_bounds.BoundMemory()
+        remembered = self.bound_memory.get(code, function)
+        bound, unwindset = remembered or (unwind_bounds.DEFAULT_BOUND, {})
+        if remembered:
+            print(f"      🧠 Starting from remembered bound k={bound}")
+
+        tried = set()
+        deadline = time.time() + step_timeout * max_steps
+        timed_out = False
+        for step in range(1, max_steps + 1):
+            budget = max(1, min(step_timeout, int(deadline - time.time())))
+            options = ['--incremental-bmc', '--max-k-step', str(bound)]
+            loops = unwind_bounds.format_unwindset(unwindset)
+            if loops:
+                options += ['--unwindset', loops]
+            print(f"      🔍 Step {step}: k <= {bound}{' loops ' + loops if loops else ''}, budget {budget}s")
+            tried.add((bound, loops))
+
+            result = self._run_esbmc_attempt(
+                filename, code,
+                unwind=None,
+                timeout=budget,
+                check_overflow=check_overflow,
+                check_deadlock=check_deadlock,
+                check_memory_leak=check_memory_leak,
+                extra_options=options
+            )
+            output = result.get('output', '')
+            report = unwind_bounds.parse_report(output)
+            verdict = parse_verdict(output)
+
+            if verdict in (SUCCESS, FAILED) and not report.exhausted:
+                # Incremental BMC may finish below the bound; remember the step it needed
+                best = report.k if 0 < report.k < bound else bound
+                self.bound_memory.put(code, function, best, unwindset, verdict)
+                result['unwind_bound'] = best
+                return result
+
+            timed_out = self._esbmc_timed_out(result) or 0 < report.k < bound
+            if not timed_out and 'VERIFICATION' not in output and not report.loops:
+                # ESBMC stopped before verifying (e.g. a parse error); a new bound will not help
+                return result
+            if time.time() >= deadline:
+                break
+            bound, unwindset = unwind_bounds.next_bound(bound, report, timed_out, unwindset)
+            if (bound, unwind_bounds.format_unwindset(unwindset)) in tried:
+                break
+            print(f"      🔄 {'Out of time' if timed_out else 'Bound too small'}, next k={bound}")
+
+        if timed_out:
+            timeout_guidance = "\n\n" + "="*60 + "\n"
+            timeout_guidance += "⏱️  VERIFICATION TIMEOUT\n"
+            timeout_guidance += "="*60 + "\n"
+            timeout_guidance += "The C code is too complex for ESBMC to verify in the time limit.\n\n"
+            timeout_guidance += "💡 Suggestions:\n"
+            timeout_guidance += "1. Regenerate simpler C code:\n"
+            timeout_guidance += "   - Add bounds to nondeterministic values (__ESBMC_assume(n < 1000))\n"
+            timeout_guidance += "   - Add loop bounds (counter with break statement)\n"
+            timeout_guidance += "   - Simplify complex expressions\n"
+            timeout_guidance += "   - Remove unnecessary code paths\n"
+            timeout_guidance += "2. Use convert_python_to_c again with these constraints\n"
+            timeout_guidance += "3. Then retry ESBMC with the simpler code\n"
+
+            result['output'] = result.get('output', '') + timeout_guidance
+            result['success'] = False
+            result['timeout_occurred'] = True
+        else:
+            unwinding_guidance = "\n\n" + "="*60 + "\n"
+            unwinding_guidance += f"⚠️  UNWINDING LIMIT REACHED (k={bound})\n"
+            unwinding_guidance += "="*60 + "\n"
+            unwinding_guidance += f"The loops need more than {bound} iterations to fully verify.\n\n"
+            unwinding_guidance += "💡 Suggestions:\n"
+            unwinding_guidance += "1. Add explicit loop bounds to the C code\n"
+            unwinding_guidance += "2. Add __ESBMC_assume() constraints to limit iterations\n"
+            unwinding_guidance += "3. Simplify the loop logic if possible\n"
+            unwinding_guidance += "4. Use convert_python_to_c again with bounded loops\n"
+
+            result['output'] = result.get('output', '') + unwinding_guidance
+            result['success'] = False
+            result['unwinding_limit_reached'] = True
+        return result
+
     def _esbmc_timed_out(self, result: Dict) -> bool:
         """Check if ESBMC timed out (NOT verification failure!)"""
         output = result.get('output', '')
         return_code = result.get('return_code', 0)
 
-        # Check for actual timeout indicators
+        # Check for actual timeout indicators; the output ends with the command
+        # line, whose --timeout option must not count
         is_timeout = (
             'Timed out' in output or
-            ('timeout' in output.lower() and 'timeout' not in output.lower().split('--timeout')[0] if '--timeout' in output.lower() else 'timeout' in output.lower()) or
+            'ESBMC timeout - process killed' in output or
             return_code == 124  # Timeout return code
         )
 
@@ -1099,28 +1212,121 @@ Requirements:
         # Timeout is only if we timed out AND didn't get a verification result
         return is_timeout and not is_verification_failure
 
-    def _run_esbmc_attempt(self, filename: str, code: str, unwind: int, timeout: int,
-                          check_overflow: bool = False, check_deadlock: bool = False,
-                          check_memory_leak: bool = False) -> Dict:
-        """Single ESBMC verification attempt with specific parameters"""
-
-        esbmc_cmd = [self.esbmc_path, filename, '--unwind', str(unwind), '--timeout', str(timeout)]
-
+    def _esbmc_check_options(self, check_overflow: bool = False, check_deadlock: bool = False,
+                             check_memory_leak: bool = False):
+        """ESBMC options and the list of enabled checks for the requested properties"""
+        options = []
         enabled_checks = ['bounds-check', 'div-by-zero-check', 'pointer-check']
 
         if check_overflow:
-            esbmc_cmd.extend(['--overflow-check', '--no-bounds-check', '--no-div-by-zero-check'])
+            options.extend(['--overflow-check', '--no-bounds-check', '--no-div-by-zero-check'])
             enabled_checks = ['overflow']  # Focus on overflow when explicitly requested
 
         if check_deadlock:
-            esbmc_cmd.append('--deadlock-check')
+            options.append('--deadlock-check')
             enabled_checks.append('deadlock')
 
         if check_memory_leak:
-            esbmc_cmd.append('--memory-leak-check')
+            options.append('--memory-leak-check')
             enabled_checks.append('memory-leak')
 
+        return options, enabled_checks
+
+    def _run_esbmc_portfolio(self, filename: str, timeout: int, check_overflow: bool = False,
+                             check_deadlock: bool = False, check_memory_leak: bool = False) -> Dict:
+        """Race ESBMC strategies (see scripts/esbmc_portfolio.py) and keep the first verdict"""
+        self._import_script("esbmc_portfolio")
+        from esbmc_portfolio import run_portfolio, DEFAULT_CONFIGS
+
+        options, enabled_checks = self._esbmc_check_options(check_overflow, check_deadlock, check_memory_leak)
+        print(f"      🏁 Portfolio: racing {', '.join(DEFAULT_CONFIGS)} (timeout={timeout}s)")
+
+        result = run_portfolio([self.esbmc_path], [filename] + options, timeout=timeout)
+        for line in result.output.splitlines():
+            print(f"         {line}")
+
+        if result.conclusive:
+            print(f"\n      ✓ {result.config} reached a verdict in {result.elapsed:.1f}s")
+        else:
+            print(f"\n      ⏱️  No configuration reached a verdict")
+
+        output = result.output
+        output += f"\n📝 C file: {os.path.abspath(filename)}"
+        output += f"\n💡 Command: {' '.join(result.command)}"
+        if not result.conclusive:
+            output += "\n\n" + "="*60 + "\n"
+            output += "⏱️  NO CONCLUSIVE VERDICT\n"
+            output += "="*60 + "\n"
+            output += f"None of the ESBMC strategies ({', '.join(DEFAULT_CONFIGS)}) finished in time.\n\n"
+            output += "💡 Suggestions:\n"
+            output += "1. Add bounds to nondeterministic values (__ESBMC_assume(n < 1000))\n"
+            output += "2. Add explicit loop bounds to the C code\n"
+            output += "3. Use convert_python_to_c again with these constraints\n"
+
+        return {
+            "tool": "esbmc",
+            "success": result.verdict == "successful" and result.returncode == 0,
+            "output": output,
+            "return_code": result.returncode,
+            "enabled_checks": enabled_checks,
+            "saved_file": filename,
+            "command": ' '.join(result.command),
+            "strategy": result.config,
+            "timeout_occurred": not result.conclusive
+        }
+
+    def _verdict_cache(self):
+        """The scripts/verdict_cache.py module, or None when the cache is disabled"""
+        if not self.use_verdict_cache:
+            return None
+        verdict_cache = self._import_script("verdict_cache")
+        return verdict_cache if verdict_cache.enabled() else None
+
+    @staticmethod
+    def _import_script(name: str):
+        """Import a helper module from the repository's scripts/ directory"""
+        import importlib
+        scripts_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+        if scripts_dir not in sys.path:
+            sys.path.insert(0, scripts_dir)
+        return importlib.import_module(name)
+
+    def _run_esbmc_attempt(self, filename: str, code: str, unwind: Optional[int], timeout: int,
+                          check_overflow: bool = False, check_deadlock: bool = False,
+                          check_memory_leak: bool = False, extra_options: Optional[List[str]] = None) -> Dict:
+        """Single ESBMC verification attempt with specific parameters"""
+
+        options, enabled_checks = self._esbmc_check_options(check_overflow, check_deadlock, check_memory_leak)
+        esbmc_cmd = [self.esbmc_path, filename]
+        if unwind:
+            esbmc_cmd += ['--unwind', str(unwind)]
+        esbmc_cmd += ['--timeout', str(timeout)] + (extra_options or []) + options
+
         print(f"      🚀 Running: {' '.join(esbmc_cmd)}")
+
+        cache = self._verdict_cache()
+        cache_key = None
+        if cache:
+            cache_key = cache.compute_key(esbmc_cmd[1:], cache.esbmc_version([self.esbmc_path]))
+            entry = cache.get(cache.default_cache_dir(), cache_key)
+            if entry is not None:
+                print(f"      ♻️  Cached verdict ({entry['verdict']}, originally {entry['elapsed']:.1f}s):\n")
+                for line in entry['output'].splitlines():
+                    print(f"         {line}")
+                print()
+                inspection_note = f"\n📝 C file: {os.path.abspath(filename)}"
+                inspection_note += f"\n💡 Command: {' '.join(entry['command'])}"
+                return {
+                    "tool": "esbmc",
+                    "success": entry['returncode'] == 0 and 'VERIFICATION SUCCESSFUL' in entry['output'],
+                    "output": entry['output'] + inspection_note,
+                    "return_code": entry['returncode'],
+                    "enabled_checks": enabled_checks,
+                    "saved_file": filename,
+                    "command": ' '.join(entry['command']),
+                    "cached": True
+                }
+
         print(f"      📡 Streaming output:\n")
 
         try:
@@ -1137,6 +1343,7 @@ Requirements:
 
             output_lines = []
             start_time = time.time()
+            attempt_start = start_time
 
             # Stream output line by line
             try:
@@ -1203,6 +1410,10 @@ Requirements:
 
             print()  # New line after streaming
 
+            if cache_key:
+                cache.put(cache.default_cache_dir(), cache_key, full_output, return_code,
+                          time.time() - attempt_start, esbmc_cmd)
+
             success = return_code == 0 and 'VERIFICATION SUCCESSFUL' in full_output
 
             inspection_note = f"\n📝 C file: {os.path.abspath(filename)}"
@@ -1758,7 +1969,6 @@ if deadlock_detected or lock_events:
 
 
 if __name__ == "__main__":
-    import sys
     import argparse
     from dotenv import load_dotenv
 
@@ -1792,6 +2002,9 @@ Examples:
 
   # Set max iterations
   python enhanced_verification_agent.py mycode.py --max-iterations 15
+
+  # Race ESBMC strategies and keep the first verdict
+  python enhanced_verification_agent.py mycode.py --force-esbmc --portfolio
         """
     )
 
@@ -1800,6 +2013,12 @@ Examples:
                        help='Maximum verification iterations (default: 10)')
     parser.add_argument('--esbmc-path', type=str, default=None,
                        help='Path to ESBMC executable (default: esbmc in PATH, or ESBMC_PATH env var)')
+    parser.add_argument('--portfolio', action='store_true',
+                       help='Race ESBMC strategies (incremental-BMC, k-induction, fixed unwind, Z3) instead of the adaptive unwind search')
+    parser.add_argument('--tool-jobs', type=int, default=None,
+                       help='Run up to N tool calls of one response concurrently (default: CPUs, max 8; 1 runs them in order)')
+    parser.add_argument('--no-verdict-cache', action='store_true',
+                       help='Always run ESBMC instead of reusing cached verdicts (scripts/verdict_cache.py)')
     parser.add_argument('--force-ast', action='store_true',
                        help='Force AST analysis')
     parser.add_argument('--force-mypy', action='store_true',
@@ -1946,7 +2165,10 @@ print("Done")
             api_key=api_key,
             force_tools=force_tools,
             esbmc_path=args.esbmc_path,
-            use_finetuned=args.use_finetuned
+            use_finetuned=args.use_finetuned,
+            use_portfolio=args.portfolio,
+            use_verdict_cache=not args.no_verdict_cache,
+            tool_jobs=args.tool_jobs
         )
         result = agent.verify(code, max_iterations=args.max_iterations)
 
@@ -1993,7 +2215,10 @@ print("Done")
             api_key=api_key,
             force_tools=force_tools,
             esbmc_path=args.esbmc_path,
-            use_finetuned=args.use_finetuned
+            use_finetuned=args.use_finetuned,
+            use_portfolio=args.portfolio,
+            use_verdict_cache=not args.no_verdict_cache,
+            tool_jobs=args.tool_jobs
         )
 
         name, code = test_cases[0]
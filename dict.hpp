@@ -1,48 +1,77 @@
 #ifndef __DICT_HPP
 #define __DICT_HPP
 
-// Helper macros for generating repeated patterns
-#define INIT_USED_4(start) \
-    used[start] = used[start+1] = used[start+2] = used[start+3] = false;
-
-#define CHECK_SLOT_4(start) \
-    if(used[start] && keys[start] == key) return values[start]; \
-    if(used[start+1] && keys[start+1] == key) return values[start+1]; \
-    if(used[start+2] && keys[start+2] == key) return values[start+2]; \
-    if(used[start+3] && keys[start+3] == key) return values[start+3];
-
-#define FIND_EMPTY_4(start) \
-    if(!used[start]) { keys[start] = key; used[start] = true; size_++; return values[start]; } \
-    if(!used[start+1]) { keys[start+1] = key; used[start+1] = true; size_++; return values[start+1]; } \
-    if(!used[start+2]) { keys[start+2] = key; used[start+2] = true; size_++; return values[start+2]; } \
-    if(!used[start+3]) { keys[start+3] = key; used[start+3] = true; size_++; return values[start+3]; }
-
-#define CHECK_SET_4(start) \
-    if(used[start] && keys[start] == key) { values[start] = value; return; } \
-    if(used[start+1] && keys[start+1] == key) { values[start+1] = value; return; } \
-    if(used[start+2] && keys[start+2] == key) { values[start+2] = value; return; } \
-    if(used[start+3] && keys[start+3] == key) { values[start+3] = value; return; }
-
-#define SET_EMPTY_4(start) \
-    if(!used[start]) { keys[start] = key; values[start] = value; used[start] = true; size_++; return; } \
-    if(!used[start+1]) { keys[start+1] = key; values[start+1] = value; used[start+1] = true; size_++; return; } \
-    if(!used[start+2]) { keys[start+2] = key; values[start+2] = value; used[start+2] = true; size_++; return; } \
-    if(!used[start+3]) { keys[start+3] = key; values[start+3] = value; used[start+3] = true; size_++; return; }
-
-#define DEL_SLOT_4(start) \
-    if(used[start] && keys[start] == key) { used[start] = false; size_--; } \
-    if(used[start+1] && keys[start+1] == key) { used[start+1] = false; size_--; } \
-    if(used[start+2] && keys[start+2] == key) { used[start+2] = false; size_--; } \
-    if(used[start+3] && keys[start+3] == key) { used[start+3] = false; size_--; }
-
-#define CONTAINS_SLOT_4(start) \
-    ((used[start] && keys[start] == key) || \
-     (used[start+1] && keys[start+1] == key) || \
-     (used[start+2] && keys[start+2] == key) || \
-     (used[start+3] && keys[start+3] == key))
-
 namespace shedskin {
 
+// Hashing policy used by dict and set. Specialize __ss_hash<K> to make a key
+// type hashable; the generic version hashes everything to the same bucket,
+// which is slow but still correct because lookups fall back to eq().
+template<class K>
+struct __ss_hash {
+    static unsigned int hash(const K& key) { return 0; }
+    static bool eq(const K& a, const K& b) { return a == b; }
+};
+
+#define SS_INTEGRAL_HASH(type) \
+template<> \
+struct __ss_hash<type> { \
+    static unsigned int hash(const type& key) { \
+        unsigned long long k = (unsigned long long)key; \
+        return (unsigned int)(k ^ (k >> 32)) * 2654435761u; \
+    } \
+    static bool eq(const type& a, const type& b) { return a == b; } \
+};
+
+SS_INTEGRAL_HASH(int)
+SS_INTEGRAL_HASH(unsigned int)
+SS_INTEGRAL_HASH(long)
+SS_INTEGRAL_HASH(unsigned long)
+SS_INTEGRAL_HASH(long long)
+SS_INTEGRAL_HASH(unsigned long long)
+SS_INTEGRAL_HASH(char)
+SS_INTEGRAL_HASH(bool)
+
+#undef SS_INTEGRAL_HASH
+
+template<>
+struct __ss_hash<double> {
+    static unsigned int hash(const double& key) {
+        // Equal values must hash equally; out-of-range and NaN share a bucket
+        if (key > -9.0e18 && key < 9.0e18) {
+            return __ss_hash<long long>::hash((long long)key);
+        }
+        return 0;
+    }
+    static bool eq(const double& a, const double& b) { return a == b; }
+};
+
+// Objects compare by identity unless a more specific policy exists
+template<class T>
+struct __ss_hash<T*> {
+    static unsigned int hash(T* const& key) {
+        return __ss_hash<unsigned long long>::hash((unsigned long long)key);
+    }
+    static bool eq(T* const& a, T* const& b) { return a == b; }
+};
+
+// Strings compare by content (FNV-1a over the characters)
+template<>
+struct __ss_hash<str*> {
+    static unsigned int hash(str* const& key) {
+        unsigned int h = 2166136261u;
+        if (!key || !key->data) return h;
+        for (const char* p = key->data; *p; p++) {
+            h = (h ^ (unsigned char)*p) * 16777619u;
+        }
+        return h;
+    }
+    static bool eq(str* const& a, str* const& b) {
+        if (a == b) return true;
+        if (!a || !b || !a->data || !b->data) return false;
+        return strcmp(a->data, b->data) == 0;
+    }
+};
+
 template<class T1, class T2>
 class tuple2 {
 public:
@@ -54,127 +83,280 @@ T1 __getfirst__() const { return first; }
 T2 __getsecond__() const { return second; }
 };
 
+// Entry types stored by __ss_table: dict keeps a value with each key, set
+// keeps the key alone
+template<class K, class V>
+struct __ss_dict_entry {
+    K key;
+    V value;
+};
+
+template<class K>
+struct __ss_set_entry {
+    K key;
+};
+
+// Insertion-ordered hash table shared by dict and set. Entries (of type E,
+// which has a `key` member of type K) are stored densely in insertion order;
+// a separate open-addressing index (linear probing, power-of-two size) maps
+// hashes to entry positions. Deleted entries leave a tombstone in both
+// arrays until the next resize compacts them.
+template<class K, class E>
+class __ss_table {
+public:
+    static const __ss_int EMPTY = -1;
+    static const __ss_int DUMMY = -2;
+    static const __ss_int MIN_CAPACITY = 8;
+
+    E* entries_;
+    unsigned int* hashes_;
+    bool* live_;
+    __ss_int* index_;
+    __ss_int capacity_;   // Size of index_ (power of two)
+    __ss_int used_;       // Entries written so far, including deleted ones
+    __ss_int size_;       // Live entries
+
+    __ss_table() {
+        allocate(MIN_CAPACITY);
+    }
+
+    __ss_table(const __ss_table<K,E>& other) {
+        copy_from(other);
+    }
+
+    __ss_table<K,E>& operator=(const __ss_table<K,E>& other) {
+        if (this != &other) {
+            release();
+            copy_from(other);
+        }
+        return *this;
+    }
+
+    ~__ss_table() {
+        release();
+    }
+
+    // Return the index slot holding key, or -1 if absent
+    __ss_int find_slot(const K& key, unsigned int h) const {
+        __ss_int mask = capacity_ - 1;
+        __ss_int i = (__ss_int)(h & (unsigned int)mask);
+        for (__ss_int probes = 0; probes < capacity_; probes++) {
+            __ss_int e = index_[i];
+            if (e == EMPTY) return -1;
+            if (e != DUMMY && hashes_[e] == h && __ss_hash<K>::eq(entries_[e].key, key)) {
+                return i;
+            }
+            i = (i + 1) & mask;
+        }
+        return -1;
+    }
+
+    // Append an entry for a key known to be absent; returns its entry position
+    __ss_int insert_new(const E& entry, unsigned int h) {
+        if (used_ >= entry_capacity(capacity_)) {
+            E copy = entry;  // entry may alias one that resize() is about to free
+            resize(size_ + 1 > size_ * 2 ? size_ + 1 : size_ * 2);
+            return append_entry(copy, h);
+        }
+        return append_entry(entry, h);
+    }
+
+    // Tombstone the entry at an index slot returned by find_slot
+    void erase_slot(__ss_int slot) {
+        live_[index_[slot]] = false;
+        index_[slot] = DUMMY;
+        size_--;
+    }
+
+    void clear() {
+        for (__ss_int i = 0; i < capacity_; i++) {
+            index_[i] = EMPTY;
+        }
+        used_ = 0;
+        size_ = 0;
+    }
+
+private:
+    // Entry arrays hold up to 2/3 of the index size
+    static __ss_int entry_capacity(__ss_int capacity) {
+        return (capacity * 2) / 3;
+    }
+
+    void allocate(__ss_int capacity) {
+        __ss_int entries = entry_capacity(capacity);
+        capacity_ = capacity;
+        entries_ = new E[entries];
+        hashes_ = new unsigned int[entries];
+        live_ = new bool[entries];
+        index_ = new __ss_int[capacity];
+        for (__ss_int i = 0; i < capacity; i++) {
+            index_[i] = EMPTY;
+        }
+        used_ = 0;
+        size_ = 0;
+    }
+
+    void release() {
+        delete[] entries_;
+        delete[] hashes_;
+        delete[] live_;
+        delete[] index_;
+    }
+
+    // Index slot to use for a key known to be absent
+    __ss_int free_slot(unsigned int h) const {
+        __ss_int mask = capacity_ - 1;
+        __ss_int i = (__ss_int)(h & (unsigned int)mask);
+        while (index_[i] != EMPTY && index_[i] != DUMMY) {
+            i = (i + 1) & mask;
+        }
+        return i;
+    }
+
+    // Write an entry into a table known to have room for it
+    __ss_int append_entry(const E& entry, unsigned int h) {
+        __ss_int e = used_++;
+        entries_[e] = entry;
+        hashes_[e] = h;
+        live_[e] = true;
+        index_[free_slot(h)] = e;
+        size_++;
+        return e;
+    }
+
+    // Rebuild with room for at least `needed` live entries, dropping tombstones
+    void resize(__ss_int needed) {
+        __ss_int capacity = MIN_CAPACITY;
+        while (entry_capacity(capacity) < needed) {
+            capacity *= 2;
+        }
+
+        E* old_entries = entries_;
+        unsigned int* old_hashes = hashes_;
+        bool* old_live = live_;
+        __ss_int* old_index = index_;
+        __ss_int old_used = used_;
+
+        allocate(capacity);
+        for (__ss_int e = 0; e < old_used; e++) {
+            if (old_live[e]) {
+                append_entry(old_entries[e], old_hashes[e]);
+            }
+        }
+
+        delete[] old_entries;
+        delete[] old_hashes;
+        delete[] old_live;
+        delete[] old_index;
+    }
+
+    void copy_from(const __ss_table<K,E>& other) {
+        allocate(other.capacity_);
+        for (__ss_int e = 0; e < other.used_; e++) {
+            if (other.live_[e]) {
+                append_entry(other.entries_[e], other.hashes_[e]);
+            }
+        }
+    }
+};
+
+// Insertion-ordered dictionary on top of __ss_table
 template<class K, class V>
 class dict {
 private:
-    static const __ss_int SIZE = 32;  // Increased size, multiple of 4
-    K keys[SIZE];
-    V values[SIZE];
-    bool used[SIZE];
-    __ss_int size_;
+    typedef __ss_dict_entry<K,V> entry;
+    __ss_table<K, entry> table_;
+
+    const entry& at(__ss_int e) const {
+        return table_.entries_[e];
+    }
 
 public:
 
     template <typename... Args>
-    dict(__ss_int count, Args... args) : size_(0) {
+    dict(__ss_int count, Args... args) {
         tuple2<K, V>* tuples[] = {args...}; // Stores tuples
-        for (__ss_int i = 0; i < count && i < SIZE; i++) {
-            keys[i] = tuples[i]->first;
-            values[i] = tuples[i]->second;
-            used[i] = true;
-            size_++;
+        for (__ss_int i = 0; i < count && i < (__ss_int)sizeof...(args); i++) {
+            if (tuples[i]) {
+                __setitem__(tuples[i]->first, tuples[i]->second);
+            }
         }
     }
 
-    dict() : size_(0) {
-        // Initialize in blocks of 4
-        INIT_USED_4(0)  INIT_USED_4(4)  INIT_USED_4(8)  INIT_USED_4(12)
-        INIT_USED_4(16) INIT_USED_4(20) INIT_USED_4(24) INIT_USED_4(28)
-    }
-    
+    dict() {}
+
     dict(__ss_int count, tuple2<K,V>* p1) : dict() {
-        if(p1) { 
-            keys[0] = p1->first; 
-            values[0] = p1->second;
-            used[0] = true;
-            size_ = 1;
-        }
+        if(p1) __setitem__(p1->first, p1->second);
     }
-    
+
     dict(__ss_int count, tuple2<K,V>* p1, tuple2<K,V>* p2) : dict(count, p1) {
-        if(p2 && size_ < SIZE) {
-            keys[1] = p2->first;
-            values[1] = p2->second;
-            used[1] = true;
-            size_++;
-        }
+        if(p2) __setitem__(p2->first, p2->second);
     }
-    
-    dict(__ss_int count, tuple2<K,V>* p1, tuple2<K,V>* p2, tuple2<K,V>* p3) 
+
+    dict(__ss_int count, tuple2<K,V>* p1, tuple2<K,V>* p2, tuple2<K,V>* p3)
         : dict(count, p1, p2) {
-        if(p3 && size_ < SIZE) {
-            keys[2] = p3->first;
-            values[2] = p3->second;
-            used[2] = true;
-            size_++;
-        }
+        if(p3) __setitem__(p3->first, p3->second);
     }
 
+    // Returns a reference to the value, inserting a default one if missing
     V& __getitem__(const K& key) {
-        // Check existing slots in blocks of 4
-        CHECK_SLOT_4(0)  CHECK_SLOT_4(4)  CHECK_SLOT_4(8)  CHECK_SLOT_4(12)
-        CHECK_SLOT_4(16) CHECK_SLOT_4(20) CHECK_SLOT_4(24) CHECK_SLOT_4(28)
-        
-        // Find empty slots in blocks of 4
-        FIND_EMPTY_4(0)  FIND_EMPTY_4(4)  FIND_EMPTY_4(8)  FIND_EMPTY_4(12)
-        FIND_EMPTY_4(16) FIND_EMPTY_4(20) FIND_EMPTY_4(24) FIND_EMPTY_4(28)
-        
-        return values[0];
+        unsigned int h = __ss_hash<K>::hash(key);
+        __ss_int slot = table_.find_slot(key, h);
+        if (slot >= 0) {
+            return table_.entries_[table_.index_[slot]].value;
+        }
+        entry e = {key, V()};
+        return table_.entries_[table_.insert_new(e, h)].value;
     }
 
     void __setitem__(const K& key, const V& value) {
-        // Check existing slots in blocks of 4
-        CHECK_SET_4(0)  CHECK_SET_4(4)  CHECK_SET_4(8)  CHECK_SET_4(12)
-        CHECK_SET_4(16) CHECK_SET_4(20) CHECK_SET_4(24) CHECK_SET_4(28)
-        
-        // Find empty slots in blocks of 4
-        SET_EMPTY_4(0)  SET_EMPTY_4(4)  SET_EMPTY_4(8)  SET_EMPTY_4(12)
-        SET_EMPTY_4(16) SET_EMPTY_4(20) SET_EMPTY_4(24) SET_EMPTY_4(28)
+        unsigned int h = __ss_hash<K>::hash(key);
+        __ss_int slot = table_.find_slot(key, h);
+        if (slot >= 0) {
+            table_.entries_[table_.index_[slot]].value = value;
+            return;
+        }
+        entry e = {key, value};
+        table_.insert_new(e, h);
     }
 
     void __delitem__(const K& key) {
-        DEL_SLOT_4(0)  DEL_SLOT_4(4)  DEL_SLOT_4(8)  DEL_SLOT_4(12)
-        DEL_SLOT_4(16) DEL_SLOT_4(20) DEL_SLOT_4(24) DEL_SLOT_4(28)
+        __ss_int slot = table_.find_slot(key, __ss_hash<K>::hash(key));
+        if (slot >= 0) {
+            table_.erase_slot(slot);
+        }
     }
 
     bool __contains__(const K& key) const {
-        return CONTAINS_SLOT_4(0) || CONTAINS_SLOT_4(4) || CONTAINS_SLOT_4(8) || 
-               CONTAINS_SLOT_4(12) || CONTAINS_SLOT_4(16) || CONTAINS_SLOT_4(20) || 
-               CONTAINS_SLOT_4(24) || CONTAINS_SLOT_4(28);
+        return table_.find_slot(key, __ss_hash<K>::hash(key)) >= 0;
     }
 
     V pop(const K& key, const V& default_val) {
-        for(__ss_int i = 0; i < SIZE; i++) {
-            if(used[i] && keys[i] == key) {
-                V val = values[i];
-                used[i] = false;
-                size_--;
-                return val;
-            }
+        __ss_int slot = table_.find_slot(key, __ss_hash<K>::hash(key));
+        if (slot < 0) {
+            return default_val;
         }
-        return default_val;
+        V val = at(table_.index_[slot]).value;
+        table_.erase_slot(slot);
+        return val;
     }
 
     __ss_int __len__() const {
-        return size_;
+        return table_.size_;
     }
 
     // Get value or default
     V get(const K& key, const V& default_val) const {
-        for (__ss_int i = 0; i < SIZE; i++) {
-            if (used[i] && keys[i] == key) {
-                return values[i];
-            }
-        }
-        return default_val;
+        __ss_int slot = table_.find_slot(key, __ss_hash<K>::hash(key));
+        return slot >= 0 ? at(table_.index_[slot]).value : default_val;
     }
 
     // Return list of keys
     list<K>* keys_list() const {
         list<K>* out = new list<K>();
-        for (__ss_int i = 0; i < SIZE; i++) {
-            if (used[i]) {
-                out->append(keys[i]);
+        for (__ss_int e = 0; e < table_.used_; e++) {
+            if (table_.live_[e]) {
+                out->append(at(e).key);
             }
         }
         return out;
@@ -183,9 +365,9 @@ public:
     // Return list of values
     list<V>* values_list() const {
         list<V>* out = new list<V>();
-        for (__ss_int i = 0; i < SIZE; i++) {
-            if (used[i]) {
-                out->append(values[i]);
+        for (__ss_int e = 0; e < table_.used_; e++) {
+            if (table_.live_[e]) {
+                out->append(at(e).value);
             }
         }
         return out;
@@ -194,9 +376,9 @@ public:
     // Return list of (key, value) tuples
     list<tuple2<K,V>*>* items_list() const {
         list<tuple2<K,V>*>* out = new list<tuple2<K,V>*>();
-        for (__ss_int i = 0; i < SIZE; i++) {
-            if (used[i]) {
-                tuple2<K,V>* t = new tuple2<K,V>(2, keys[i], values[i]);
+        for (__ss_int e = 0; e < table_.used_; e++) {
+            if (table_.live_[e]) {
+                tuple2<K,V>* t = new tuple2<K,V>(2, at(e).key, at(e).value);
                 out->append(t);
             }
         }
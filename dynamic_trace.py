@@ -14,6 +14,12 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Set, Any
 import platform
 import importlib.util
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from esbmc_container import EsbmcContainer, default_mounts
+import llm_service
+import verdict_cache
 
 # Default configuration
 class Config:
@@ -33,6 +39,76 @@ class Config:
 
 config = Config()
 
+# Lines of program output kept in memory for the LLM prompt; the full output
+# is streamed to config.program_output
+OUTPUT_TAIL_LINES = 200
+_esbmc_container = None
+_esbmc_version = None
+
+def run_esbmc(args: List[str], cwd: str, **kwargs) -> subprocess.CompletedProcess:
+    """Run esbmc with the given arguments, locally or in the persistent worker container."""
+    global _esbmc_container
+    if config.USE_DOCKER:
+        if _esbmc_container is None:
+            _esbmc_container = EsbmcContainer(
+                config.DOCKER_IMAGE,
+                mounts=default_mounts() + [os.getcwd()],
+                container=config.CONTAINER_ID or None,
+            )
+        return _esbmc_container.exec(["esbmc"] + list(args), cwd=cwd, **kwargs)
+    return subprocess.run(["esbmc"] + list(args), cwd=cwd, **kwargs)
+
+def run_esbmc_cached(args: List[str], cwd: str) -> subprocess.CompletedProcess:
+    """Run a verification with run_esbmc, reusing conclusive verdicts (scripts/verdict_cache.py)."""
+    global _esbmc_version
+    if not verdict_cache.enabled():
+        return run_esbmc(args, cwd, capture_output=True, text=True)
+    if _esbmc_version is None:
+        _esbmc_version = run_esbmc(["--version"], cwd, capture_output=True, text=True).stdout.strip()
+    command = ["esbmc"] + list(args)
+    key = verdict_cache.compute_key(command, _esbmc_version, cwd)
+    cache_dir = verdict_cache.default_cache_dir()
+    entry = verdict_cache.get(cache_dir, key)
+    if entry is not None:
+        print(f"♻️ Reusing cached ESBMC verdict ({entry['verdict']}, originally {entry['elapsed']:.1f}s)")
+        return subprocess.CompletedProcess(command, entry["returncode"], entry["output"], "")
+    start = time.time()
+    result = run_esbmc(args, cwd, capture_output=True, text=True)
+    verdict_cache.put(cache_dir, key, (result.stdout or "") + (result.stderr or ""),
+                      result.returncode, time.time() - start, command)
+    return result
+
+_aider_models: Dict[str, Any] = {}
+
+def run_aider_edit(model: str, fnames: List[str], message: str) -> None:
+    """Run one aider edit request, through the resident LLM service when it is running.
+
+    Otherwise aider runs in this process, reusing one model object per model
+    name across calls. Raises RuntimeError if the service reports a failure.
+    """
+    client = llm_service.Client()
+    if client.available():
+        response = client.edit(model, fnames, message)
+        print(response.get("output", ""), end='')
+        if response.get("ok"):
+            return
+        if not response.get("fallback"):
+            raise RuntimeError("LLM service request failed")
+
+    from aider.coders import Coder
+    from aider.models import Model
+    from aider.io import InputOutput
+
+    if model not in _aider_models:
+        _aider_models[model] = Model(model)
+    coder = Coder.create(
+        main_model=_aider_models[model],
+        fnames=fnames,
+        io=InputOutput(yes=True, pretty=True, chat_history_file=None),
+        auto_commits=False
+    )
+    coder.run(message)
+
 def debug_log(message: str) -> None:
     """Log debug messages if DEBUG is enabled."""
     if config.DEBUG:
@@ -143,8 +219,13 @@ def run_program_with_output_capture(python_file: str) -> Tuple[str, List[str]]:
         bufsize=1
     )
     
-    stdout_lines = []
-    stderr_lines = []
+    output_tail = deque(maxlen=OUTPUT_TAIL_LINES)
+    output_log = open(config.program_output, 'w')
+
+    def emit(line: str) -> None:
+        print(line, end='')
+        output_log.write(line)
+        output_tail.append(line)
     
     # Use non-blocking reads to capture both stdout and stderr
     import select
@@ -166,16 +247,14 @@ def run_program_with_output_capture(python_file: str) -> Tuple[str, List[str]]:
                     try:
                         line = process.stdout.readline()
                         if line:
-                            print(f"[OUT] {line}", end='')
-                            stdout_lines.append(f"[OUT] {line}")
+                            emit(f"[OUT] {line}")
                     except IOError:
                         pass
                 elif pipe == process.stderr:
                     try:
                         line = process.stderr.readline()
                         if line:
-                            print(f"[ERR] {line}", end='')
-                            stderr_lines.append(f"[ERR] {line}")
+                            emit(f"[ERR] {line}")
                     except IOError:
                         pass
     except KeyboardInterrupt:
@@ -193,22 +272,15 @@ def run_program_with_output_capture(python_file: str) -> Tuple[str, List[str]]:
         remaining_stdout, remaining_stderr = process.communicate(timeout=1)
         if remaining_stdout:
             for line in remaining_stdout.splitlines(True):
-                print(f"[OUT] {line}", end='')
-                stdout_lines.append(f"[OUT] {line}")
+                emit(f"[OUT] {line}")
         if remaining_stderr:
             for line in remaining_stderr.splitlines(True):
-                print(f"[ERR] {line}", end='')
-                stderr_lines.append(f"[ERR] {line}")
+                emit(f"[ERR] {line}")
     except subprocess.TimeoutExpired:
         process.kill()
         remaining_stdout, remaining_stderr = process.communicate()
-    
-    # Combine all output
-    all_output = stdout_lines + stderr_lines
-    
-    # Save output to file
-    with open(config.program_output, 'w') as f:
-        f.writelines(all_output)
+    finally:
+        output_log.close()
     
     # Extract functions from source
     functions = extract_functions_from_source(python_file)
@@ -218,7 +290,7 @@ def run_program_with_output_capture(python_file: str) -> Tuple[str, List[str]]:
         for func in functions:
             f.write(f"{func}\n")
     
-    return ''.join(all_output), functions
+    return ''.join(output_tail), functions
 
 def validate_translation(original_file: str, converted_file: str, model: str, functions=True, use_analysis=True):
     """
@@ -232,11 +304,6 @@ def validate_translation(original_file: str, converted_file: str, model: str, fu
         bool: True if validation was successful
     """
     
-    # Import Aider API components
-    from aider.coders import Coder
-    from aider.models import Model
-    from aider.io import InputOutput
-    
     # Global variables (these should be defined at module level in actual use)
     VALIDATION_INSTRUCTION_FILE = "prompts/validation_prompt.txt"
     
@@ -291,18 +358,6 @@ def validate_translation(original_file: str, converted_file: str, model: str, fu
             else:
                 validation_instructions = "Fix any compilation errors and ensure all functions are properly translated."
             
-            # Initialize Aider components
-            io = InputOutput()
-            aider_model = Model(model)
-            
-            # Initialize the coder with the model
-            coder = Coder.create(
-                main_model=aider_model,
-                io=io,
-                fnames=[original_file, converted_file],
-                auto_commits=False
-            )
-            
             # Read the combined context file
             with open(combined_file_path, 'r') as f:
                 context = f.read()
@@ -312,10 +367,7 @@ def validate_translation(original_file: str, converted_file: str, model: str, fu
             
             try:
                 # Run the edit request
-                edited = coder.run(message)
-                
-                if not edited:
-                    print("No changes were made by Aider.")
+                run_aider_edit(model, [original_file, converted_file], message)
             except Exception as e:
                 print(f"Warning: Aider API call failed: {e}")
                 # Sleep and retry
@@ -325,17 +377,13 @@ def validate_translation(original_file: str, converted_file: str, model: str, fu
             
             # Check if code compiles
             print("Checking if code compiles...")
-            if config.USE_DOCKER:
-                filename = os.path.basename(converted_file)
-                output_dir = os.path.dirname(converted_file)
-                compile_cmd = ["docker", "run", "--rm", "-v", f"{output_dir}:/workspace", "-w", "/workspace", config.DOCKER_IMAGE, "esbmc", "--parse-tree-only", filename]
-            else:
-                compile_cmd = f"esbmc --parse-tree-only {converted_file}"
+            filename = os.path.basename(converted_file)
+            output_dir = os.path.dirname(os.path.abspath(converted_file))
             
             try:
-                result = subprocess.run(
-                    compile_cmd, 
-                    shell=True, 
+                result = run_esbmc(
+                    ["--parse-tree-only", filename],
+                    cwd=output_dir,
                     stderr=subprocess.DEVNULL, 
                     stdout=subprocess.DEVNULL
                 )
@@ -552,11 +600,7 @@ def analyze_c_code(input_file):
         return ""
 
 def aider_wrapper(python_file: str, c_file: str, program_output: str, functions: List[str], model: str) -> bool:
-    """Run aider to convert Python to C using the Python API."""
-    from aider.coders import Coder
-    from aider.models import Model
-    from aider.io import InputOutput
-    
+    """Run aider to convert Python to C (resident LLM service or in-process API)."""
     print(f"📤 Running aider to convert Python to C using model: {model}")
     
     try:
@@ -568,19 +612,6 @@ def aider_wrapper(python_file: str, c_file: str, program_output: str, functions:
             with open(c_file, 'w') as f:
                 pass
         
-        # Create the aider model
-        aider_model = Model(model)
-        
-        # Create InputOutput with yes=True to auto-confirm changes
-        io = InputOutput(yes=True, pretty=True, chat_history_file=None)
-        
-        # Create the coder object
-        coder = Coder.create(
-            main_model=aider_model,
-            fnames=[temp_python_file, c_file],
-            io=io,
-            auto_commits=False
-        )
         with open(config.SOURCE_INSTRUCTION_FILE, 'r') as file:
             contenu_file_python = file.read()
         
@@ -626,18 +657,13 @@ def aider_wrapper(python_file: str, c_file: str, program_output: str, functions:
         
         print("\n--- Aider Conversion Starting ---")
         # Run the conversion
-        coder.run(prompt)
+        run_aider_edit(model, [temp_python_file, c_file], prompt)
         print("--- Aider Conversion Complete ---\n")
         
         # Check if the C file is valid by trying to compile it
-        if config.USE_DOCKER:
-            filename = os.path.basename(c_file)
-            output_dir = os.path.dirname(c_file)
-            compile_cmd = ["docker", "run", "--rm", "-v", f"{output_dir}:/workspace", "-w", "/workspace", config.DOCKER_IMAGE, "esbmc", "--parse-tree-only", filename]
-        else:
-            compile_cmd = ["esbmc ", "-—parse-tree-only", c_file]
-            
-        compile_result = subprocess.run(compile_cmd, capture_output=True, text=True)
+        filename = os.path.basename(c_file)
+        output_dir = os.path.dirname(os.path.abspath(c_file))
+        compile_result = run_esbmc(["--parse-tree-only", filename], cwd=output_dir, capture_output=True, text=True)
         
         if compile_result.returncode == 0 :
             print(compile_result.stderr)
@@ -677,14 +703,9 @@ def run_esbmc_verification(c_file: str, functions: List[str]) -> Dict[str, bool]
         functions.append("main")
     
     # First, try to compile the C file to check for syntax errors
-    if config.USE_DOCKER:
-        filename = os.path.basename(c_file)
-        output_dir = os.path.dirname(c_file)
-        compile_cmd = ["docker", "run", "--rm", "-v", f"{output_dir}:/workspace", "-w", "/workspace", config.DOCKER_IMAGE,"esbmc", "--parse-tree-only", filename]
-    else:
-        compile_cmd = ["esbmc ", "-—parse-tree-only", c_file]
-        
-    compile_result = subprocess.run(compile_cmd, capture_output=True, text=True)
+    filename = os.path.basename(c_file)
+    output_dir = os.path.dirname(os.path.abspath(c_file))
+    compile_result = run_esbmc(["--parse-tree-only", filename], cwd=output_dir, capture_output=True, text=True)
     
     if compile_result.returncode != 0:
         print("\n⚠️ C file has compilation errors:")
@@ -711,44 +732,20 @@ def run_esbmc_verification(c_file: str, functions: List[str]) -> Dict[str, bool]
         verified_functions.append(func)
         print(f"\n🧪 Verifying function: {func}")
         
-        # Local ESBMC with better flags
-        if config.USE_DOCKER:
-            filename = os.path.basename(c_file)
-            output_dir = os.path.dirname(c_file)
-            cmd = [
-                "docker", 
-                "run", 
-                "--rm", 
-                "-v", 
-                f"{output_dir}:/workspace", 
-                "-w", 
-                "/workspace", 
-                config.DOCKER_IMAGE,
-                "esbmc",
-                "--function", func,     # Use the mapped function name
-                "--no-bounds-check",      # Disable array bounds checks
-                "--no-pointer-check",     # Disable pointer checks
-                "--no-div-by-zero-check", # Disable division by zero checks
-                "--no-align-check",       # Disable memory alignment checks
-                "--no-unwinding-assertions", # Don't fail loops that need more unwinding
-                "--unwind", "10",         # Unwind loops up to 10 times
-                filename
-            ]
-        else:
-            cmd = [
-                "esbmc",
-                "--function", func,     # Use the mapped function name
-                "--no-bounds-check",      # Disable array bounds checks
-                "--no-pointer-check",     # Disable pointer checks
-                "--no-div-by-zero-check", # Disable division by zero checks
-                "--no-align-check",       # Disable memory alignment checks
-                "--no-unwinding-assertions", # Don't fail loops that need more unwinding
-                "--unwind", "10",         # Unwind loops up to 10 times
-                c_file
-            ]
-        
-        print(f"Running: {' '.join(cmd)}")
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        # ESBMC with better flags (locally or in the worker container)
+        args = [
+            "--function", func,     # Use the mapped function name
+            "--no-bounds-check",      # Disable array bounds checks
+            "--no-pointer-check",     # Disable pointer checks
+            "--no-div-by-zero-check", # Disable division by zero checks
+            "--no-align-check",       # Disable memory alignment checks
+            "--no-unwinding-assertions", # Don't fail loops that need more unwinding
+            "--unwind", "10",         # Unwind loops up to 10 times
+            filename
+        ]
+        
+        print(f"Running: esbmc {' '.join(args)}")
+        result = run_esbmc_cached(args, cwd=output_dir)
         
         # Print full output
         print("\n--- ESBMC Output ---")
@@ -773,41 +770,18 @@ def run_esbmc_verification(c_file: str, functions: List[str]) -> Dict[str, bool]
     # If no functions were verified, try to verify the whole program
     if not verified_functions:
         print("\n⚠️ No functions could be verified individually, trying whole program verification")
-        if config.USE_DOCKER:
-            filename = os.path.basename(c_file)
-            output_dir = os.path.dirname(c_file)
-            cmd = [
-                "docker", 
-                "run", 
-                "--rm", 
-                "-v", 
-                f"{output_dir}:/workspace", 
-                "-w", 
-                "/workspace", 
-                config.DOCKER_IMAGE,
-                "esbmc",
-                "--no-bounds-check",
-                "--no-pointer-check",
-                "--no-div-by-zero-check",
-                "--no-align-check",
-                "--no-unwinding-assertions",
-                "--unwind", "10",        # Unwind loops up to 10 times
-                filename
-            ]
-        else:
-            cmd = [
-                "esbmc",
-                "--no-bounds-check",
-                "--no-pointer-check",
-                "--no-div-by-zero-check",
-                "--no-align-check",
-                "--no-unwinding-assertions",
-                "--unwind", "10",
-                c_file
-            ]
-        
-        print(f"Running: {' '.join(cmd)}")
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        args = [
+            "--no-bounds-check",
+            "--no-pointer-check",
+            "--no-div-by-zero-check",
+            "--no-align-check",
+            "--no-unwinding-assertions",
+            "--unwind", "10",        # Unwind loops up to 10 times
+            filename
+        ]
+        
+        print(f"Running: esbmc {' '.join(args)}")
+        result = run_esbmc_cached(args, cwd=output_dir)
         
         print("\n--- ESBMC Output (Whole Program) ---")
         if result.stdout:
@@ -7,17 +7,21 @@ LLM_MODEL="openrouter/anthropic/claude-3.5-sonnet"
 CONTAINER_ID=""
 SOURCE_INSTRUCTION_FILE="prompts/python_prompt.txt"
 ESBMC_CMD="esbmc"
+TRACER_BACKEND="auto"   # auto|monitoring|settrace (see scripts/fast_tracer.py)
+TRACER_SCRIPT="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/scripts/fast_tracer.py"
+TRACE_FORMAT_SCRIPT="$(dirname "$TRACER_SCRIPT")/trace_format.py"
 
 # Set DEBUG for more output
 DEBUG=true
 
 show_usage() {
-    echo "Usage: ./trace.sh [--docker]  [--image IMAGE_NAME | --container CONTAINER_ID] [--model MODEL_NAME] <filename>"
+    echo "Usage: ./trace.sh [--docker]  [--image IMAGE_NAME | --container CONTAINER_ID] [--model MODEL_NAME] [--tracer BACKEND] <filename>"
     echo "Options:"
     echo "  --docker              Run ESBMC in Docker container"
     echo "  --image IMAGE_NAME    Specify Docker image (default: esbmc)"
     echo "  --container ID        Specify existing container ID"
     echo "  --model MODEL_NAME    Specify LLM model (default: openrouter/anthropic/claude-3.5-sonnet)"
+    echo "  --tracer BACKEND      Tracing backend: auto, monitoring (Python 3.12+) or settrace (default: auto)"
     exit 1
 }
 
@@ -52,6 +56,11 @@ while [[ $# -gt 0 ]]; do
             CONTAINER_ID="$2"
             shift 2
             ;;
+        --tracer)
+            [[ "$2" =~ ^(auto|monitoring|settrace)$ ]] || { echo "Error: --tracer requires auto, monitoring or settrace"; show_usage; }
+            TRACER_BACKEND="$2"
+            shift 2
+            ;;
         -h|--help) show_usage ;;
         *) [ -z "$SCRIPT_PYTHON" ] && SCRIPT_PYTHON="$1" || show_usage; shift ;;
     esac
@@ -67,6 +76,7 @@ fi
 TEMP_DIR=$(mktemp -d)
 # Create all temporary files inside the TEMP_DIR
 TRACE_OUTPUT="$TEMP_DIR/trace.out"
+TRACE_BINARY="$TEMP_DIR/trace.bin"
 FUNCTIONS_FILE="$TEMP_DIR/functions.list"
 PROGRAM_OUTPUT="$TEMP_DIR/program.out"
 LLM_INPUT="$TEMP_DIR/llm_input.txt"
@@ -92,6 +102,10 @@ fi
 
 # Function to extract executed functions from trace output
 extract_function_calls() {
+    # Read the binary trace in one pass when the tracer produced one
+    if [ -s "$TRACE_BINARY" ] && python3 "$TRACE_FORMAT_SCRIPT" functions "$TRACE_BINARY" > "$FUNCTIONS_FILE"; then
+        return
+    fi
     # Extract functions from the trace file, filter out system functions
     cat "$TRACE_OUTPUT" | grep -E "call function|funcname:" | 
     sed -E 's/.*call function: ([a-zA-Z0-9_]+).*|.*funcname: ([a-zA-Z0-9_]+).*/\1\2/' | 
@@ -266,108 +280,6 @@ EOF
     echo "Created interception wrapper at $wrapper_script"
 }
 
-# Alternative approach using sys.settrace
-create_trace_hook_script() {
-    local py_script=$(basename "$SCRIPT_PYTHON")
-    local hook_script="$TEMP_DIR/trace_hook.py"
-    
-    cat > "$hook_script" <<EOF
-#!/usr/bin/env python3
-import sys
-import os
-import signal
-import traceback
-import time
-import inspect
-
-# Original script path
-TARGET_SCRIPT = "$py_script"
-
-# Global state
-PAUSED = False
-CALL_COUNT = 0
-MAX_CALLS = 500
-TRACED_FUNCTIONS = set()
-
-# Signal handler for pause/resume
-def handle_pause(signum, frame):
-    global PAUSED
-    PAUSED = not PAUSED
-    print(f"\n{'[PAUSED]' if PAUSED else '[RESUMED]'} at {frame.f_code.co_name}")
-    if PAUSED:
-        print("\n=== Current Stack ===")
-        traceback.print_stack(frame)
-        print("=====================")
-
-# Signal handler for exit
-def handle_exit(signum, frame):
-    print("\n[EXITING] Trace terminated by signal")
-    sys.exit(0)
-
-# Register signal handlers
-signal.signal(signal.SIGUSR1, handle_pause)
-signal.signal(signal.SIGUSR2, handle_exit)
-
-# Print PID for external control
-print(f"Trace process PID: {os.getpid()}")
-print("Send SIGUSR1 (kill -SIGUSR1 PID) to pause/resume")
-print("Send SIGUSR2 (kill -SIGUSR2 PID) to exit")
-
-# Trace function hook
-def trace_calls(frame, event, arg):
-    global PAUSED, CALL_COUNT, TRACED_FUNCTIONS
-    
-    # Wait if paused
-    while PAUSED:
-        time.sleep(0.1)
-    
-    if event == 'call':
-        # Get function info
-        func_name = frame.f_code.co_name
-        filename = frame.f_code.co_filename
-        
-        # Only trace user functions from our script
-        if TARGET_SCRIPT in filename and not func_name.startswith('_') and func_name not in TRACED_FUNCTIONS:
-            if CALL_COUNT < MAX_CALLS:
-                print(f"funcname: {func_name}")
-                TRACED_FUNCTIONS.add(func_name)
-                CALL_COUNT += 1
-                
-                if CALL_COUNT == MAX_CALLS:
-                    print("Trace limit reached (500 functions)")
-    
-    return trace_calls
-
-# Setup trace hook
-sys.settrace(trace_calls)
-
-# Execute the target script
-try:
-    with open(TARGET_SCRIPT) as f:
-        script_content = f.read()
-    
-    # Set up globals for execution
-    script_globals = {
-        '__file__': TARGET_SCRIPT,
-        '__name__': '__main__'
-    }
-    
-    # Execute the script
-    print(f"Starting execution of {TARGET_SCRIPT}")
-    exec(script_content, script_globals)
-    print("Script execution completed")
-    
-except KeyboardInterrupt:
-    print("\nScript execution interrupted")
-except Exception as e:
-    print(f"Error during script execution: {e}")
-    traceback.print_exc()
-EOF
-
-    chmod +x "$hook_script"
-    echo "Created trace hook script at $hook_script"
-}
-
 # Function to directly create C file without using aider
 create_c_file_manually() {
     local py_file="$1"
@@ -579,19 +491,24 @@ run_esbmc_for_function() {
     fi
 }
 
-# Function to run the interactive tracing session using sys.settrace
+# Function to run the interactive tracing session (scripts/fast_tracer.py)
 run_tracing_session() {
     local py_script="$(basename "$SCRIPT_PYTHON")"
+    local pid_file="$TEMP_DIR/trace.pid"
     
     echo "📌 Starting tracing for $SCRIPT_PYTHON..."
     
-    # Create trace hook script for better function tracking
-    create_trace_hook_script
-    
-    # Run the trace script
+    # Run the tracer; $! would be the PID of tee, so the tracer reports its own
     cd "$TEMP_DIR"
-    python3 "trace_hook.py" 2>&1 | tee "$TRACE_OUTPUT" &
+    rm -f "$pid_file" "$TRACE_BINARY"
+    python3 "$TRACER_SCRIPT" --backend "$TRACER_BACKEND" --pid-file "$pid_file" \
+        --output "$TRACE_BINARY" --dump "$TEMP_DIR/trace_events.log" "$py_script" 2>&1 | tee "$TRACE_OUTPUT" &
     TRACE_PID=$!
+    for _ in $(seq 50); do
+        [ -s "$pid_file" ] && break
+        sleep 0.1
+    done
+    [ -s "$pid_file" ] && TRACE_PID=$(cat "$pid_file")
     
     echo "📊 Tracing started with PID: $TRACE_PID"
     echo "- Press Enter to pause and analyze current trace"
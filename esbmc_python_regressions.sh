@@ -1,5 +1,11 @@
 #!/bin/bash
 
+# With --jobs N, run the suite in parallel via scripts/regression_runner.py
+if [ "$1" = "--jobs" ]; then
+    [[ "$2" =~ ^[1-9][0-9]*$ ]] || { echo "Usage: $0 [--jobs N]"; exit 1; }
+    exec python3 "$(dirname "$0")/scripts/regression_runner.py" --suite regressions --jobs "$2"
+fi
+
 declare -a test_cases=($(ls regressions/*.py | while read -r file; do
     filename=$(basename "$file")
     if [[ $filename =~ fail\.py$ ]]; then
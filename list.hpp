@@ -11,15 +11,53 @@ template<class T> class __iter;
 template<typename T>
 class list : public pyobj {
 private:
-    struct Node {
-        T data;
-        Node* next;
-        Node(const T& value) : data(value), next(nullptr) {}
-    };
-    
-    Node* head;
-    Node* tail;  // Tail pointer for O(1) append
+    T* data_;            // Contiguous element storage
     __ss_int size_;
+    __ss_int capacity_;
+
+    static const __ss_int INITIAL_CAPACITY = 8;
+
+    // Grow the storage (doubling) so that at least `needed` elements fit
+    void reserve(__ss_int needed) {
+        if (needed <= capacity_) return;
+        __ss_int new_capacity = capacity_ == 0 ? INITIAL_CAPACITY : capacity_ * 2;
+        while (new_capacity < needed) {
+            new_capacity *= 2;
+        }
+        T* new_data = new T[new_capacity];
+        for (__ss_int i = 0; i < size_; i++) {
+            new_data[i] = data_[i];
+        }
+        delete[] data_;
+        data_ = new_data;
+        capacity_ = new_capacity;
+    }
+
+    // Clamp a (possibly negative) slice bound to [0, size_]
+    __ss_int clamp_bound(__ss_int index) const {
+        if (index < 0) index = size_ + index;
+        if (index < 0) index = 0;
+        if (index > size_) index = size_;
+        return index;
+    }
+
+    // Remove the element at a valid index by shifting the tail left
+    void erase_at(__ss_int index) {
+        for (__ss_int i = index; i < size_ - 1; i++) {
+            data_[i] = data_[i + 1];
+        }
+        size_--;
+    }
+
+    // Append every element of another list (safe when other is *this)
+    void extend_from(const list<T>& other) {
+        __ss_int count = other.size_;
+        reserve(size_ + count);
+        for (__ss_int i = 0; i < count; i++) {
+            data_[size_ + i] = other.data_[i];
+        }
+        size_ += count;
+    }
 
     void append_multiple() {}
 
@@ -31,10 +69,10 @@ private:
 
 public:
     // Default constructor
-    list() : head(nullptr), tail(nullptr), size_(0) {}
+    list() : data_(nullptr), size_(0), capacity_(0) {}
     
     // Single value constructor
-    list(__ss_int count, const T& value) : head(nullptr), tail(nullptr), size_(0) {
+    list(__ss_int count, const T& value) : data_(nullptr), size_(0), capacity_(0) {
         if(count > 0) {
             append(value);
             if(count > 1) append(value);
@@ -42,37 +80,43 @@ public:
     }
     
     // Two value constructor
-    list(__ss_int count, const T& value1, const T& value2) : head(nullptr), tail(nullptr), size_(0) {
+    list(__ss_int count, const T& value1, const T& value2) : data_(nullptr), size_(0), capacity_(0) {
+        reserve(2);
         append(value1);
         if(count > 1) append(value2);
     }
 
     // Three value constructor
-    list(__ss_int count, const T& v1, const T& v2, const T& v3) : head(nullptr), tail(nullptr), size_(0) {
+    list(__ss_int count, const T& v1, const T& v2, const T& v3) : data_(nullptr), size_(0), capacity_(0) {
+        reserve(3);
         append(v1);
         if(count > 1) append(v2);
         if(count > 2) append(v3);
     }
 
     template<typename... Args>
-    list(__ss_int count, Args... args) : head(nullptr), tail(nullptr), size_(0) {
+    list(__ss_int count, Args... args) : data_(nullptr), size_(0), capacity_(0) {
         if (sizeof...(args) != count) {
             throw std::invalid_argument("The number of arguments must correspond to the counter.");
         }
+        reserve(count);
         append_multiple(args...);
     }
 
     // Copy constructor
-    list(list<T>* other) : head(nullptr), tail(nullptr), size_(0) {
+    list(const list<T>& other) : data_(nullptr), size_(0), capacity_(0) {
+        extend_from(other);
+    }
+
+    // Copy constructor from pointer
+    list(list<T>* other) : data_(nullptr), size_(0), capacity_(0) {
         if (other) {
-            for (__ss_int i = 0; i < other->size(); i++) {
-                append(other->__getfast__(i));
-            }
+            extend_from(*other);
         }
     }
 
     // Iterator constructor
-    list(__iter<T>* iter) : head(nullptr), tail(nullptr), size_(0) {
+    list(__iter<T>* iter) : data_(nullptr), size_(0), capacity_(0) {
         if (iter) {
             while (!iter->__stop_iteration) {
                 T item = iter->__get_next();
@@ -85,32 +129,27 @@ public:
     
     // Destructor
     ~list() {
-        clear();
+        delete[] data_;
     }
 
     // Assignment operator
     list<T>& operator=(const list<T>& other) {
         if (this != &other) {
-            clear();
-            Node* current = other.head;
-            while (current) {
-                append(current->data);
-                current = current->next;
-            }
+            size_ = 0;
+            extend_from(other);
         }
         return *this;
     }
 
-    // O(1) append operation using tail pointer
+    // Amortized O(1) append
     void append(const T& value) {
-        Node* newNode = new Node(value);
-        if (!head) {
-            head = tail = newNode;
-        } else {
-            tail->next = newNode;
-            tail = newNode;
+        if (size_ == capacity_) {
+            T copy = value;  // value may alias an element of data_
+            reserve(size_ + 1);
+            data_[size_++] = copy;
+            return;
         }
-        size_++;
+        data_[size_++] = value;
     }
 
     // Get element at index
@@ -118,11 +157,7 @@ public:
         if (index < 0 || index >= size_) {
             return T();
         }
-        Node* current = head;
-        for (__ss_int i = 0; i < index && current; i++) {
-            current = current->next;
-        }
-        return current ? current->data : T();
+        return data_[index];
     }
 
     // Set element at index
@@ -130,23 +165,11 @@ public:
         if (index < 0 || index >= size_) {
             return;
         }
-        Node* current = head;
-        for (__ss_int i = 0; i < index && current; i++) {
-            current = current->next;
-        }
-        if (current) {
-            current->data = value;
-        }
+        data_[index] = value;
     }
     
-    // Clear the list
+    // Clear the list (keeps the allocated capacity)
     void clear() {
-        while (head) {
-            Node* temp = head;
-            head = head->next;
-            delete temp;
-        }
-        tail = nullptr;
         size_ = 0;
     }
     
@@ -174,31 +197,7 @@ public:
             index = size_ + index;
         }
         if (index < 0 || index >= size_) return;
-        
-        Node* current = head;
-        Node* previous = nullptr;
-        
-        for (__ss_int i = 0; i < index && current; i++) {
-            previous = current;
-            current = current->next;
-        }
-        
-        if (!current) return;
-
-        if (previous) {
-            previous->next = current->next;
-            if (current == tail) {
-                tail = previous;
-            }
-        } else {
-            head = current->next;
-            if (head == nullptr) {
-                tail = nullptr;
-            }
-        }
-        
-        delete current;
-        size_--;
+        erase_at(index);
     }
 
     // Insert element at index
@@ -212,78 +211,68 @@ public:
             return;
         }
 
-        Node* newNode = new Node(value);
-        if (index == 0) {
-            newNode->next = head;
-            head = newNode;
-        } else {
-            Node* current = head;
-            for (__ss_int i = 0; i < index - 1; i++) {
-                current = current->next;
-            }
-            newNode->next = current->next;
-            current->next = newNode;
+        T copy = value;
+        reserve(size_ + 1);
+        for (__ss_int i = size_; i > index; i--) {
+            data_[i] = data_[i - 1];
         }
+        data_[index] = copy;
         size_++;
     }
 
     // Check equality with another list
     bool equals(const list<T>* other) const {
         if (!other || size_ != other->size_) return false;
-        Node* n1 = head;
-        Node* n2 = other->head;
-        while (n1 && n2) {
-            if (!(n1->data == n2->data)) return false;
-            n1 = n1->next;
-            n2 = n2->next;
+        for (__ss_int i = 0; i < size_; i++) {
+            if (!(data_[i] == other->data_[i])) return false;
         }
         return true;
     }
 
     // Get first element
     T __getfirst__() const {
-        return head ? head->data : T();
+        return size_ > 0 ? data_[0] : T();
     }
 
     // Get last element
     T __getlast__() const {
-        return tail ? tail->data : T();
+        return size_ > 0 ? data_[size_ - 1] : T();
     }
 
     // Extend list with elements from another list
     void extend(list<T>* other) {
         if (!other) return;
-        Node* current = other->head;
-        while (current) {
-            append(current->data);
-            current = current->next;
-        }
+        extend_from(*other);
     }
 
-    // Iterator support
+    // Iterator support. Iterators hold an index rather than a pointer so they
+    // stay valid when the storage is reallocated; the end iterator compares
+    // against the current size so elements appended during a loop are visited.
     class Iterator {
-        Node* current;
+        list<T>* owner;
+        __ss_int pos;
     public:
-        Iterator(Node* node) : current(node) {}
-        Iterator& operator++() { if(current) current = current->next; return *this; }
-        bool operator!=(const Iterator& other) { return current != other.current; }
-        T& operator*() { return current->data; }
+        Iterator(const list<T>* l = nullptr, __ss_int i = 0) : owner(const_cast<list<T>*>(l)), pos(i) {}
+        Iterator& operator++() { pos++; return *this; }
+        bool operator!=(const Iterator& other) {
+            if (other.pos < 0) return owner && pos < owner->size_;
+            return owner != other.owner || pos != other.pos;
+        }
+        T& operator*() { return owner->data_[pos]; }
     };
 
-    Iterator begin() { return Iterator(head); }
-    Iterator end() { return Iterator(nullptr); }
-    const Iterator begin() const { return Iterator(head); }
-    const Iterator end() const { return Iterator(nullptr); }
+    Iterator begin() { return Iterator(this, 0); }
+    Iterator end() { return Iterator(this, -1); }
+    const Iterator begin() const { return Iterator(this, 0); }
+    const Iterator end() const { return Iterator(this, -1); }
 
 
     // Check if an element is in the list (Python 'in' operator)
     bool __contains__(const T& value) const {
-        Node* current = head;
-        while (current) {
-            if (current->data == value) {
+        for (__ss_int i = 0; i < size_; i++) {
+            if (data_[i] == value) {
                 return true;
             }
-            current = current->next;
         }
         return false;
     }
@@ -292,23 +281,14 @@ public:
     list<T>* __getslice__(__ss_int start, __ss_int end) const {
         list<T>* slice = new list<T>();
         
-        if (start < 0) start = size_ + start;
-        if (end < 0) end = size_ + end;
+        start = clamp_bound(start);
+        end = clamp_bound(end);
         
-        // Ajuster les bornes sans std::min/max
-        if (start < 0) start = 0;
-        if (start > size_) start = size_;
-        if (end < 0) end = 0;
-        if (end > size_) end = size_;
-        
-        Node* current = head;
-        for (__ss_int i = 0; i < start && current; i++) {
-            current = current->next;
-        }
-        
-        for (__ss_int i = start; i < end && current; i++) {
-            slice->append(current->data);
-            current = current->next;
+        if (end > start) {
+            slice->reserve(end - start);
+            for (__ss_int i = start; i < end; i++) {
+                slice->data_[slice->size_++] = data_[i];
+            }
         }
         
         return slice;
@@ -316,38 +296,14 @@ public:
 
     // Support for Python slicing
     list<T>* __slice__(__ss_int length, __ss_int start, __ss_int stop, __ss_int step) const {
-        list<T>* slice = new list<T>();
-        
-        if (start < 0) start = size_ + start;
-        if (stop < 0) stop = size_ + stop;
-        
-        if (start < 0) start = 0;
-        if (start > size_) start = size_;
-        if (stop < 0) stop = 0;
-        if (stop > size_) stop = size_;
-        
-        Node* current = head;
-        for (__ss_int i = 0; i < start && current; i++) {
-            current = current->next;
-        }
-        
-        for (__ss_int i = start; i < stop && current; i++) {
-            slice->append(current->data);
-            current = current->next;
-        }
-        
-        return slice;
+        return __getslice__(start, stop);
     }
 
     // Operator overload for list concatenation
     list<T>* operator+(const list<T>* other) const {
         list<T>* result = new list<T>(*this);
         if (other) {
-            Node* current = other->head;
-            while (current) {
-                result->append(current->data);
-                current = current->next;
-            }
+            result->extend_from(*other);
         }
         return result;
     }
@@ -355,43 +311,25 @@ public:
     // Operator overload for list replication
     list<T>* operator*(__ss_int n) const {
         list<T>* result = new list<T>();
+        if (n > 0) {
+            result->reserve(size_ * n);
+        }
         for (__ss_int i = 0; i < n; i++) {
-            Node* current = head;
-            while (current) {
-                result->append(current->data);
-                current = current->next;
-            }
+            result->extend_from(*this);
         }
         return result;
     }
 
     // Python-style addition
     list<T>* __add__(list<T>* other) const {
-        list<T>* result = new list<T>(*this);
-        if (other) {
-            Node* current = other->head;
-            while (current) {
-                result->append(current->data);
-                current = current->next;
-            }
-        }
-        return result;
+        return *this + other;
     }
 
     // Python-style multiplication
     list<T>* __mul__(__ss_int n) const {
-        list<T>* result = new list<T>();
-        for (__ss_int i = 0; i < n; i++) {
-            Node* current = head;
-            while (current) {
-                result->append(current->data);
-                current = current->next;
-            }
-        }
-        return result;
+        return *this * n;
     }
     
-    // Modify the for_in_loop class inside list class (around line 263):
     class for_in_loop {
         typename list<T>::Iterator it;
         typename list<T>::Iterator end_it;
@@ -428,45 +366,18 @@ public:
             throw std::out_of_range("pop index out of range");
         }
 
-        Node* current = head;
-        Node* previous = nullptr;
-
-        // Find element with given index
-        for (__ss_int i = 0; i < index; i++) {
-            previous = current;
-            current = current->next;
-        }
-
-        T value = current->data;  // Save value before deletion
-
-        // Delete element
-        if (previous) {
-            previous->next = current->next;
-            if (current == tail) {  // Update `tail` if last item deleted
-                tail = previous;
-            }
-        } else {
-            head = current->next;  // Update `head` if first element deleted
-            if (!head) {
-                tail = nullptr;  // Empty list after deletion
-            }
-        }
-
-        delete current;
-        size_--;
-
+        T value = data_[index];  // Save value before deletion
+        erase_at(index);         // O(1) for the default (last) index
         return value;  // Returns the deleted element
     }
 
     // Count occurrences of a value
     __ss_int count(const T& value) const {
         __ss_int cnt = 0;
-        Node* current = head;
-        while (current) {
-            if (current->data == value) {
+        for (__ss_int i = 0; i < size_; i++) {
+            if (data_[i] == value) {
                 cnt++;
             }
-            current = current->next;
         }
         return cnt;
     }
@@ -481,51 +392,21 @@ public:
             throw std::out_of_range("list.index(x): x not in list");
         }
 
-        Node* current = head;
-        for (__ss_int i = 0; i < start && current; i++) {
-            current = current->next;
-        }
-
-        __ss_int idx = start;
-        while (current) {
-            if (current->data == value) {
-                return idx;
+        for (__ss_int i = start; i < size_; i++) {
+            if (data_[i] == value) {
+                return i;
             }
-            current = current->next;
-            idx++;
         }
         throw std::out_of_range("list.index(x): x not in list");
     }
 
     // Remove first occurrence; raises if not found
     void remove(const T& value) {
-        if (!head) {
-            throw std::out_of_range("list.remove(x): x not in list");
-        }
-
-        Node* current = head;
-        Node* previous = nullptr;
-        __ss_int idx = 0;
-        while (current) {
-            if (current->data == value) {
-                if (previous) {
-                    previous->next = current->next;
-                    if (current == tail) {
-                        tail = previous;
-                    }
-                } else {
-                    head = current->next;
-                    if (!head) {
-                        tail = nullptr;
-                    }
-                }
-                delete current;
-                size_--;
+        for (__ss_int i = 0; i < size_; i++) {
+            if (data_[i] == value) {
+                erase_at(i);
                 return;
             }
-            previous = current;
-            current = current->next;
-            idx++;
         }
         throw std::out_of_range("list.remove(x): x not in list");
     }
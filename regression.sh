@@ -4,14 +4,16 @@
 USE_LOCAL_LLM=false
 MODEL_NAME=""
 ESBMC_EXECUTABLE=""
+JOBS=""
 
 # Function to show usage
 show_usage() {
-    echo "Usage: $0 [--local-llm] [--model MODEL_NAME] [--esbmc-exec EXECUTABLE]"
+    echo "Usage: $0 [--local-llm] [--model MODEL_NAME] [--esbmc-exec EXECUTABLE] [--jobs N]"
     echo "Options:"
     echo "  --local-llm       Use local LLM via aider.sh"
     echo "  --model MODEL     Specify model name (for both local and cloud)"
     echo "  --esbmc-exec EXEC Specify custom ESBMC executable path (default: esbmc)"
+    echo "  --jobs N          Run N test cases in parallel via scripts/regression_runner.py"
     echo ""
     echo "Examples:"
     echo "  $0                                    # Use default cloud model and esbmc"
@@ -40,6 +42,11 @@ while [[ $# -gt 0 ]]; do
             ESBMC_EXECUTABLE="$2"
             shift 2
             ;;
+        --jobs)
+            [[ "$2" =~ ^[1-9][0-9]*$ ]] || { echo "Error: --jobs requires a positive integer"; show_usage; }
+            JOBS="$2"
+            shift 2
+            ;;
         -h|--help)
             show_usage
             ;;
@@ -72,6 +79,15 @@ declare -a test_cases=(
     "examples/example_6_lists.py:pass"
 )
 
+# Hand over to the parallel runner, which reads the test_cases array above
+if [ ! -z "$JOBS" ]; then
+    RUNNER_ARGS=(--suite examples --jobs "$JOBS")
+    [ "$USE_LOCAL_LLM" = true ] && RUNNER_ARGS+=(--local-llm)
+    [ ! -z "$MODEL_NAME" ] && RUNNER_ARGS+=(--model "$MODEL_NAME")
+    [ ! -z "$ESBMC_EXECUTABLE" ] && RUNNER_ARGS+=(--esbmc-exec "$ESBMC_EXECUTABLE")
+    exec python3 "$(dirname "$0")/scripts/regression_runner.py" "${RUNNER_ARGS[@]}"
+fi
+
 # Variable to track overall success
 overall_success=0
 
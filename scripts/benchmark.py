@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""End-to-end verification benchmark.
+
+Runs each verification path over the example corpora and records, per file,
+wall time, peak RSS of the largest single process in the run (usually
+ESBMC; not the sum over the process tree), CPU time, ESBMC's VCC count
+and its symex/solver time (from verify.sh's stage spans, see
+stage_metrics.py, or from the ESBMC output):
+
+* ``shedskin``  ``./verify.sh FILE``
+* ``llm``       ``./verify.sh --llm --direct FILE``
+* ``trace``     ``python3 dynamic_trace.py FILE``
+
+The LLM paths only run against a deterministic recorded-response endpoint
+(``--llm-api-base``, an OpenAI-compatible server) unless ``--live-llm`` is
+given, so their timings do not depend on a remote model. Caches are
+disabled unless ``--warm-cache`` is given.
+
+Results can be stored as a baseline and later runs compared against it::
+
+    python3 scripts/benchmark.py --paths shedskin --suites regressions --save-baseline
+    python3 scripts/benchmark.py --paths shedskin --suites regressions --threshold 0.15
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from regression_runner import REPO_ROOT, stage_workdir
+from stage_metrics import parse_esbmc_times, read_spans, summarize
+
+SUITES = {
+    "examples": "examples",
+    "regressions": "regressions",
+    "aws": "aws_examples",
+}
+PATHS = ["shedskin", "llm", "trace"]
+LLM_PATHS = {"llm", "trace"}
+DEFAULT_TIMEOUT = 900
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+DEFAULT_STUB_MODEL = "openai/benchmark-stub"
+
+# Metrics compared against the baseline, with the smallest absolute change
+# that counts, so noise on tiny values is not reported as a regression
+COMPARED = {
+    "wall": 0.5,
+    "peak_rss_mb": 10.0,
+    "solver": 0.1,
+    "vccs": 1,
+}
+
+
+def collect_files(suites: List[str], pattern: Optional[str], limit: Optional[int]) -> List[str]:
+    files = []
+    for suite in suites:
+        directory = os.path.join(REPO_ROOT, SUITES[suite])
+        for name in sorted(os.listdir(directory)):
+            rel = os.path.join(SUITES[suite], name)
+            if name.endswith(".py") and (not pattern or pattern in rel):
+                files.append(rel)
+    return files[:limit] if limit else files
+
+
+def build_command(path: str, rel: str, args) -> List[str]:
+    target = os.path.join(REPO_ROOT, rel)
+    if path == "trace":
+        cmd = [sys.executable, "dynamic_trace.py"]
+        if args.model:
+            cmd += ["--model", args.model]
+        return cmd + [target]
+
+    cmd = ["./verify.sh", target]
+    if path == "llm":
+        cmd += ["--llm", "--direct"]
+        if args.model:
+            cmd += ["--model", args.model]
+        if args.llm_api_base:
+            # The resident service talks to its own endpoint; spawn aider with ours
+            cmd.append("--no-llm-service")
+    if not args.warm_cache:
+        cmd.append("--no-cache")
+    if args.esbmc_exec:
+        cmd += ["--esbmc-exec", args.esbmc_exec]
+    return cmd + args.verify_arg
+
+
+def _rss_mb(rusage) -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(rusage.ru_maxrss / scale, 1)
+
+
+def run_once(path: str, rel: str, args, log_path: str) -> Dict:
+    work_dir = tempfile.mkdtemp(prefix=f"bench-{path}-", dir=args.work_root)
+    tmp_dir = os.path.join(work_dir, "tmp")
+    os.makedirs(tmp_dir)
+    stage_workdir(work_dir)
+    metrics_path = os.path.join(work_dir, "metrics.jsonl")
+
+    env = os.environ.copy()
+    # Keep docker workers on one mount for the whole run, not one per TMPDIR
+    env.setdefault("ESBMC_CONTAINER_TMPDIR", os.path.dirname(work_dir))
+    env["TMPDIR"] = tmp_dir
+    env["TERM"] = env.get("TERM", "dumb")
+    env["VERIFY_METRICS_FILE"] = metrics_path
+    if not args.warm_cache:
+        env["ESBMC_VERDICT_CACHE"] = "0"
+    if args.llm_api_base and path in LLM_PATHS:
+        env["OPENAI_API_BASE"] = args.llm_api_base
+        env.setdefault("OPENAI_API_KEY", "benchmark")
+
+    cmd = build_command(path, rel, args)
+    timed_out = threading.Event()
+    with open(log_path, "w", encoding="utf-8", errors="replace") as log:
+        log.write("$ " + " ".join(cmd) + "\n")
+        log.flush()
+        start = time.monotonic()
+        proc = subprocess.Popen(cmd, cwd=work_dir, env=env, stdin=subprocess.DEVNULL,
+                                stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+
+        def kill():
+            timed_out.set()
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+        timer = threading.Timer(args.timeout, kill)
+        timer.start()
+        try:
+            # wait4's ru_maxrss is the largest peak RSS of any one process among the
+            # child and the descendants it waited for, not their combined memory
+            _, status, rusage = os.wait4(proc.pid, 0)
+        finally:
+            timer.cancel()
+        wall = time.monotonic() - start
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+    esbmc = summarize(read_spans(metrics_path)).get("esbmc")
+    if esbmc is None:
+        with open(log_path, encoding="utf-8", errors="replace") as f:
+            esbmc = parse_esbmc_times(f.read())
+    if not args.keep_workdirs:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if timed_out.is_set():
+        status_name = "timeout"
+    else:
+        status_name = "pass" if proc.returncode == 0 else "fail"
+    return {
+        "status": status_name,
+        "returncode": proc.returncode,
+        "wall": round(wall, 3),
+        "cpu": round(rusage.ru_utime + rusage.ru_stime, 3),
+        "peak_rss_mb": _rss_mb(rusage),
+        "vccs": esbmc.get("vccs"),
+        "symex": _round(esbmc.get("symex")),
+        "solver": _round(esbmc.get("solver")),
+    }
+
+
+def _round(value):
+    return round(value, 3) if isinstance(value, float) else value
+
+
+def _median(values):
+    values = [v for v in values if v is not None]
+    return _round(statistics.median(values)) if values else None
+
+
+def run_benchmark(path: str, rel: str, args, log_dir: str) -> Dict:
+    runs = []
+    for i in range(args.repeat):
+        log_path = os.path.join(log_dir, path, f"{os.path.basename(rel)}.{i}.log")
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        runs.append(run_once(path, rel, args, log_path))
+    result = {"path": path, "file": rel, "runs": len(runs),
+              "status": runs[-1]["status"], "returncode": runs[-1]["returncode"]}
+    for metric in ("wall", "cpu", "peak_rss_mb", "vccs", "symex", "solver"):
+        result[metric] = _median(r[metric] for r in runs)
+    return result
+
+
+def compare(results: List[Dict], baseline: Dict, threshold: float) -> List[str]:
+    """Describe every metric that got worse than the baseline by more than ``threshold``."""
+    previous = {f"{b['path']}:{b['file']}": b for b in baseline.get("results", [])}
+    problems = []
+    for r in results:
+        key = f"{r['path']}:{r['file']}"
+        base = previous.get(key)
+        if not base:
+            continue
+        if base.get("status") != r["status"]:
+            # A different outcome did different work, so its timings are not comparable
+            if base.get("status") == "pass" or r["status"] == "timeout":
+                problems.append(f"{key}: status {base.get('status')} -> {r['status']}")
+            continue
+        for metric, floor in COMPARED.items():
+            old, new = base.get(metric), r.get(metric)
+            if old is None or new is None:
+                continue
+            if new - old > floor and new > old * (1 + threshold):
+                change = f"+{100.0 * (new - old) / old:.0f}%" if old else "new"
+                problems.append(f"{key}: {metric} {old} -> {new} ({change})")
+    return problems
+
+
+def print_table(results: List[Dict], baseline: Dict):
+    previous = {f"{b['path']}:{b['file']}": b for b in baseline.get("results", [])}
+
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "-"
+
+    rule = "+----------+--------------------------------+---------+----------+----------+-------+----------+----------+"
+    print(rule)
+    print("| Path     | File                           | Status  | Wall (s) | Base (s) |  VCCs | Solver s | RSS (MB) |")
+    print(rule)
+    for r in results:
+        base = previous.get(f"{r['path']}:{r['file']}", {})
+        print(f"| {r['path']:<8} | {os.path.basename(r['file'])[:30]:<30} | {r['status']:<7} "
+              f"| {fmt(r['wall'], '8.2f'):>8} | {fmt(base.get('wall'), '8.2f'):>8} "
+              f"| {fmt(r['vccs'], '5d'):>5} | {fmt(r['solver'], '8.2f'):>8} | {fmt(r['peak_rss_mb'], '8.1f'):>8} |")
+    print(rule)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the verification paths over the example corpora")
+    parser.add_argument("--paths", default="shedskin,llm,trace",
+                        help="Comma-separated paths to run: shedskin, llm, trace (default: %(default)s)")
+    parser.add_argument("--suites", default="examples,regressions,aws",
+                        help="Comma-separated corpora: examples, regressions, aws (default: %(default)s)")
+    parser.add_argument("--filter", help="Only files whose path contains this substring")
+    parser.add_argument("--limit", type=int, help="At most this many files")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per file; medians are reported")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="Per-run timeout in seconds (default: %(default)s)")
+    parser.add_argument("--llm-api-base", default=os.environ.get("BENCH_LLM_API_BASE"),
+                        help="OpenAI-compatible recorded-response endpoint for the LLM paths "
+                             "(default: $BENCH_LLM_API_BASE)")
+    parser.add_argument("--live-llm", action="store_true",
+                        help="Run the LLM paths against the configured model without a stub")
+    parser.add_argument("--model", help=f"Model for the LLM paths (default with a stub: {DEFAULT_STUB_MODEL})")
+    parser.add_argument("--esbmc-exec", help="Custom ESBMC executable passed to verify.sh")
+    parser.add_argument("--verify-arg", action="append", default=[],
+                        help="Extra argument appended to every verify.sh invocation")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="Keep the translation and verdict caches enabled")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown reported as a regression (default: %(default)s)")
+    parser.add_argument("--output-dir", default=os.path.join(REPO_ROOT, "benchmark-results"),
+                        help="Directory for logs and the JSON report (default: %(default)s)")
+    parser.add_argument("--work-root", default=None, help="Parent directory for per-run work dirs")
+    parser.add_argument("--keep-workdirs", action="store_true", help="Do not delete per-run work dirs")
+    args = parser.parse_args()
+
+    paths = [p for p in args.paths.split(",") if p]
+    suites = [s for s in args.suites.split(",") if s]
+    for name, known in (("path", paths), ("suite", suites)):
+        unknown = [v for v in known if v not in (PATHS if name == "path" else SUITES)]
+        if unknown:
+            parser.error(f"unknown {name}(s): {', '.join(unknown)}")
+    if args.esbmc_exec and args.esbmc_exec.startswith("./"):
+        args.esbmc_exec = os.path.join(REPO_ROOT, args.esbmc_exec[2:])
+    if args.llm_api_base and not args.model:
+        args.model = DEFAULT_STUB_MODEL
+    if not args.llm_api_base and not args.live_llm:
+        skipped = [p for p in paths if p in LLM_PATHS]
+        if skipped:
+            print(f"Skipping {', '.join(skipped)}: no --llm-api-base stub (use --live-llm to call the model)")
+        paths = [p for p in paths if p not in LLM_PATHS]
+
+    files = collect_files(suites, args.filter, args.limit)
+    if not paths or not files:
+        print("Nothing to benchmark")
+        sys.exit(1)
+
+    output_dir = os.path.abspath(args.output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = []
+    for path in paths:
+        for rel in files:
+            result = run_benchmark(path, rel, args, os.path.join(output_dir, "logs"))
+            results.append(result)
+            print(f"{path} {rel}: {result['status']} {result['wall']:.2f}s "
+                  f"rss {result['peak_rss_mb']}MB vccs {result['vccs']} solver {result['solver']}", flush=True)
+
+    report = {"created": time.time(), "repeat": args.repeat, "warm_cache": args.warm_cache,
+              "llm": "stub" if args.llm_api_base else ("live" if args.live_llm else None),
+              "results": results}
+    report_path = os.path.join(output_dir, "benchmark.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print()
+    print_table(results, baseline)
+    print(f"JSON report: {report_path}")
+
+    problems = compare(results, baseline, args.threshold) if baseline else []
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved: {args.baseline}")
+    if problems:
+        print(f"\n{len(problems)} regression(s) over {args.threshold:.0%} against {args.baseline}:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
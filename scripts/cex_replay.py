@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""Replay an ESBMC counterexample on the original Python program.
+
+The counterexample printed by ESBMC lists one state per assignment. States
+whose source line calls a nondet function (``nondet_int()``,
+``__VERIFIER_nondet_bool()``, ...) or whose left-hand side is a nondet
+return value carry the values ESBMC picked. Those values are fed, in trace
+order, to the Python program through nondet_hooks.py, and the program is
+run once:
+
+* ``confirmed``: Python fails an assertion too, or raises the exception
+  that matches the violated property (e.g. ``ZeroDivisionError`` for a
+  division by zero) at the line ESBMC reported, so the violation is real
+  and not an artifact of the translation
+* ``not-reproduced``: Python consumed exactly the trace's values and
+  finished normally, so the violation most likely comes from the
+  translation or from C semantics (e.g. integer overflow)
+* ``inconclusive``: the value counts differ, an assume() rejected the
+  values, Python raised some other exception (a Python-only API, an I/O
+  error, ...), the run timed out, or the output had no counterexample
+
+Usage::
+
+    python3 scripts/cex_replay.py replay --output esbmc.out program.py
+    python3 scripts/cex_replay.py replay --output esbmc.out --json program.py
+    python3 scripts/cex_replay.py values esbmc.out
+
+``replay`` exits with 0 when confirmed, 1 when not reproduced and 2 otherwise.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STATE_RE = re.compile(r"^State \d+ file (?P<file>\S+) line (?P<line>\d+)")
+ASSIGN_RE = re.compile(r"^\s+(?P<lhs>[^=]+?)\s*=\s*(?P<value>\S.*)$")
+VIOLATED_RE = re.compile(r"^\s+file (?P<file>\S+) line (?P<line>\d+)")
+NONDET_CALL_RE = re.compile(r"\b(?:__VERIFIER_|__ESBMC_)?nondet_\w*\s*\(")
+
+# Python exceptions and the words of the ESBMC property they correspond to
+EXCEPTION_PROPERTIES: Dict[str, Tuple[str, ...]] = {
+    "ZeroDivisionError": ("division by zero",),
+    "IndexError": ("array bounds", "out of bounds"),
+    "OverflowError": ("overflow",),
+}
+
+
+def parse_value(text: str) -> Optional[Any]:
+    """Value of an ESBMC trace assignment, e.g. ``-3 (11111111 ...)`` or ``TRUE``."""
+    token = text.split(" (", 1)[0].strip()
+    if token.upper() in ("TRUE", "FALSE"):
+        return token.upper() == "TRUE"
+    if len(token) == 3 and token[0] == token[2] == "'":
+        return ord(token[1])
+    for convert in (int, float):
+        try:
+            return convert(token)
+        except ValueError:
+            pass
+    return None
+
+
+class _Lines:
+    """Source lines of the files named in the trace, looked up lazily."""
+
+    def __init__(self, source_dir: str):
+        self.source_dir = source_dir
+        self.files: Dict[str, List[str]] = {}
+
+    def get(self, path: str, line: int) -> str:
+        if path not in self.files:
+            self.files[path] = []
+            for candidate in (path, os.path.join(self.source_dir, path),
+                              os.path.join(self.source_dir, os.path.basename(path))):
+                try:
+                    with open(candidate, encoding="utf-8", errors="replace") as f:
+                        self.files[path] = f.read().splitlines()
+                    break
+                except OSError:
+                    continue
+        lines = self.files[path]
+        return lines[line - 1] if 0 < line <= len(lines) else ""
+
+
+def parse_counterexample(output: str, source_dir: str = ".") -> Dict[str, Any]:
+    """Nondet values, in order, and the violated property of an ESBMC run."""
+    lines = _Lines(source_dir)
+    states = []  # (file, line, [(lhs, value text)])
+    violation: Dict[str, Any] = {}
+    in_trace = False
+    in_violation = False
+
+    for raw in output.splitlines():
+        if raw.startswith("[Counterexample]"):
+            in_trace = True
+            continue
+        if not in_trace:
+            continue
+        m = STATE_RE.match(raw)
+        if m:
+            states.append((m.group("file"), int(m.group("line")), []))
+            in_violation = False
+            continue
+        if raw.startswith("Violated property:"):
+            in_violation = True
+            continue
+        if in_violation:
+            m = VIOLATED_RE.match(raw)
+            if m:
+                violation.update(file=m.group("file"), line=int(m.group("line")))
+            elif raw.strip() and "property" not in violation:
+                violation["property"] = raw.strip()
+            continue
+        m = ASSIGN_RE.match(raw)
+        if m and states:
+            states[-1][2].append((m.group("lhs").strip(), m.group("value")))
+
+    # Consecutive states on the same line belong to one statement. Prefer the
+    # assignments to nondet return values; otherwise take one assignment per
+    # nondet call on the line.
+    values: List[Any] = []
+    i = 0
+    while i < len(states):
+        path, line, _ = states[i]
+        group = []
+        while i < len(states) and states[i][:2] == (path, line):
+            group.extend(states[i][2])
+            i += 1
+        picked = [a for a in group if "nondet" in a[0]]
+        if not picked:
+            calls = len(NONDET_CALL_RE.findall(lines.get(path, line)))
+            picked = group[:calls]
+        for _, text in picked:
+            value = parse_value(text)
+            if value is not None:
+                values.append(value)
+
+    return {"found": in_trace, "values": values, "violation": violation}
+
+
+def replay(program: str, values: List[Any], timeout: float) -> Dict[str, Any]:
+    """Run program once with values via nondet_hooks.py in a fresh interpreter."""
+    cmd = [sys.executable, os.path.join(SCRIPT_DIR, "nondet_hooks.py"), "run",
+           "--values", json.dumps(values), program]
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              text=True, timeout=timeout,
+                              cwd=os.path.dirname(os.path.abspath(program)))
+    except subprocess.TimeoutExpired:
+        return {"status": "timeout"}
+    try:
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        return {"status": "error", "message": f"replay exited with {proc.returncode}"}
+
+
+def matches_violation(violation: Dict[str, Any], outcome: Dict[str, Any], program: str) -> bool:
+    """Whether a Python exception is the property ESBMC reported, at the same line."""
+    words = EXCEPTION_PROPERTIES.get(outcome.get("type", ""), ())
+    prop = violation.get("property", "").lower()
+    return (any(w in prop for w in words)
+            and os.path.basename(violation.get("file", "")) == os.path.basename(program)
+            and violation.get("line") == outcome.get("line"))
+
+
+def verdict(cex: Dict[str, Any], outcome: Dict[str, Any], program: str) -> str:
+    if not cex["found"]:
+        return "inconclusive"
+    if outcome.get("status") == "assertion":
+        return "confirmed"
+    if outcome.get("status") == "exception":
+        # Any other error may have nothing to do with what ESBMC found
+        return "confirmed" if matches_violation(cex["violation"], outcome, program) else "inconclusive"
+    if (outcome.get("status") == "ok" and not outcome.get("values_missing")
+            and outcome.get("values_used") == len(cex["values"])):
+        return "not-reproduced"
+    return "inconclusive"
+
+
+def describe(result: Dict[str, Any]) -> str:
+    cex, outcome = result["counterexample"], result["outcome"]
+    lines = [f"Counterexample replay: {result['verdict']}"]
+    if not cex["found"]:
+        lines.append("  no counterexample in the ESBMC output")
+        return "\n".join(lines)
+    prop = cex["violation"]
+    if prop:
+        lines.append(f"  ESBMC: {prop.get('property', 'violation')} at "
+                     f"{prop.get('file', '?')}:{prop.get('line', '?')}")
+    lines.append(f"  nondet values from trace: {cex['values']}")
+    status = outcome.get("status")
+    if status in ("assertion", "exception"):
+        what = "AssertionError" if status == "assertion" else outcome.get("type", "exception")
+        message = f": {outcome['message']}" if outcome.get("message") else ""
+        lines.append(f"  Python: {what}{message} at line {outcome.get('line', '?')}")
+    elif status == "ok":
+        lines.append("  Python: finished normally")
+    elif status == "assume":
+        lines.append(f"  Python: assumption at line {outcome.get('line', '?')} rejected the values")
+    else:
+        lines.append(f"  Python: {status} {outcome.get('message', '')}".rstrip())
+    if "values_used" in outcome and (outcome.get("values_missing")
+                                     or outcome["values_used"] != len(cex["values"])):
+        lines.append(f"  Python made {outcome['nondet_calls']} nondet calls for "
+                     f"{len(cex['values'])} trace values")
+    return "\n".join(lines)
+
+
+def cmd_replay(args) -> int:
+    try:
+        with open(args.output, encoding="utf-8", errors="replace") as f:
+            output = f.read()
+    except OSError as e:
+        print(f"Error: cannot read {args.output}: {e}", file=sys.stderr)
+        return 2
+    if not os.path.isfile(args.program):
+        print(f"Error: {args.program} not found", file=sys.stderr)
+        return 2
+
+    cex = parse_counterexample(output, args.source_dir or os.path.dirname(os.path.abspath(args.output)))
+    outcome = replay(args.program, cex["values"], args.timeout) if cex["found"] else {}
+    result = {"counterexample": cex, "outcome": outcome, "verdict": verdict(cex, outcome, args.program)}
+    print(json.dumps(result, indent=2) if args.json else describe(result))
+    return {"confirmed": 0, "not-reproduced": 1}.get(result["verdict"], 2)
+
+
+def cmd_values(args) -> int:
+    with open(args.output, encoding="utf-8", errors="replace") as f:
+        cex = parse_counterexample(f.read(), args.source_dir or os.path.dirname(os.path.abspath(args.output)))
+    print(json.dumps(cex["values"]))
+    return 0 if cex["found"] else 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay an ESBMC counterexample on the original Python")
+    parser.add_argument("--source-dir", help="Where the traced files are (default: next to the output)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("replay", help="Run the program with the counterexample's nondet values")
+    p.add_argument("--output", required=True, help="ESBMC output file with the counterexample")
+    p.add_argument("--timeout", type=float, default=10, help="Seconds for the Python run (default: %(default)s)")
+    p.add_argument("--json", action="store_true", help="Print the full result as JSON")
+    p.add_argument("program", help="Original Python program")
+    p.set_defaults(func=cmd_replay)
+
+    p = sub.add_parser("values", help="Print the counterexample's nondet values as JSON")
+    p.add_argument("output", help="ESBMC output file")
+    p.set_defaults(func=cmd_values)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Long-lived ESBMC worker containers driven through ``docker exec``.
+
+Starting a fresh ``docker run --rm`` for every parse check and every
+function costs seconds of container start-up. This module keeps a small pool
+of idle containers (``sleep infinity``) per image and mount set, and runs
+ESBMC inside them with ``docker exec``. Host directories are mounted at the
+same path inside the container, so commands can use host paths unchanged.
+
+Python callers use :class:`EsbmcContainer`; shell scripts use the CLI::
+
+    python3 scripts/esbmc_container.py --image esbmc exec -- esbmc --parse-tree-only foo.c
+"""
+
+import argparse
+import hashlib
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import uuid
+from typing import List, Optional, Sequence
+
+LABEL = "esbmc-python-cpp.worker"
+DEFAULT_IMAGE = "esbmc"
+DEFAULT_POOL_SIZE = 1
+
+# docker exec exits with these codes when the container (not the command)
+# is the problem, e.g. it was stopped or removed underneath us.
+DOCKER_ERROR_CODES = (125, 126, 127)
+
+# Set on every command run with docker exec, so that it can be found and
+# killed inside the container: stopping the docker client leaves it running
+EXEC_ID_VAR = "ESBMC_CONTAINER_EXEC_ID"
+KILL_SCRIPT = ('for p in /proc/[0-9]*; do '
+               'grep -qs "$0" "$p/environ" && kill -9 "${p#/proc/}"; done')
+
+
+def _docker(args: Sequence[str], **kwargs) -> subprocess.CompletedProcess:
+    return subprocess.run(["docker"] + list(args), **kwargs)
+
+
+def default_mounts() -> List[str]:
+    """Directories mounted into managed containers unless told otherwise.
+
+    ESBMC_CONTAINER_TMPDIR pins the temp mount for harnesses that give every
+    run its own TMPDIR; otherwise each run would get a new set of containers.
+    """
+    tmp = os.environ.get("ESBMC_CONTAINER_TMPDIR") or tempfile.gettempdir()
+    mounts = [os.path.realpath(tmp)]
+    extra = os.environ.get("ESBMC_CONTAINER_MOUNTS", "")
+    mounts += [os.path.realpath(p) for p in extra.split(os.pathsep) if p]
+    return mounts
+
+
+def _is_under(path: str, root: str) -> bool:
+    path = os.path.realpath(path)
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+class EsbmcContainer:
+    """A pool of persistent containers for one image and mount set.
+
+    If ``container`` is given, commands are sent to that existing container
+    as-is and no lifecycle management is performed.
+    """
+
+    def __init__(self, image: str = DEFAULT_IMAGE, mounts: Optional[Sequence[str]] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE, container: Optional[str] = None):
+        self.image = image
+        mounts = sorted({os.path.realpath(m) for m in (mounts or default_mounts())})
+        # Directories inside another mount add nothing but a new pool name
+        self.mounts = [m for m in mounts if not any(_is_under(m, o) for o in mounts if o != m)]
+        self.pool_size = max(1, pool_size)
+        self.container = container
+        self._container_mounts: Optional[List[str]] = None
+
+    @property
+    def names(self) -> List[str]:
+        digest = hashlib.sha1("\0".join([self.image] + self.mounts).encode()).hexdigest()[:10]
+        return [f"esbmc-worker-{digest}-{i}" for i in range(self.pool_size)]
+
+    def _pick(self) -> str:
+        if self.container:
+            return self.container
+        # Spread concurrent callers over the pool without shared state
+        return self.names[os.getpid() % self.pool_size]
+
+    def is_running(self, name: str) -> bool:
+        result = _docker(["inspect", "-f", "{{.State.Running}}", name],
+                         capture_output=True, text=True)
+        return result.returncode == 0 and result.stdout.strip() == "true"
+
+    def _start(self, name: str) -> None:
+        # Revive a stopped worker before creating a new one
+        if _docker(["start", name], capture_output=True).returncode == 0 and self.is_running(name):
+            return
+        _docker(["rm", "-f", name], capture_output=True)
+        cmd = ["run", "-d", "--name", name, "--label", f"{LABEL}=1",
+               "--entrypoint", "sleep"]
+        for mount in self.mounts:
+            cmd += ["-v", f"{mount}:{mount}"]
+        cmd += [self.image, "infinity"]
+        result = _docker(cmd, capture_output=True, text=True)
+        # A concurrent caller may have won the race to create the same name
+        if result.returncode != 0 and not self.is_running(name):
+            raise RuntimeError(f"Failed to start ESBMC container {name}: {result.stderr.strip()}")
+
+    def ensure_running(self, name: Optional[str] = None) -> str:
+        """Health-check a container and (re)start it if needed; returns its name."""
+        name = name or self._pick()
+        if self.container:
+            if not self.is_running(name):
+                raise RuntimeError(f"Container {name} is not running")
+            return name
+        if not self.is_running(name):
+            self._start(name)
+        return name
+
+    def start(self) -> List[str]:
+        return [self.ensure_running(name) for name in ([self.container] if self.container else self.names)]
+
+    def stop(self) -> None:
+        if self.container:
+            return
+        for name in self.names:
+            _docker(["rm", "-f", name], capture_output=True)
+
+    def container_mounts(self) -> List[str]:
+        """Host directories mounted at the same path in the user's container."""
+        if self._container_mounts is None:
+            result = _docker(["inspect", "-f",
+                              "{{range .Mounts}}{{.Source}}\t{{.Destination}}\n{{end}}",
+                              self.container], capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"Cannot inspect container {self.container}: {result.stderr.strip()}")
+            pairs = [line.split("\t") for line in result.stdout.splitlines() if "\t" in line]
+            self._container_mounts = [src for src, dst in pairs if src == dst]
+        return self._container_mounts
+
+    def covers(self, path: str) -> bool:
+        mounts = self.container_mounts() if self.container else self.mounts
+        return any(_is_under(path, m) for m in mounts)
+
+    def exec(self, args: Sequence[str], cwd: Optional[str] = None, timeout: Optional[float] = None,
+             **kwargs) -> subprocess.CompletedProcess:
+        """Run ``args`` (e.g. ``["esbmc", "file.c"]``) inside a worker container.
+
+        Extra keyword arguments are passed to :func:`subprocess.run`. When
+        ``cwd`` is outside the mounted directories, falls back to a one-off
+        ``docker run --rm`` with ``cwd`` mounted at the same path; an existing
+        ``container`` must already mount it.
+        """
+        cwd = os.path.realpath(cwd or os.getcwd())
+        if not self.covers(cwd):
+            if self.container:
+                raise RuntimeError(f"{cwd} is not mounted at the same path in container {self.container}; "
+                                   f"start it with -v {cwd}:{cwd}")
+            cmd = ["run", "--rm", "-v", f"{cwd}:{cwd}", "-w", cwd, self.image] + list(args)
+            return _docker(cmd, timeout=timeout, **kwargs)
+
+        name = self.ensure_running()
+        result = self._exec_in(name, args, cwd, timeout, **kwargs)
+        if result.returncode in DOCKER_ERROR_CODES and not self.container and not self.is_running(name):
+            # The container died under us: restart it and retry once
+            self._start(name)
+            result = self._exec_in(name, args, cwd, timeout, **kwargs)
+        return result
+
+    def _exec_in(self, name: str, args: Sequence[str], cwd: str, timeout: Optional[float],
+                 **kwargs) -> subprocess.CompletedProcess:
+        exec_id = uuid.uuid4().hex
+        cmd = ["exec", "-e", f"{EXEC_ID_VAR}={exec_id}", "-w", cwd, name] + list(args)
+        try:
+            return _docker(cmd, timeout=timeout, **kwargs)
+        except BaseException:
+            # Timed out or interrupted: the docker client is gone, the command is not
+            _docker(["exec", name, "sh", "-c", KILL_SCRIPT, f"{EXEC_ID_VAR}={exec_id}"],
+                    capture_output=True)
+            raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage persistent ESBMC worker containers")
+    parser.add_argument("--image", default=os.environ.get("ESBMC_DOCKER_IMAGE", DEFAULT_IMAGE),
+                        help="Docker image providing esbmc (default: %(default)s)")
+    parser.add_argument("--container", help="Use this existing container instead of a managed pool")
+    parser.add_argument("--pool", type=int, default=int(os.environ.get("ESBMC_CONTAINER_POOL", DEFAULT_POOL_SIZE)),
+                        help="Number of worker containers (default: %(default)s)")
+    parser.add_argument("--mount", action="append", default=None,
+                        help="Host directory to mount at the same path (default: the temp dir, or $ESBMC_CONTAINER_TMPDIR)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("start", help="Start the worker pool")
+    sub.add_parser("stop", help="Remove the worker pool")
+    sub.add_parser("status", help="Show worker status")
+    exec_p = sub.add_parser("exec", help="Run a command in a worker: exec [--cwd DIR] -- CMD ...")
+    exec_p.add_argument("--cwd", help="Working directory (default: current directory)")
+    exec_p.add_argument("cmd", nargs=argparse.REMAINDER)
+
+    args = parser.parse_args()
+    # Turn SIGTERM into an exception so that exec stops the command in the container
+    signal.signal(signal.SIGTERM, lambda signum, _frame: sys.exit(128 + signum))
+    mounts = args.mount if args.mount else None
+    pool = EsbmcContainer(args.image, mounts=mounts, pool_size=args.pool, container=args.container)
+
+    try:
+        if args.command == "start":
+            for name in pool.start():
+                print(name)
+        elif args.command == "stop":
+            pool.stop()
+        elif args.command == "status":
+            names = [args.container] if args.container else pool.names
+            for name in names:
+                print(f"{name}: {'running' if pool.is_running(name) else 'stopped'}")
+        elif args.command == "exec":
+            cmd = args.cmd[1:] if args.cmd and args.cmd[0] == "--" else args.cmd
+            if not cmd:
+                parser.error("exec requires a command")
+            sys.exit(pool.exec(cmd, cwd=args.cwd).returncode)
+    except (RuntimeError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(125)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""Race several ESBMC strategies on the same program and keep the first verdict.
+
+Some programs are proved quickly by k-induction while others are only
+tractable for incremental BMC, and the right SMT backend varies too. Instead
+of picking one configuration (or retrying serially), the portfolio starts
+every configuration at once, returns the first conclusive answer
+(``VERIFICATION SUCCESSFUL`` or ``VERIFICATION FAILED``) and kills the rest.
+Inconclusive runs (``VERIFICATION UNKNOWN``, errors, unsupported solvers) are
+ignored unless no configuration reaches a verdict. A failure whose only
+violated properties are unwinding assertions is inconclusive too: the bound
+was too small, which another strategy may still overcome.
+
+Strategy and bound options already present in the base arguments
+(``--incremental-bmc``, ``--k-induction``, ``--falsification``, ``--unwind``,
+``--max-k-step``, ``--no-unwinding-assertions``) are dropped so that each
+configuration controls its own strategy and bound, and a fixed-bound
+success is always a proof. Everything else is passed through unchanged::
+
+    python3 scripts/esbmc_portfolio.py --timeout 120 -- file.c --no-bounds-check
+    python3 scripts/esbmc_portfolio.py --configs k-induction,bmc-z3 -- file.c
+"""
+
+import argparse
+import os
+import queue
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+# Name -> ESBMC options selecting the strategy and solver
+CONFIGS: Dict[str, List[str]] = {
+    "incremental-bmc": ["--incremental-bmc"],
+    "k-induction": ["--k-induction"],
+    "unwind": ["--unwind", "20"],
+    "bmc-z3": ["--incremental-bmc", "--z3"],
+    "bmc-bitwuzla": ["--incremental-bmc", "--bitwuzla"],
+    "k-induction-z3": ["--k-induction", "--z3"],
+}
+DEFAULT_CONFIGS = ["incremental-bmc", "k-induction", "unwind", "bmc-z3"]
+
+STRATEGY_OPTIONS = ("--incremental-bmc", "--k-induction", "--falsification",
+                    "--no-unwinding-assertions")
+# Bound options, which take a value
+BOUND_OPTIONS = ("--unwind", "--max-k-step")
+# Seconds a losing run gets to clean up (e.g. stop ESBMC inside a container)
+KILL_GRACE = 5
+
+SUCCESS = "successful"
+FAILED = "failed"
+UNKNOWN = "unknown"
+
+
+def violated_properties(output: str) -> List[str]:
+    """Descriptions of the violated properties reported in ESBMC output."""
+    properties = []
+    lines = output.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith("Violated property:"):
+            # A location line, then the property description
+            block = []
+            for follow in lines[i + 1:]:
+                if not follow.strip():
+                    break
+                block.append(follow.strip())
+            properties.append(" ".join(block[1:]) or " ".join(block))
+    return properties
+
+
+def parse_verdict(output: str) -> str:
+    if "VERIFICATION FAILED" in output:
+        properties = violated_properties(output)
+        if properties and all("unwinding assertion" in p for p in properties):
+            # The bound ran out before the loop did; not a bug in the program
+            return UNKNOWN
+        return FAILED
+    if "VERIFICATION SUCCESSFUL" in output:
+        return SUCCESS
+    return UNKNOWN
+
+
+def strip_strategy(args: Sequence[str]) -> List[str]:
+    """The arguments without strategy and bound options (and their values)."""
+    result = []
+    skip = False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg in BOUND_OPTIONS:
+            skip = True
+        elif arg not in STRATEGY_OPTIONS and not arg.startswith(tuple(o + "=" for o in BOUND_OPTIONS)):
+            result.append(arg)
+    return result
+
+
+class PortfolioResult:
+    """Outcome of one configuration, as returned by :func:`run_portfolio`."""
+
+    def __init__(self, config: str, verdict: str, returncode: int,
+                 output: str, command: List[str], elapsed: float):
+        self.config = config
+        self.verdict = verdict
+        self.returncode = returncode
+        self.output = output
+        self.command = command
+        self.elapsed = elapsed
+
+    @property
+    def conclusive(self) -> bool:
+        return self.verdict in (SUCCESS, FAILED)
+
+
+def _signal(proc: subprocess.Popen, signum: int) -> None:
+    if proc.poll() is None:
+        try:
+            os.killpg(proc.pid, signum)
+        except OSError:
+            pass
+
+
+def _kill(procs: Sequence[subprocess.Popen]) -> None:
+    """Stop runs, letting wrappers such as esbmc_container.py stop ESBMC first."""
+    for proc in procs:
+        _signal(proc, signal.SIGTERM)
+    deadline = time.time() + KILL_GRACE
+    while time.time() < deadline and any(proc.poll() is None for proc in procs):
+        time.sleep(0.05)
+    for proc in procs:
+        _signal(proc, signal.SIGKILL)
+
+
+def run_portfolio(esbmc: Sequence[str], base_args: Sequence[str],
+                  configs: Optional[Sequence[str]] = None, timeout: Optional[float] = None,
+                  cwd: Optional[str] = None) -> PortfolioResult:
+    """Run ``esbmc + base_args + CONFIGS[name]`` for every config concurrently.
+
+    ``esbmc`` is the command prefix used to start ESBMC, e.g. ``["esbmc"]`` or
+    a ``docker exec`` wrapper. Returns the first conclusive result, or the
+    result of the first listed config that reached ESBMC's verdict stage
+    when none is conclusive. With a ``timeout``, each run also gets ESBMC's
+    own ``--timeout``. Losing runs get SIGTERM before SIGKILL, so a
+    container wrapper can stop the ESBMC it started.
+    """
+    names = list(configs or DEFAULT_CONFIGS)
+    unknown = [n for n in names if n not in CONFIGS]
+    if unknown:
+        raise ValueError(f"Unknown portfolio config(s): {', '.join(unknown)}")
+
+    base = strip_strategy(base_args)
+    if timeout:
+        base += ["--timeout", f"{int(timeout)}s"]
+
+    start = time.time()
+    finished: "queue.Queue[PortfolioResult]" = queue.Queue()
+    procs: Dict[str, subprocess.Popen] = {}
+    commands: Dict[str, List[str]] = {}
+
+    def collect(name: str, proc: subprocess.Popen) -> None:
+        output, _ = proc.communicate()
+        finished.put(PortfolioResult(name, parse_verdict(output), proc.returncode, output,
+                                     commands[name], time.time() - start))
+
+    for name in names:
+        commands[name] = list(esbmc) + base + CONFIGS[name]
+        try:
+            proc = subprocess.Popen(commands[name], cwd=cwd, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, text=True, errors="replace",
+                                    start_new_session=True)
+        except OSError as e:
+            finished.put(PortfolioResult(name, UNKNOWN, 127, f"{e}\n", commands[name], 0.0))
+            continue
+        procs[name] = proc
+        threading.Thread(target=collect, args=(name, proc), daemon=True).start()
+
+    results: Dict[str, PortfolioResult] = {}
+    winner = None
+    try:
+        while len(results) < len(names):
+            remaining = None
+            if timeout:
+                # Grace period for ESBMC to honour its own --timeout first
+                remaining = timeout + 10 - (time.time() - start)
+                if remaining <= 0:
+                    break
+            try:
+                result = finished.get(timeout=remaining)
+            except queue.Empty:
+                break
+            results[result.config] = result
+            if result.conclusive:
+                winner = result
+                break
+    finally:
+        _kill(list(procs.values()))
+
+    if winner:
+        return winner
+    # Prefer a run that got as far as a verdict over one that failed to start
+    finished_runs = [results[n] for n in names if n in results]
+    for result in finished_runs:
+        if "VERIFICATION" in result.output:
+            return result
+    if finished_runs:
+        return finished_runs[0]
+    return PortfolioResult(names[0], UNKNOWN, 124, "Portfolio timed out before any configuration finished\n",
+                           commands.get(names[0], []), time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Race ESBMC configurations and report the first conclusive verdict",
+        epilog=f"Configs: {', '.join(CONFIGS)}")
+    parser.add_argument("--esbmc", default=os.environ.get("ESBMC_PORTFOLIO_CMD", "esbmc"),
+                        help="Command used to start ESBMC, split like a shell word list (default: %(default)s)")
+    parser.add_argument("--configs", default=",".join(DEFAULT_CONFIGS),
+                        help="Comma-separated configurations to race (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Wall-clock limit in seconds for the whole portfolio")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="-- ESBMC file and options")
+    args = parser.parse_args()
+
+    esbmc_args = args.args[1:] if args.args and args.args[0] == "--" else args.args
+    if not esbmc_args:
+        parser.error("no ESBMC arguments given")
+    configs = [c.strip() for c in args.configs.split(",") if c.strip()]
+
+    try:
+        result = run_portfolio(shlex.split(args.esbmc), esbmc_args, configs, args.timeout)
+    except ValueError as e:
+        parser.error(str(e))
+
+    sys.stdout.write(result.output)
+    if result.conclusive:
+        print(f"Portfolio: {result.config} won with verdict {result.verdict} "
+              f"in {result.elapsed:.2f}s", file=sys.stderr)
+    else:
+        print(f"Portfolio: no conclusive verdict; reporting {result.config} "
+              f"after {result.elapsed:.2f}s", file=sys.stderr)
+    print(f"Portfolio command: {shlex.join(result.command)}", file=sys.stderr)
+    sys.exit(result.returncode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""Low-overhead function tracer for dynamic_trace.sh.
+
+Runs a Python script and records function entry, return and raise events
+for functions defined in user code (files under the script's directory,
+excluding the interpreter and site-packages). On Python 3.12+ it uses
+PEP 669 ``sys.monitoring``; events in library code are disabled at their
+code location after the first hit, so only user code pays for tracing. Older
+interpreters fall back to ``sys.settrace`` with line events switched off.
+
+Events go into a preallocated ring buffer that keeps the most recent
+``--buffer`` events. With ``--output``, every time the buffer fills it is
+appended to a binary trace (see trace_format.py), so full traces of
+long-running programs are written in chunks without growing memory. The
+first call of each function is also printed as ``funcname: NAME`` for
+interactive use::
+
+    python3 scripts/fast_tracer.py --output trace.bin program.py arg1 arg2
+    python3 scripts/trace_format.py summary trace.bin
+
+SIGUSR1 pauses and resumes the traced program, SIGUSR2 stops it.
+"""
+
+import argparse
+import os
+import runpy
+import signal
+import sys
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional
+
+from trace_format import EVENT_NAMES, RAISE, RETURN, START, TraceWriter
+
+DEFAULT_BUFFER_SIZE = 1 << 16
+MAX_FUNCTIONS = 500
+TOOL_NAME = "esbmc-python-cpp-tracer"
+
+
+class RingBuffer:
+    """Fixed-size event buffer; once full, the oldest events are overwritten.
+
+    With a ``sink``, the events recorded since the last drain are passed to
+    it whenever the buffer has filled up once more, before any is lost.
+    """
+
+    __slots__ = ("size", "codes", "kinds", "count", "sink", "drained", "drain_at")
+
+    def __init__(self, size: int = DEFAULT_BUFFER_SIZE,
+                 sink: Optional[Callable[[list], None]] = None):
+        self.size = size
+        self.codes: List[Optional[object]] = [None] * size
+        self.kinds = bytearray(size)
+        self.count = 0
+        self.sink = sink
+        self.drained = 0
+        self.drain_at = size if sink else -1
+
+    def record(self, code, kind: int) -> None:
+        i = self.count % self.size
+        self.codes[i] = code
+        self.kinds[i] = kind
+        self.count += 1
+        if self.count == self.drain_at:
+            self.drain()
+
+    def events(self, first: Optional[int] = None):
+        """Yield ``(sequence, kind, code)`` for the retained events, oldest first."""
+        first = max(first or 0, self.count - self.size)
+        for seq in range(first, self.count):
+            i = seq % self.size
+            yield seq, self.kinds[i], self.codes[i]
+
+    def drain(self) -> None:
+        if self.sink and self.count > self.drained:
+            self.sink(list(self.events(self.drained)))
+        self.drained = self.count
+        self.drain_at = self.count + self.size if self.sink else -1
+
+
+def make_user_filter(root: str) -> Callable[[str], bool]:
+    """Return a cached predicate telling whether a filename is user code under ``root``."""
+    root = os.path.realpath(root).rstrip(os.sep) + os.sep
+    excluded = {os.path.realpath(p).rstrip(os.sep) + os.sep
+                for p in (sys.prefix, sys.exec_prefix, sys.base_prefix, sys.base_exec_prefix)}
+    this_file = os.path.realpath(__file__)
+    cache: Dict[str, bool] = {}
+
+    def is_user(filename: str) -> bool:
+        result = cache.get(filename)
+        if result is None:
+            path = os.path.realpath(filename)
+            result = (not filename.startswith("<")
+                      and path.startswith(root)
+                      and path != this_file
+                      and "site-packages" not in path
+                      and not any(path.startswith(p) for p in excluded))
+            cache[filename] = result
+        return result
+
+    return is_user
+
+
+class FunctionLog:
+    """Prints ``funcname: NAME`` the first time each user function runs."""
+
+    def __init__(self, limit: int = MAX_FUNCTIONS):
+        self.limit = limit
+        self.seen_codes = set()
+        self.names = set()
+
+    def first_call(self, code) -> None:
+        self.seen_codes.add(code)
+        name = code.co_name
+        if name.startswith("_") or name.startswith("<") or name in self.names:
+            return
+        if len(self.names) < self.limit:
+            self.names.add(name)
+            print(f"funcname: {name}", flush=True)
+            if len(self.names) == self.limit:
+                print(f"Trace limit reached ({self.limit} functions)", flush=True)
+
+
+def install_monitoring(ring: RingBuffer, is_user: Callable[[str], bool], log: FunctionLog) -> Callable[[], None]:
+    mon = sys.monitoring
+    tool = mon.PROFILER_ID
+    mon.use_tool_id(tool, TOOL_NAME)
+    DISABLE = mon.DISABLE
+    seen = log.seen_codes
+    record = ring.record
+
+    def on_start(code, offset):
+        if not is_user(code.co_filename):
+            return DISABLE
+        if code not in seen:
+            log.first_call(code)
+        record(code, START)
+
+    def on_return(code, offset, retval):
+        if not is_user(code.co_filename):
+            return DISABLE
+        record(code, RETURN)
+
+    def on_raise(code, offset, exc):
+        # RAISE cannot be disabled per location, so filter on every event
+        if is_user(code.co_filename):
+            record(code, RAISE)
+
+    E = mon.events
+    mon.register_callback(tool, E.PY_START, on_start)
+    mon.register_callback(tool, E.PY_RETURN, on_return)
+    mon.register_callback(tool, E.RAISE, on_raise)
+    mon.set_events(tool, E.PY_START | E.PY_RETURN | E.RAISE)
+
+    def uninstall():
+        mon.set_events(tool, E.NO_EVENTS)
+        mon.free_tool_id(tool)
+
+    return uninstall
+
+
+def install_settrace(ring: RingBuffer, is_user: Callable[[str], bool], log: FunctionLog) -> Callable[[], None]:
+    seen = log.seen_codes
+    record = ring.record
+
+    def local_trace(frame, event, arg):
+        if event == "return":
+            record(frame.f_code, RETURN)
+        elif event == "exception":
+            record(frame.f_code, RAISE)
+        return local_trace
+
+    def global_trace(frame, event, arg):
+        code = frame.f_code
+        if not is_user(code.co_filename):
+            return None
+        if code not in seen:
+            log.first_call(code)
+        record(code, START)
+        frame.f_trace_lines = False
+        return local_trace
+
+    threading.settrace(global_trace)
+    sys.settrace(global_trace)
+
+    def uninstall():
+        sys.settrace(None)
+        threading.settrace(None)
+
+    return uninstall
+
+
+def install(backend: str, ring: RingBuffer, is_user: Callable[[str], bool], log: FunctionLog):
+    """Install the requested backend; returns ``(backend_name, uninstall)``."""
+    if backend == "auto":
+        backend = "monitoring" if hasattr(sys, "monitoring") else "settrace"
+    if backend == "monitoring":
+        if not hasattr(sys, "monitoring"):
+            raise RuntimeError("sys.monitoring requires Python 3.12 or newer")
+        return backend, install_monitoring(ring, is_user, log)
+    return backend, install_settrace(ring, is_user, log)
+
+
+def trace_sink(writer: TraceWriter) -> Callable[[list], None]:
+    """Ring buffer sink appending events to a binary trace."""
+    code_event = writer.code_event
+
+    def sink(events):
+        for _, kind, code in events:
+            code_event(code, kind)
+
+    return sink
+
+
+def dump_events(ring: RingBuffer, path: str) -> None:
+    with open(path, "w") as f:
+        for seq, kind, code in ring.events():
+            f.write(f"{seq} {EVENT_NAMES[kind]} {code.co_qualname if hasattr(code, 'co_qualname') else code.co_name} "
+                    f"{code.co_filename}:{code.co_firstlineno}\n")
+
+
+def install_signal_handlers(on_pause: Optional[Callable[[], None]] = None) -> None:
+    paused = [False]
+
+    def handle_pause(signum, frame):
+        # The handler blocks the main thread while paused; the next SIGUSR1
+        # runs a nested handler that clears the flag and lets this one return
+        paused[0] = not paused[0]
+        print(f"\n{'[PAUSED]' if paused[0] else '[RESUMED]'} at {frame.f_code.co_name if frame else '?'}", flush=True)
+        if not paused[0]:
+            return
+        if on_pause:
+            # Make everything recorded so far visible to readers of the trace
+            on_pause()
+        print("\n=== Current Stack ===")
+        traceback.print_stack(frame)
+        print("=====================", flush=True)
+        while paused[0]:
+            time.sleep(0.1)
+
+    def handle_exit(signum, frame):
+        print("\n[EXITING] Trace terminated by signal", flush=True)
+        sys.exit(0)
+
+    signal.signal(signal.SIGUSR1, handle_pause)
+    signal.signal(signal.SIGUSR2, handle_exit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trace user-code function calls of a Python script")
+    parser.add_argument("--backend", choices=["auto", "monitoring", "settrace"], default="auto",
+                        help="Tracing backend (default: sys.monitoring when available)")
+    parser.add_argument("--buffer", type=int, default=DEFAULT_BUFFER_SIZE,
+                        help="Number of most recent events kept (default: %(default)s)")
+    parser.add_argument("--dump", help="Write the retained events to this file on exit")
+    parser.add_argument("--output", help="Stream all events to this binary trace file")
+    parser.add_argument("--pid-file", help="Write the tracer PID to this file")
+    parser.add_argument("--root", help="Directory whose files count as user code (default: the script's directory)")
+    parser.add_argument("script", help="Python script to run")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments for the script")
+    args = parser.parse_args()
+
+    script = os.path.abspath(args.script)
+    if args.pid_file:
+        with open(args.pid_file, "w") as f:
+            f.write(f"{os.getpid()}\n")
+    print(f"Trace process PID: {os.getpid()}")
+    print("Send SIGUSR1 (kill -SIGUSR1 PID) to pause/resume")
+    print("Send SIGUSR2 (kill -SIGUSR2 PID) to exit")
+
+    writer = TraceWriter(args.output) if args.output else None
+    ring = RingBuffer(max(1, args.buffer), sink=trace_sink(writer) if writer else None)
+
+    def flush_trace():
+        ring.drain()
+        writer.flush()
+
+    install_signal_handlers(flush_trace if writer else None)
+    log = FunctionLog()
+    is_user = make_user_filter(args.root or os.path.dirname(script))
+
+    sys.argv = [script] + args.args
+    sys.path[0] = os.path.dirname(script)
+
+    backend, uninstall = install(args.backend, ring, is_user, log)
+    print(f"Starting execution of {args.script} (tracer: {backend})", flush=True)
+    try:
+        runpy.run_path(script, run_name="__main__")
+        print("Script execution completed")
+    except KeyboardInterrupt:
+        print("\nScript execution interrupted")
+    except SystemExit:
+        pass
+    except Exception as e:
+        print(f"Error during script execution: {e}")
+        traceback.print_exc()
+    finally:
+        uninstall()
+        if writer:
+            ring.drain()
+            writer.close()
+        kept = min(ring.count, ring.size)
+        print(f"Trace events: {ring.count} recorded, {kept} kept, {len(log.names)} functions", flush=True)
+        if args.dump:
+            dump_events(ring, args.dump)
+
+
+if __name__ == "__main__":
+    main()
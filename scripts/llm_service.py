@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""Resident LLM translation service.
+
+Every ``aider`` invocation pays for a fresh interpreter, the litellm import
+and a new TLS connection to the model provider. This service loads aider
+once, keeps one model object per model name and a pooled keep-alive HTTP
+client, and runs edit requests sent over a Unix socket. Requests are
+executed one at a time in the request's working directory.
+
+The ``aider`` subcommand accepts the subset of aider's command line used by
+verify.sh and forwards it to the service. It exits with ``FALLBACK_EXIT``
+(75) when the service is not running or the arguments are not supported, so
+callers can fall back to starting aider directly::
+
+    python3 scripts/llm_service.py start
+    python3 scripts/llm_service.py aider --model MODEL --yes --message-file prompt.txt out.c
+    python3 scripts/llm_service.py stop
+
+Python callers use :class:`Client`.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional
+
+FALLBACK_EXIT = 75
+START_TIMEOUT = 60
+# Environment forwarded with each request so the service uses the caller's
+# provider settings (e.g. OPENAI_API_BASE for a local model)
+ENV_PREFIXES = ("OPENAI_", "OPENROUTER_", "ANTHROPIC_", "LITELLM_", "AIDER_", "GEMINI_", "DEEPSEEK_")
+
+
+def socket_path() -> str:
+    return os.environ.get("ESBMC_LLM_SOCKET") or os.path.join(
+        tempfile.gettempdir(), f"esbmc-llm-{os.getuid()}.sock")
+
+
+def _is_forwarded(name: str) -> bool:
+    return name.startswith(ENV_PREFIXES) or name.endswith("_API_KEY") or name.endswith("_API_BASE")
+
+
+def forwarded_env() -> Dict[str, str]:
+    return {k: v for k, v in os.environ.items() if _is_forwarded(k)}
+
+
+class Client:
+    """Sends requests to a running service; every call opens one short connection."""
+
+    def __init__(self, path: Optional[str] = None, timeout: Optional[float] = None):
+        self.path = path or socket_path()
+        self.timeout = timeout
+
+    def request(self, payload: Dict) -> Dict:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            sock.sendall(json.dumps(payload).encode() + b"\n")
+            with sock.makefile("rb") as f:
+                line = f.readline()
+        if not line:
+            raise ConnectionError("LLM service closed the connection")
+        return json.loads(line)
+
+    def available(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        try:
+            return Client(self.path, timeout=2).request({"cmd": "ping"}).get("ok", False)
+        except (OSError, ValueError):
+            return False
+
+    def edit(self, model: str, files: List[str], message: str, read: Optional[List[str]] = None,
+             cwd: Optional[str] = None, test_cmd: Optional[str] = None, auto_test: bool = False,
+             run_test: bool = False) -> Dict:
+        """Run one aider edit; the response has ``ok``, ``output`` and, on setup errors, ``fallback``."""
+        return self.request({
+            "cmd": "edit",
+            "model": model,
+            "files": [os.path.abspath(f) for f in files],
+            "read": [os.path.abspath(f) for f in (read or [])],
+            "message": message,
+            "cwd": os.path.abspath(cwd or os.getcwd()),
+            "test_cmd": test_cmd,
+            "auto_test": auto_test,
+            "run_test": run_test,
+            "env": forwarded_env(),
+        })
+
+
+class AiderBackend:
+    """Holds the process-wide aider state shared by all requests."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.models: Dict[str, object] = {}
+        # Import aider (and litellm with it) once, up front
+        from aider.coders import Coder  # noqa: F401
+        from aider.io import InputOutput  # noqa: F401
+        from aider.models import Model  # noqa: F401
+        self._configure_http_pool()
+
+    @staticmethod
+    def _configure_http_pool() -> None:
+        try:
+            import httpx
+            import litellm
+        except ImportError:
+            return
+        # One keep-alive pool for every completion call made by this process
+        litellm.client_session = httpx.Client(
+            timeout=httpx.Timeout(600.0, connect=30.0),
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=8, keepalive_expiry=300),
+        )
+
+    def model(self, name: str):
+        from aider.models import Model
+        if name not in self.models:
+            self.models[name] = Model(name)
+        return self.models[name]
+
+    def edit(self, req: Dict) -> Dict:
+        from aider.coders import Coder
+        from aider.io import InputOutput
+
+        out = io.StringIO()
+        with self.lock:
+            saved_cwd = os.getcwd()
+            # Provider settings come from the caller only, not from whoever started the service
+            env = req.get("env", {})
+            names = set(env) | {k for k in os.environ if _is_forwarded(k)}
+            saved_env = {k: os.environ.get(k) for k in names}
+            for k in names:
+                if k in env:
+                    os.environ[k] = env[k]
+                else:
+                    os.environ.pop(k, None)
+            try:
+                os.chdir(req.get("cwd") or saved_cwd)
+                with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+                    try:
+                        coder = Coder.create(
+                            main_model=self.model(req["model"]),
+                            io=InputOutput(yes=True, pretty=False, chat_history_file=None),
+                            fnames=req.get("files", []),
+                            read_only_fnames=req.get("read", []),
+                            auto_commits=False,
+                            use_git=False,
+                            auto_test=bool(req.get("auto_test")),
+                            test_cmd=req.get("test_cmd"),
+                        )
+                    except Exception:
+                        traceback.print_exc()
+                        return {"ok": False, "fallback": True, "output": out.getvalue()}
+
+                    if req.get("message"):
+                        coder.run(with_message=req["message"])
+                    if req.get("run_test") and req.get("test_cmd"):
+                        # Send a failing test back to the model once, like aider --test
+                        errors = coder.commands.cmd_test(req["test_cmd"])
+                        if errors:
+                            coder.run(with_message=errors)
+                return {"ok": True, "output": out.getvalue()}
+            except Exception:
+                return {"ok": False, "output": out.getvalue() + traceback.format_exc()}
+            finally:
+                os.chdir(saved_cwd)
+                for k, v in saved_env.items():
+                    if v is None:
+                        os.environ.pop(k, None)
+                    else:
+                        os.environ[k] = v
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            req = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        cmd = req.get("cmd")
+        if cmd == "ping":
+            resp = {"ok": True, "pid": os.getpid()}
+        elif cmd == "edit":
+            resp = self.server.backend.edit(req)
+        elif cmd == "shutdown":
+            resp = {"ok": True}
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        else:
+            resp = {"ok": False, "output": f"Unknown command: {cmd}"}
+        self.wfile.write(json.dumps(resp).encode() + b"\n")
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(path: str) -> None:
+    if Client(path).available():
+        print(f"LLM service already running at {path}", file=sys.stderr)
+        return
+    if os.path.exists(path):
+        os.unlink(path)
+    backend = AiderBackend()
+    old_umask = os.umask(0o077)
+    try:
+        server = _Server(path, _Handler)
+    finally:
+        os.umask(old_umask)
+    server.backend = backend
+    print(f"LLM service listening on {path} (pid {os.getpid()})", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def start(path: str) -> bool:
+    """Start the service in the background unless it is running; returns True once it answers."""
+    client = Client(path)
+    if client.available():
+        return True
+    log_path = path + ".log"
+    with open(log_path, "ab") as log:
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "--socket", path, "serve"],
+                         stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True)
+    deadline = time.time() + START_TIMEOUT
+    while time.time() < deadline:
+        if client.available():
+            return True
+        time.sleep(0.2)
+    print(f"LLM service did not come up; see {log_path}", file=sys.stderr)
+    return False
+
+
+def aider_command(path: str, argv: List[str]) -> int:
+    """Forward an aider command line to the service."""
+    parser = argparse.ArgumentParser(prog="llm_service.py aider", add_help=False)
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--message")
+    parser.add_argument("--message-file")
+    parser.add_argument("--read", action="append", default=[])
+    parser.add_argument("--file", action="append", default=[])
+    parser.add_argument("--test-cmd")
+    parser.add_argument("--auto-test", action="store_true")
+    parser.add_argument("--test", action="store_true")
+    # Accepted for compatibility; the service always behaves this way
+    for flag in ("--yes", "--no-git", "--no-pretty", "--no-show-model-warnings", "--no-auto-commits"):
+        parser.add_argument(flag, action="store_true")
+    parser.add_argument("files", nargs="*")
+    try:
+        args, unknown = parser.parse_known_args(argv)
+    except SystemExit:
+        return FALLBACK_EXIT
+    if unknown:
+        return FALLBACK_EXIT
+
+    client = Client(path)
+    if not os.path.exists(client.path):
+        return FALLBACK_EXIT
+    message = args.message
+    if args.message_file:
+        with open(args.message_file) as f:
+            message = f.read()
+    try:
+        resp = client.edit(args.model, args.file + args.files, message or "", read=args.read,
+                           test_cmd=args.test_cmd, auto_test=args.auto_test, run_test=args.test)
+    except (OSError, ValueError):
+        return FALLBACK_EXIT
+    sys.stdout.write(resp.get("output", ""))
+    sys.stdout.flush()
+    if resp.get("fallback"):
+        return FALLBACK_EXIT
+    return 0 if resp.get("ok") else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident LLM translation service")
+    parser.add_argument("--socket", default=socket_path(), help="Unix socket path (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", help="Run the service in the foreground")
+    sub.add_parser("start", help="Start the service in the background")
+    sub.add_parser("stop", help="Stop the service")
+    sub.add_parser("status", help="Report whether the service is running")
+    sub.add_parser("path", help="Print the socket path")
+    sub.add_parser("aider", help="Forward an aider command line (everything after 'aider') to the service")
+
+    # Everything after "aider" belongs to aider, including its options
+    argv = sys.argv[1:]
+    aider_argv: List[str] = []
+    if "aider" in argv:
+        i = argv.index("aider")
+        argv, aider_argv = argv[:i + 1], argv[i + 1:]
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            serve(args.socket)
+        except ImportError as e:
+            print(f"Error: aider is not installed: {e}", file=sys.stderr)
+            sys.exit(1)
+    elif args.command == "start":
+        sys.exit(0 if start(args.socket) else 1)
+    elif args.command == "stop":
+        client = Client(args.socket, timeout=5)
+        if client.available():
+            client.request({"cmd": "shutdown"})
+    elif args.command == "status":
+        running = Client(args.socket).available()
+        print(f"{args.socket}: {'running' if running else 'stopped'}")
+        sys.exit(0 if running else 1)
+    elif args.command == "path":
+        print(args.socket)
+    elif args.command == "aider":
+        sys.exit(aider_command(args.socket, aider_argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""Record/replay stub for OpenAI-compatible chat completion endpoints.
+
+Point aider at it through ``OPENAI_API_BASE`` (``verify.sh --local-llm``
+uses ``LOCAL_LLM_API_BASE``, ``http://localhost:8080/v1`` by default) to
+run the LLM paths offline and repeatably:
+
+* ``--mode record``  forward every request to ``--upstream`` and store the
+  response
+* ``--mode replay``  answer from the store only; an unknown prompt is a 400
+  error naming its hash
+* ``--mode auto``    replay when recorded, otherwise record
+
+Requests are keyed by a hash of their messages (and tools/response format),
+not the model name, so a recording can be replayed under any model. Dates
+and temporary directory names are normalized before hashing, since verify.sh
+puts its mktemp paths in prompts. When the same prompt was recorded several
+times, the n-th identical request gets the n-th response.
+
+The store is a gzip-compressed JSON-lines file holding only what is needed
+to rebuild the response (message, finish reason, usage, latency)::
+
+    python3 scripts/llm_stub.py serve --mode record --upstream https://openrouter.ai/api/v1
+    LOCAL_LLM_API_BASE=http://localhost:8080/v1 ./verify.sh --local-llm --model openai/z-ai/glm-4.6 file.py
+    python3 scripts/llm_stub.py serve --mode replay --latency recorded
+    python3 scripts/llm_stub.py stats
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from translation_cache import cache_root
+
+DEFAULT_PORT = 8080
+STREAM_CHUNK_CHARS = 64
+UPSTREAM_TIMEOUT = 600
+KEY_FIELDS = ("messages", "tools", "functions", "tool_choice", "response_format")
+
+# Volatile prompt text replaced before hashing
+NORMALIZERS = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?"), "<date>"),
+    (re.compile(r"/[^\s\"'\\]*?/tmp\.?[A-Za-z0-9_]{6,}"), "<tmpdir>"),
+]
+
+
+def default_store() -> str:
+    return os.environ.get("LLM_STUB_STORE") or os.path.join(cache_root(), "llm_recordings.jsonl.gz")
+
+
+def request_key(body: Dict, normalize: bool = True, extra: Optional[List[re.Pattern]] = None) -> str:
+    relevant = {k: body[k] for k in KEY_FIELDS if body.get(k) is not None}
+    text = json.dumps(relevant, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    if normalize:
+        for pattern, replacement in NORMALIZERS:
+            text = pattern.sub(replacement, text)
+        for pattern in extra or []:
+            text = pattern.sub("<volatile>", text)
+    return hashlib.sha256(text.encode("utf-8", "surrogateescape")).hexdigest()
+
+
+class Store:
+    """Recorded responses by request key, appended as gzip members."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries: Dict[str, List[Dict]] = {}
+        self.served: Dict[str, int] = {}
+        if os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.entries.setdefault(entry["key"], []).append(entry)
+
+    def next(self, key: str) -> Optional[Dict]:
+        with self.lock:
+            recorded = self.entries.get(key)
+            if not recorded:
+                return None
+            n = self.served.get(key, 0)
+            self.served[key] = n + 1
+            return recorded[min(n, len(recorded) - 1)]
+
+    def add(self, entry: Dict) -> None:
+        with self.lock:
+            self.entries.setdefault(entry["key"], []).append(entry)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+def compact_response(response: Dict) -> Dict:
+    choice = (response.get("choices") or [{}])[0]
+    return {
+        "message": choice.get("message") or {"role": "assistant", "content": ""},
+        "finish_reason": choice.get("finish_reason", "stop"),
+        "usage": response.get("usage"),
+    }
+
+
+def completion(entry: Dict, model: str) -> Dict:
+    return {
+        "id": f"chatcmpl-{entry['key'][:24]}",
+        "object": "chat.completion",
+        "created": int(entry.get("created", 0)),
+        "model": model,
+        "choices": [{"index": 0, "message": entry["message"], "finish_reason": entry["finish_reason"]}],
+        "usage": entry.get("usage"),
+    }
+
+
+def stream_chunks(entry: Dict, model: str) -> List[Dict]:
+    """The recorded message as OpenAI streaming deltas."""
+    base = {"id": f"chatcmpl-{entry['key'][:24]}", "object": "chat.completion.chunk",
+            "created": int(entry.get("created", 0)), "model": model}
+    message = entry["message"]
+    content = message.get("content") or ""
+
+    def chunk(delta, finish=None):
+        return dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": finish}])
+
+    chunks = [chunk({"role": message.get("role", "assistant"), "content": ""})]
+    for i in range(0, len(content), STREAM_CHUNK_CHARS):
+        chunks.append(chunk({"content": content[i:i + STREAM_CHUNK_CHARS]}))
+    if message.get("tool_calls"):
+        calls = [dict(call, index=i) for i, call in enumerate(message["tool_calls"])]
+        chunks.append(chunk({"tool_calls": calls}))
+    final = chunk({}, entry["finish_reason"])
+    if entry.get("usage"):
+        final["usage"] = entry["usage"]
+    chunks.append(final)
+    return chunks
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, store: Store, args):
+        super().__init__(address, _Handler)
+        self.store = store
+        self.mode = args.mode
+        self.upstream = args.upstream.rstrip("/") if args.upstream else None
+        self.latency = args.latency
+        self.latency_scale = args.latency_scale
+        self.normalize = not args.no_normalize
+        self.extra = [re.compile(p) for p in args.normalize or []]
+        self.quiet = args.quiet
+
+    def delay(self, entry: Dict) -> float:
+        if self.latency == "recorded":
+            return float(entry.get("latency", 0)) * self.latency_scale
+        return float(self.latency) * self.latency_scale
+
+    def forward(self, body: Dict, headers: Dict[str, str]) -> Tuple[int, Dict, float]:
+        # Always fetch the complete response; streaming to the client is rebuilt from it
+        upstream_body = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+        request = urllib.request.Request(self.upstream + "/chat/completions",
+                                         data=json.dumps(upstream_body).encode(),
+                                         headers=headers, method="POST")
+        started = time.monotonic()
+        try:
+            with urllib.request.urlopen(request, timeout=UPSTREAM_TIMEOUT) as response:
+                return response.status, json.load(response), time.monotonic() - started
+        except urllib.error.HTTPError as e:
+            try:
+                payload = json.load(e)
+            except ValueError:
+                payload = {"error": {"message": str(e), "type": "upstream_error"}}
+            return e.code, payload, time.monotonic() - started
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        if not self.server.quiet:
+            sys.stderr.write("llm_stub: " + fmt % args + "\n")
+
+    def _send_json(self, status: int, payload: Dict) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send_json(status, {"error": {"message": message, "type": "invalid_request_error"}})
+
+    def _send_stream(self, chunks: List[Dict]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for chunk in chunks:
+            self.wfile.write(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [
+                {"id": "llm-stub", "object": "model", "owned_by": "llm-stub"}]})
+        else:
+            self._error(404, f"Unknown path {self.path}")
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._error(404, f"Unknown path {self.path}")
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except ValueError:
+            self._error(400, "Request body is not JSON")
+            return
+
+        server: StubServer = self.server
+        model = body.get("model", "llm-stub")
+        key = request_key(body, server.normalize, server.extra)
+        entry = server.store.next(key) if server.mode != "record" else None
+
+        if entry is not None:
+            time.sleep(server.delay(entry))
+            self.log_message("replay %s", key[:12])
+        elif server.mode == "replay":
+            self._error(400, f"llm_stub: no recorded response for prompt {key}")
+            return
+        else:
+            if not server.upstream:
+                self._error(500, "llm_stub: recording needs --upstream")
+                return
+            headers = {"Content-Type": "application/json"}
+            if self.headers.get("Authorization"):
+                headers["Authorization"] = self.headers["Authorization"]
+            status, response, latency = server.forward(body, headers)
+            if status != 200:
+                self._send_json(status, response)
+                return
+            entry = dict(compact_response(response), key=key, model=model,
+                         latency=round(latency, 3), created=int(time.time()))
+            server.store.add(entry)
+            self.log_message("record %s (%.1fs)", key[:12], latency)
+
+        if body.get("stream"):
+            self._send_stream(stream_chunks(entry, model))
+        else:
+            self._send_json(200, completion(entry, model))
+
+
+def cmd_serve(args) -> int:
+    if args.mode != "replay" and not args.upstream:
+        print("Error: --mode record/auto needs --upstream", file=sys.stderr)
+        return 1
+    if args.latency != "recorded":
+        try:
+            float(args.latency)
+        except ValueError:
+            print("Error: --latency must be a number of seconds or 'recorded'", file=sys.stderr)
+            return 1
+    store = Store(args.store)
+    server = StubServer((args.host, args.port), store, args)
+    print(f"LLM stub ({args.mode}) on http://{args.host}:{server.server_address[1]}/v1, "
+          f"{sum(len(v) for v in store.entries.values())} recorded responses in {args.store}",
+          file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def cmd_stats(args) -> int:
+    store = Store(args.store)
+    responses = [e for entries in store.entries.values() for e in entries]
+    size = os.path.getsize(args.store) if os.path.exists(args.store) else 0
+    print(f"{args.store}: {len(store.entries)} prompts, {len(responses)} responses, "
+          f"{sum(float(e.get('latency', 0)) for e in responses):.1f}s recorded latency, {size / 1024:.1f} KiB")
+    return 0
+
+
+def cmd_clear(args) -> int:
+    try:
+        os.unlink(args.store)
+    except FileNotFoundError:
+        pass
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record/replay stub for OpenAI-compatible LLM endpoints")
+    parser.add_argument("--store", default=default_store(), help="Recording file (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("serve", help="Run the stub server in the foreground")
+    p.add_argument("--mode", choices=["record", "replay", "auto"], default="replay")
+    p.add_argument("--upstream", default=os.environ.get("LLM_STUB_UPSTREAM"),
+                   help="Real OpenAI-compatible endpoint for record/auto mode, e.g. https://openrouter.ai/api/v1")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port (default: %(default)s, as --local-llm)")
+    p.add_argument("--latency", default="0",
+                   help="Simulated latency per reply: seconds, or 'recorded' for the original latency")
+    p.add_argument("--latency-scale", type=float, default=1.0, help="Multiply the simulated latency")
+    p.add_argument("--normalize", action="append", metavar="REGEX",
+                   help="Extra volatile prompt text to ignore when hashing")
+    p.add_argument("--no-normalize", action="store_true", help="Hash prompts exactly as sent")
+    p.add_argument("--quiet", action="store_true", help="Do not log requests")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("stats", help="Summarize the recordings")
+    p.set_defaults(func=cmd_stats)
+    p = sub.add_parser("clear", help="Delete the recordings")
+    p.set_defaults(func=cmd_clear)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Per-module translation units for ``verify.sh --multi-file --incremental``.
+
+Instead of one prompt with every file, each Python module becomes its own C
+unit (``<module>.h`` with the interface, ``<module>.c`` with the
+definitions), translated in dependency order from an import graph built
+with :mod:`ast`. Translations are cached in the translation cache
+(translation_cache.py) under two keys:
+
+* the header key covers the module's Python interface (top-level function
+  signatures, classes and their methods, module-level assignments) and the
+  interfaces of the modules it imports
+* the body key covers the module source, its header key and the header
+  keys of its imports
+
+Editing a function body therefore re-translates only that module's ``.c``
+against its unchanged header; changing an interface re-translates the
+module and every module that imports it. ``link`` then concatenates the
+units into one file for ESBMC::
+
+    python3 scripts/multi_module.py plan --main main.py --prompt P --value model=M *.py
+    python3 scripts/multi_module.py store --header-key H --body-key B module
+    python3 scripts/multi_module.py link --output combined.c mod_a mod_b main
+
+``plan`` restores every cache hit into the current directory and prints one
+tab-separated line per module in dependency order::
+
+    <cached|body|full>  <module>  <python file>  <header key>  <body key>  <imports>
+
+``body`` means the header was reused and only the ``.c`` file is needed.
+"""
+
+import argparse
+import ast
+import hashlib
+import os
+import sys
+from typing import Dict, List, Optional, Set
+
+from translation_cache import compute_key, default_cache_dir, get, put
+
+FORMAT_VERSION = "multi-module-v1"
+
+
+def module_name(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _imported_names(tree: ast.Module) -> Set[str]:
+    names: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                names.add(alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            if node.module:
+                names.add(node.module)
+            if node.level or not node.module:
+                # "from . import x" / "from .pkg import x" may name sibling modules
+                names.update(alias.name for alias in node.names)
+    return names
+
+
+def _resolve(name: str, known: Set[str]) -> Optional[str]:
+    """Map a dotted import to one of the given (flat) modules."""
+    parts = name.split(".")
+    for candidate in (name, parts[-1], parts[0]):
+        if candidate in known:
+            return candidate
+    return None
+
+
+def interface(tree: ast.Module) -> str:
+    """Text of everything other modules can see; bodies are left out."""
+
+    def signature(fn) -> str:
+        returns = f" -> {ast.unparse(fn.returns)}" if fn.returns else ""
+        return f"def {fn.name}({ast.unparse(fn.args)}){returns}"
+
+    lines = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            lines.append(signature(node))
+        elif isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(b) for b in node.bases)
+            lines.append(f"class {node.name}({bases})")
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    lines.append("    " + signature(item))
+                    if item.name == "__init__":
+                        # Instance attributes are part of the class layout
+                        for sub in ast.walk(item):
+                            targets = sub.targets if isinstance(sub, ast.Assign) else (
+                                [sub.target] if isinstance(sub, ast.AnnAssign) else [])
+                            for t in targets:
+                                if (isinstance(t, ast.Attribute) and isinstance(t.value, ast.Name)
+                                        and t.value.id == "self"):
+                                    ann = f": {ast.unparse(sub.annotation)}" if isinstance(sub, ast.AnnAssign) else ""
+                                    lines.append(f"        self.{t.attr}{ann}")
+                elif isinstance(item, (ast.Assign, ast.AnnAssign)):
+                    lines.append("    " + ast.unparse(item))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            lines.append(ast.unparse(node))
+    return "\n".join(lines)
+
+
+class Module:
+    def __init__(self, path: str, tree: ast.Module):
+        self.path = path
+        self.name = module_name(path)
+        self.tree = tree
+        self.imports: List[str] = []
+        self.interface_hash = hashlib.sha256(interface(tree).encode()).hexdigest()
+
+
+def build_graph(paths: List[str]) -> Dict[str, Module]:
+    modules: Dict[str, Module] = {}
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            source = f.read()
+        try:
+            tree = ast.parse(source, filename=path)
+        except SyntaxError as e:
+            raise SystemExit(f"Error: cannot parse {path}: {e}")
+        module = Module(path, tree)
+        modules[module.name] = module
+    known = set(modules)
+    for module in modules.values():
+        deps = {_resolve(name, known) for name in _imported_names(module.tree)}
+        module.imports = sorted(d for d in deps if d and d != module.name)
+    return modules
+
+
+def dependency_order(modules: Dict[str, Module], main: str) -> List[str]:
+    """Imports before importers; the main module last. Cycles are broken arbitrarily."""
+    order: List[str] = []
+    state: Dict[str, int] = {}
+
+    def visit(name: str, stack: List[str]) -> None:
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            cycle = stack[stack.index(name):] + [name]
+            print(f"Warning: import cycle {' -> '.join(cycle)}", file=sys.stderr)
+            return
+        state[name] = 1
+        for dep in modules[name].imports:
+            visit(dep, stack + [name])
+        state[name] = 2
+        order.append(name)
+
+    for name in sorted(n for n in modules if n != main):
+        visit(name, [])
+    if main in modules:
+        visit(main, [])
+        order.remove(main)
+        order.append(main)
+    return order
+
+
+def cmd_graph(args) -> int:
+    modules = build_graph(args.files)
+    for name in dependency_order(modules, module_name(args.main) if args.main else ""):
+        m = modules[name]
+        print(f"{name} ({m.interface_hash[:12]}): {', '.join(m.imports) or '-'}")
+    return 0
+
+
+def cmd_plan(args) -> int:
+    modules = build_graph(args.files)
+    main = module_name(args.main)
+    if main not in modules:
+        print(f"Error: main module {args.main} is not among the files", file=sys.stderr)
+        return 1
+    values = [FORMAT_VERSION] + (args.value or [])
+    prompt = [args.prompt] if args.prompt else []
+    header_keys: Dict[str, str] = {}
+
+    for name in dependency_order(modules, main):
+        m = modules[name]
+        deps = [f"{d}={modules[d].interface_hash}" for d in m.imports]
+        header_key = compute_key(prompt, values + [f"header={name}", f"interface={m.interface_hash}"] + deps)
+        header_keys[name] = header_key
+        body_key = compute_key([m.path] + prompt, values + [
+            f"body={name}", f"main={name == main}", f"header={header_key}"]
+            + [f"{d}={header_keys.get(d, '')}" for d in m.imports])
+
+        status = "full"
+        if not args.no_cache and get(args.cache_dir, header_key, f"{name}.h") is not None:
+            status = "body"
+            if get(args.cache_dir, body_key, f"{name}.c") is not None:
+                status = "cached"
+        print("\t".join([status, name, m.path, header_key, body_key, ",".join(m.imports)]))
+    return 0
+
+
+def cmd_store(args) -> int:
+    meta = {"module": args.module}
+    for suffix, key in ((".h", args.header_key), (".c", args.body_key)):
+        path = args.module + suffix
+        if not os.path.isfile(path):
+            print(f"Error: {path} not found", file=sys.stderr)
+            return 1
+        put(args.cache_dir, key, path, meta)
+    return 0
+
+
+def cmd_link(args) -> int:
+    parts = ["/* Generated by scripts/multi_module.py: one unit per Python module */"]
+    for name in args.modules:
+        parts.append(f"\n/* ===== module {name} ===== */")
+        for suffix in (".h", ".c"):
+            path = name + suffix
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                print(f"Error: {path} not found", file=sys.stderr)
+                return 1
+            # Keep ESBMC's locations pointing at the per-module files
+            parts.append(f'#line 1 "{path}"\n{text.rstrip()}\n')
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental per-module translation for --multi-file")
+    parser.add_argument("--cache-dir", default=os.environ.get("TRANSLATION_CACHE_DIR", default_cache_dir()),
+                        help="Translation cache directory (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("graph", help="Print the import graph in dependency order")
+    p.add_argument("--main", help="Entry-point module, placed last")
+    p.add_argument("files", nargs="+")
+    p.set_defaults(func=cmd_graph)
+
+    p = sub.add_parser("plan", help="Restore cached units and list what needs translating")
+    p.add_argument("--main", required=True, help="Entry-point file")
+    p.add_argument("--prompt", help="Instruction file that is part of every key")
+    p.add_argument("--value", action="append", help="Extra value that is part of every key (e.g. model=...)")
+    p.add_argument("--no-cache", action="store_true", help="Translate every module")
+    p.add_argument("files", nargs="+")
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser("store", help="Cache MODULE.h and MODULE.c")
+    p.add_argument("--header-key", required=True)
+    p.add_argument("--body-key", required=True)
+    p.add_argument("module")
+    p.set_defaults(func=cmd_store)
+
+    p = sub.add_parser("link", help="Concatenate units, in the given order, into one C file")
+    p.add_argument("--output", required=True)
+    p.add_argument("modules", nargs="+")
+    p.set_defaults(func=cmd_link)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
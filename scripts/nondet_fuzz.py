@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""Concrete fuzzing pre-pass: look for a failing input before model checking.
+
+Runs the original Python program many times in a process pool, with the
+nondet functions of ``esbmc.py`` (and the :mod:`random` module) answered by
+a seeded generator through nondet_hooks.py. The generator favours small
+and boundary values. Inputs that reach new lines of the program (line
+pairs, traced with :func:`sys.settrace`) join a corpus that later runs
+mutate, so checks behind several branches or assumptions are still
+reached. Runs that violate an assume() are discarded.
+
+As soon as a run ends in an assertion failure the fuzzer stops and reports
+it with a witness: the sequence of values the program drew, which
+reproduces the failure with::
+
+    python3 scripts/nondet_hooks.py run --random --values-file witness.json program.py
+
+Usage::
+
+    python3 scripts/nondet_fuzz.py --time 10 program.py
+    python3 scripts/nondet_fuzz.py --time 30 --jobs 8 --seed 1 --witness witness.json program.py
+
+Other uncaught exceptions are not failures: a ``ZeroDivisionError`` on
+floats, an I/O error or a Python-only API may well be fine in the
+translated program, so such runs only make the result inconclusive and
+model checking decides.
+
+The program really runs, with its file and OS side effects.
+
+Exit status: 1 when an assertion failed, 0 when nothing failed within the
+budget (which proves nothing), 2 when the program cannot run under plain
+Python (missing imports or names), 3 when runs raised other exceptions but
+no assertion failed.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import signal
+import sys
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from nondet_hooks import KIND_BOUNDS, install, load_esbmc, run_program
+
+# Exceptions that say more about the environment than about the program
+UNSUPPORTED = ("ImportError", "ModuleNotFoundError", "NameError", "SyntaxError")
+
+INTERESTING_INTS = (0, 1, -1, 2, -2, 3, 7, 8, 10, 16, 100, 127, 128, 255, 256, 1000)
+
+
+class RunTimeout(BaseException):
+    """Raised by the alarm when one run takes too long."""
+
+
+def draw(rng: random.Random, kind: str, bounds: Optional[Tuple[Any, Any]]) -> Any:
+    """A fresh value, biased toward small and boundary values."""
+    lo, hi = bounds if bounds is not None else KIND_BOUNDS.get(kind, KIND_BOUNDS["int"])
+    if kind == "bool":
+        return rng.random() < 0.5
+    if kind == "float":
+        r = rng.random()
+        if r < 0.3:
+            return rng.choice([v for v in (0.0, 1.0, -1.0, 0.5, lo, hi) if lo <= v <= hi] or [lo])
+        if r < 0.7:
+            return rng.uniform(max(lo, -100.0), min(hi, 100.0))
+        return rng.uniform(lo, hi)
+    r = rng.random()
+    if r < 0.3:
+        candidates = [v for v in INTERESTING_INTS if lo <= v <= hi] + [lo, hi, lo + 1, hi - 1]
+        return rng.choice([v for v in candidates if lo <= v <= hi])
+    if r < 0.75:
+        return rng.randint(max(lo, -16), max(min(hi, 32), max(lo, -16)))
+    return rng.randint(lo, hi)
+
+
+class _Generator:
+    """Source for one run: the given prefix (None = draw), then fresh values."""
+
+    def __init__(self, seed: int, prefix: List[Any]):
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.values: List[Any] = []
+
+    def __call__(self, name: str, kind: str, bounds=None) -> Any:
+        i = len(self.values)
+        value = self.prefix[i] if i < len(self.prefix) else None
+        if value is None:
+            value = draw(self.rng, kind, bounds)
+        self.values.append(value)
+        return value
+
+
+# Per-worker state, set up by _init_worker
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(program: str, coverage: bool, run_timeout: float) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    devnull = open(os.devnull, "w")
+    sys.stdout = sys.stderr = devnull
+    sys.stdin = open(os.devnull)
+    os.chdir(os.path.dirname(program))
+    state = {"source": None}
+    calls = install(lambda name, kind, bounds=None: state["source"](name, kind, bounds),
+                    load_esbmc(os.path.dirname(program)), hook_random=True)
+    _worker.update(program=program, coverage=coverage, run_timeout=run_timeout,
+                   state=state, calls=calls)
+
+
+def _alarm(_signum, _frame):
+    raise RunTimeout()
+
+
+def _run_one(task: Tuple[int, List[Any]]) -> Dict[str, Any]:
+    seed, prefix = task
+    program = _worker["program"]
+    source = _Generator(seed, prefix)
+    _worker["state"]["source"] = source
+    _worker["calls"].clear()
+    arcs: Set[Tuple[int, int]] = set()
+
+    def tracer(frame, event, _arg):
+        if frame.f_code.co_filename != program:
+            return None
+        last = [0]
+
+        def local(frame, event, _arg):
+            if event == "line":
+                arcs.add((last[0], frame.f_lineno))
+                last[0] = frame.f_lineno
+            return local
+        return local
+
+    signal.signal(signal.SIGALRM, _alarm)
+    signal.setitimer(signal.ITIMER_REAL, _worker["run_timeout"])
+    if _worker["coverage"]:
+        sys.settrace(tracer)
+    try:
+        outcome = run_program(program)
+    except RunTimeout:
+        outcome = {"status": "timeout"}
+    finally:
+        sys.settrace(None)
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    outcome.update(seed=seed, values=source.values,
+                   calls=[[name, value] for name, value in _worker["calls"][:1000]],
+                   arcs=sorted(arcs))
+    return outcome
+
+
+def _mutate(rng: random.Random, values: List[Any]) -> List[Any]:
+    """Prefix for a new run: a corpus entry with a few values redrawn."""
+    prefix = list(values)
+    if not prefix:
+        return prefix
+    for _ in range(rng.randint(1, min(3, len(prefix)))):
+        prefix[rng.randrange(len(prefix))] = None
+    if rng.random() < 0.2:
+        del prefix[rng.randrange(len(prefix)):]
+    return prefix
+
+
+def fuzz(program: str, seconds: float, jobs: int, seed: int, coverage: bool = True,
+         run_timeout: float = 2.0, max_runs: Optional[int] = None) -> Dict[str, Any]:
+    """Run the program until a failure, the time budget or max_runs is reached."""
+    program = os.path.abspath(program)
+    rng = random.Random(seed)
+    corpus: List[List[Any]] = []
+    covered: Set[Tuple[int, int]] = set()
+    runs = rejected = timeouts = errors = 0
+    first_error: Optional[Dict[str, Any]] = None
+    batch = max(jobs, 1) * 8
+    start = time.monotonic()
+    result: Dict[str, Any] = {"status": "none"}
+
+    ctx = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    with ctx.Pool(jobs, initializer=_init_worker, initargs=(program, coverage, run_timeout)) as pool:
+        while time.monotonic() - start < seconds and (max_runs is None or runs < max_runs):
+            tasks = []
+            for _ in range(batch):
+                prefix = _mutate(rng, rng.choice(corpus)) if corpus and rng.random() < 0.7 else []
+                tasks.append((rng.getrandbits(32), prefix))
+            # map keeps task order, so a given seed finds the same failure
+            for outcome in pool.map(_run_one, tasks):
+                runs += 1
+                status = outcome["status"]
+                if status == "exception" and outcome.get("type") in UNSUPPORTED:
+                    result = {"status": "unsupported", "outcome": outcome}
+                    break
+                if status == "assertion":
+                    result = {"status": "fail", "outcome": outcome}
+                    break
+                if status == "exception":
+                    errors += 1
+                    first_error = first_error or outcome
+                    if not outcome["values"]:
+                        # Raised before drawing any value: every run ends the same way
+                        result = {"status": "inconclusive", "outcome": outcome}
+                        break
+                    continue
+                if status == "assume":
+                    rejected += 1
+                    continue
+                if status == "timeout":
+                    timeouts += 1
+                new = {tuple(a) for a in outcome["arcs"]} - covered
+                if new or not corpus:
+                    covered |= new
+                    corpus.append(outcome["values"])
+            if result["status"] != "none":
+                break
+
+    if result["status"] == "none" and first_error is not None:
+        result = {"status": "inconclusive", "outcome": first_error}
+    result.update(program=program, seed=seed, runs=runs, rejected=rejected, timeouts=timeouts, errors=errors,
+                  corpus=len(corpus), covered=len(covered),
+                  seconds=round(time.monotonic() - start, 3))
+    return result
+
+
+def describe(result: Dict[str, Any]) -> str:
+    head = (f"{result['runs']} runs in {result['seconds']:.2f}s "
+            f"({result['rejected']} rejected by assumptions, {result['corpus']} corpus inputs)")
+    if result["status"] == "unsupported":
+        o = result["outcome"]
+        return f"Fuzzing skipped: the program does not run under Python ({o.get('type')}: {o.get('message')})"
+    if result["status"] == "inconclusive":
+        o = result["outcome"]
+        message = f": {o['message']}" if o.get("message") else ""
+        return (f"Fuzzing inconclusive: no assertion failed, but {result['errors']} run(s) raised "
+                f"{o.get('type')}{message} at line {o.get('line', '?')} or another exception\n  {head}")
+    if result["status"] != "fail":
+        return f"Fuzzing found no failure: {head}"
+    o = result["outcome"]
+    message = f": {o['message']}" if o.get("message") else ""
+    lines = [f"Fuzzing found a failure: AssertionError{message} at line {o.get('line', '?')}",
+             f"  {head}",
+             f"  nondet values: {o['values']}"]
+    if any(name.startswith("random.") for name, _ in o["calls"]):
+        lines.append("  (values for random.randint/randrange/choice are indices into the choices)")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzz a Python program's nondet inputs for a failing run")
+    parser.add_argument("--time", type=float, default=10, help="Time budget in seconds (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed (default: %(default)s)")
+    parser.add_argument("--max-runs", type=int, help="Stop after this many runs")
+    parser.add_argument("--run-timeout", type=float, default=2.0,
+                        help="Seconds allowed for a single run (default: %(default)s)")
+    parser.add_argument("--no-coverage", action="store_true", help="Plain random inputs, no line tracing")
+    parser.add_argument("--witness", help="Write the failing run's values to this file (for nondet_hooks.py run --values-file)")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    parser.add_argument("program")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.program):
+        print(f"Error: {args.program} not found", file=sys.stderr)
+        sys.exit(2)
+    result = fuzz(args.program, args.time, max(args.jobs, 1), args.seed,
+                  coverage=not args.no_coverage, run_timeout=args.run_timeout, max_runs=args.max_runs)
+    if "outcome" in result:
+        result["outcome"].pop("arcs", None)
+    if result["status"] == "fail":
+        if args.witness:
+            with open(args.witness, "w") as f:
+                json.dump(result["outcome"]["values"], f)
+            print(f"Witness written to {args.witness}", file=sys.stderr)
+    print(json.dumps(result, indent=2, default=list) if args.json else describe(result))
+    sys.exit({"fail": 1, "unsupported": 2, "inconclusive": 3}.get(result["status"], 0))
+
+
+if __name__ == "__main__":
+    main()
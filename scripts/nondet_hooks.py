@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Run a Python program with its nondet values supplied from outside.
+
+Programs written for ESBMC get their inputs from ``nondet_int()``,
+``nondet_bool()``, ``__VERIFIER_nondet_int()`` and friends, either imported
+from ``esbmc.py`` or used as builtins (as in ``regressions/``). When run
+with plain Python, ``esbmc.py`` simulates them with :mod:`random`.
+:func:`install` replaces every one of them, in the ``esbmc`` module and in
+:mod:`builtins`, by a hook that asks a *source* for the value, so the same
+program can be driven by an ESBMC counterexample (cex_replay.py) or by a
+generator (nondet_fuzz.py). With ``hook_random``, the :mod:`random` module
+functions (``randint``, ``randrange``, ``choice``, ...) are routed through
+the source as well, since ESBMC treats them as nondet too.
+
+``__ESBMC_assume``/``__VERIFIER_assume`` raise :class:`AssumptionViolated`
+instead of ``AssertionError``, so an infeasible input is not mistaken for a
+bug.
+
+Run a program once with given values; its own output goes to stderr and
+the outcome is printed as JSON on stdout::
+
+    python3 scripts/nondet_hooks.py run --values '[5, true]' regressions/nondet_fail.py
+"""
+
+import argparse
+import builtins
+import contextlib
+import json
+import os
+import runpy
+import sys
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Nondet functions and the kind of value each returns
+NONDET_KINDS: Dict[str, str] = {
+    "nondet_int": "int",
+    "nondet_uint": "uint",
+    "nondet_long": "int",
+    "nondet_uint64": "uint64",
+    "nondet_bool": "bool",
+    "nondet_float": "float",
+    "nondet_double": "float",
+    "nondet_char": "char",
+    "__VERIFIER_nondet_int": "int",
+    "__VERIFIER_nondet_uint": "uint",
+    "__VERIFIER_nondet_long": "int",
+    "__VERIFIER_nondet_bool": "bool",
+    "__VERIFIER_nondet_float": "float",
+    "__VERIFIER_nondet_double": "float",
+    "__VERIFIER_nondet_char": "char",
+}
+
+ASSUME_FUNCTIONS = ("__ESBMC_assume", "__VERIFIER_assume")
+
+# Range of each kind, for sources that generate values
+KIND_BOUNDS: Dict[str, Tuple[Any, Any]] = {
+    "int": (-2**31, 2**31 - 1),
+    "uint": (0, 2**32 - 1),
+    "uint64": (0, 2**64 - 1),
+    "char": (-128, 127),
+    "bool": (False, True),
+    "float": (-1e6, 1e6),
+}
+
+# A source is called as source(function name, kind, bounds) and returns the
+# value; bounds is an inclusive (low, high) pair or None for the kind's range.
+# The random hooks ask for an "index" into the choices they pick from.
+Source = Callable[[str, str, Optional[Tuple[Any, Any]]], Any]
+
+
+class AssumptionViolated(Exception):
+    """An assume() in the program did not hold for the supplied values."""
+
+
+def coerce(kind: str, value: Any) -> Any:
+    if kind == "bool":
+        return bool(value)
+    if kind == "float":
+        return float(value)
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, float):
+        return int(value)
+    return value
+
+
+def _assume(cond: bool, *_args) -> None:
+    if not cond:
+        raise AssumptionViolated("assumption violated")
+
+
+class Replay:
+    """Source that hands out the given values in order, then zeros."""
+
+    def __init__(self, values: List[Any]):
+        self.values = list(values)
+        self.used = 0
+        self.missing = 0
+
+    def __call__(self, name: str, kind: str, bounds=None) -> Any:
+        if self.used < len(self.values):
+            value = self.values[self.used]
+            self.used += 1
+            return value
+        self.missing += 1
+        return 0
+
+
+def load_esbmc(program_dir: str):
+    """Import the esbmc module the program would see, falling back to the repo copy."""
+    sys.path.insert(0, program_dir)
+    try:
+        import esbmc
+    except ImportError:
+        sys.path.append(REPO_ROOT)
+        try:
+            import esbmc
+        except ImportError:
+            return None
+    return esbmc
+
+
+def _random_hooks(draw: Callable[[str, str, Tuple[Any, Any]], Any]) -> Dict[str, Callable]:
+    """Replacements for the random module functions, drawing through draw()."""
+
+    def pick(name: str, choices):
+        if not len(choices):
+            raise ValueError("empty range for random." + name)
+        index = draw("random." + name, "index", (0, len(choices) - 1))
+        return choices[min(max(int(index), 0), len(choices) - 1)]
+
+    def randint(a, b):
+        return pick("randint", range(a, b + 1))
+
+    def randrange(start, stop=None, step=1):
+        if stop is None:
+            start, stop = 0, start
+        return pick("randrange", range(start, stop, step))
+
+    def choice(seq):
+        return pick("choice", seq)
+
+    def random():
+        return draw("random.random", "float", (0.0, 1.0))
+
+    def uniform(a, b):
+        return draw("random.uniform", "float", (min(a, b), max(a, b)))
+
+    def getrandbits(k):
+        return draw("random.getrandbits", "uint64", (0, 2**k - 1))
+
+    return {"randint": randint, "randrange": randrange, "choice": choice,
+            "random": random, "uniform": uniform, "getrandbits": getrandbits}
+
+
+def install(source: Source, module=None, hook_random: bool = False) -> List[Tuple[str, Any]]:
+    """Route every nondet function through source; returns the list of calls made."""
+    calls: List[Tuple[str, Any]] = []
+
+    def draw(name: str, kind: str, bounds=None) -> Any:
+        value = coerce(kind, source(name, kind, bounds))
+        calls.append((name, value))
+        return value
+
+    def hook(name: str, kind: str):
+        def nondet(*_args):
+            return draw(name, kind)
+        nondet.__name__ = name
+        return nondet
+
+    targets = [builtins] + ([module] if module is not None else [])
+    for target in targets:
+        for name, kind in NONDET_KINDS.items():
+            setattr(target, name, hook(name, kind))
+        for name in ASSUME_FUNCTIONS:
+            setattr(target, name, _assume)
+    if hook_random:
+        import random
+        for name, fn in _random_hooks(draw).items():
+            setattr(random, name, fn)
+    return calls
+
+
+def _program_line(exc: BaseException, path: str) -> Optional[int]:
+    """Line of the innermost frame of the exception that is in the program itself."""
+    line = None
+    for frame, lineno in traceback.walk_tb(exc.__traceback__):
+        if os.path.abspath(frame.f_code.co_filename) == path:
+            line = lineno
+    return line
+
+
+def run_program(path: str, argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Execute path as __main__ and classify how it ended.
+
+    status is ``ok``, ``assertion`` (AssertionError), ``exception`` (any
+    other uncaught exception), ``assume`` (an assume() failed) or ``exit``
+    (SystemExit with a non-zero code).
+    """
+    path = os.path.abspath(path)
+    sys.argv = [path] + (argv or [])
+    try:
+        runpy.run_path(path, run_name="__main__")
+    except AssumptionViolated as e:
+        return {"status": "assume", "line": _program_line(e, path)}
+    except AssertionError as e:
+        return {"status": "assertion", "message": str(e), "line": _program_line(e, path)}
+    except SystemExit as e:
+        if e.code in (None, 0):
+            return {"status": "ok"}
+        return {"status": "exit", "message": str(e.code)}
+    except Exception as e:
+        return {"status": "exception", "type": type(e).__name__, "message": str(e)[:200],
+                "line": _program_line(e, path)}
+    return {"status": "ok"}
+
+
+def cmd_run(args) -> int:
+    if args.values_file:
+        with open(args.values_file) as f:
+            values = json.load(f)
+    else:
+        values = json.loads(args.values)
+    if not isinstance(values, list):
+        print("Error: values must be a JSON list", file=sys.stderr)
+        return 1
+
+    program = os.path.abspath(args.program)
+    source = Replay(values)
+    calls = install(source, load_esbmc(os.path.dirname(program)), hook_random=args.random)
+    with contextlib.redirect_stdout(sys.stderr):
+        outcome = run_program(program, args.args)
+    outcome.update({
+        "nondet_calls": len(calls),
+        "values_used": source.used,
+        "values_missing": source.missing,
+        "calls": [[name, value] for name, value in calls[:1000]],
+    })
+    print(json.dumps(outcome))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Python with externally supplied nondet values")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="Run a program once and print its outcome as JSON")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--values", default="[]", help="JSON list of values, returned in call order")
+    group.add_argument("--values-file", help="File with a JSON list of values")
+    p.add_argument("--random", action="store_true",
+                   help="Also take the random module's results from the values (as nondet_fuzz.py witnesses do)")
+    p.add_argument("program")
+    p.add_argument("args", nargs=argparse.REMAINDER, help="Arguments for the program")
+    p.set_defaults(func=cmd_run)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""Parallel regression runner for verify.sh.
+
+Runs the cases of regression.sh (``examples`` suite) and
+esbmc_python_regressions.sh (``regressions`` suite) across a pool of worker
+processes. Every case gets its own working directory and TMPDIR, a wall-clock
+timeout, and per-stage timings; results are written as JSON and JUnit XML.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
+
+from stage_metrics import read_spans, summarize
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TIMEOUT = 900
+LOG_TAIL_LINES = 60
+
+# Output markers printed by verify.sh that delimit its stages. The first
+# matching line of each stage marks its start; a stage ends where the next
+# observed stage starts (or where the process exits).
+STAGE_MARKERS = [
+    ("setup", re.compile(r"^Working directory: ")),
+    ("translation", re.compile(r"^(Using direct LLM translation|Processing Python file with shedskin|"
+                               r"Converting .* to C|Attempt 1 of|Using cached translation|"
+                               r"Processing multiple files)")),
+    ("verification", re.compile(r"^(Running ESBMC|ESBMC command to be executed|"
+                                r"Verifying \d+ functions)")),
+]
+
+
+class Case:
+    def __init__(self, suite: str, path: str, expected: str):
+        self.suite = suite
+        self.path = path
+        self.expected = expected
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+    @property
+    def case_id(self) -> str:
+        return f"{self.suite}/{self.name}"
+
+
+def load_examples_suite(script: str) -> List[Case]:
+    """Read the ``test_cases`` array from regression.sh."""
+    cases = []
+    seen = set()
+    with open(script, "r", encoding="utf-8") as f:
+        text = f.read()
+    block = re.search(r"declare -a test_cases=\((.*?)\n\)", text, re.S)
+    if not block:
+        return cases
+    for match in re.finditer(r'"([^":]+):(pass|fail)"', block.group(1)):
+        path, expected = match.groups()
+        if path in seen:
+            continue
+        seen.add(path)
+        cases.append(Case("examples", path, expected))
+    return cases
+
+
+def load_regressions_suite(directory: str) -> List[Case]:
+    """Mirror esbmc_python_regressions.sh: files ending in ``fail.py`` must fail."""
+    cases = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.py"))):
+        rel = os.path.relpath(path, REPO_ROOT)
+        expected = "fail" if os.path.basename(path).endswith("fail.py") else "pass"
+        cases.append(Case("regressions", rel, expected))
+    return cases
+
+
+def stage_workdir(case_dir: str):
+    """Populate an isolated working directory that looks like the repo root.
+
+    Everything is symlinked except ``prompts``, which verify.sh writes into.
+    """
+    for name in os.listdir(REPO_ROOT):
+        if name in (".git", "prompts") or name.startswith("regression-results"):
+            continue
+        os.symlink(os.path.join(REPO_ROOT, name), os.path.join(case_dir, name))
+    prompts = os.path.join(REPO_ROOT, "prompts")
+    if os.path.isdir(prompts):
+        shutil.copytree(prompts, os.path.join(case_dir, "prompts"))
+
+
+def build_command(case: Case, args) -> List[str]:
+    cmd = ["./verify.sh", os.path.join(REPO_ROOT, case.path)]
+    if case.suite == "examples":
+        cmd += ["--llm", "--direct"]
+        if args.local_llm:
+            cmd.append("--local-llm")
+        if args.model:
+            cmd += ["--model", args.model]
+    if args.esbmc_exec:
+        cmd += ["--esbmc-exec", args.esbmc_exec]
+    cmd += args.verify_arg
+    return cmd
+
+
+def _compute_stages(marks: Dict[str, float], start: float, end: float) -> Dict[str, float]:
+    ordered = sorted(marks.items(), key=lambda item: item[1])
+    stages = {}
+    for i, (stage, begin) in enumerate(ordered):
+        finish = ordered[i + 1][1] if i + 1 < len(ordered) else end
+        stages[stage] = round(finish - begin, 3)
+    if ordered:
+        stages["startup"] = round(ordered[0][1] - start, 3)
+    return stages
+
+
+def run_case(case: Case, args, output_dir: str) -> dict:
+    case_dir = tempfile.mkdtemp(prefix=f"{case.suite}-{case.name}-", dir=args.work_root)
+    tmp_dir = os.path.join(case_dir, "tmp")
+    os.makedirs(tmp_dir)
+    stage_workdir(case_dir)
+
+    log_path = os.path.join(output_dir, "logs", case.suite, case.name + ".log")
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+
+    env = os.environ.copy()
+    # Keep docker workers on one mount for the whole run, not one per TMPDIR
+    env.setdefault("ESBMC_CONTAINER_TMPDIR", os.path.dirname(case_dir))
+    env["TMPDIR"] = tmp_dir
+    env["TERM"] = env.get("TERM", "dumb")
+    metrics_path = os.path.join(case_dir, "metrics.jsonl")
+    env["VERIFY_METRICS_FILE"] = metrics_path
+    cmd = build_command(case, args)
+
+    marks: Dict[str, float] = {}
+    tail: List[str] = []
+    start = time.monotonic()
+    timed_out = False
+
+    with open(log_path, "w", encoding="utf-8", errors="replace") as log:
+        log.write("$ " + " ".join(cmd) + "\n")
+        proc = subprocess.Popen(cmd, cwd=case_dir, env=env, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                start_new_session=True)
+
+        def pump():
+            for raw in proc.stdout:
+                line = raw.decode("utf-8", errors="replace")
+                log.write(line)
+                tail.append(line)
+                if len(tail) > LOG_TAIL_LINES:
+                    del tail[0]
+                for stage, pattern in STAGE_MARKERS:
+                    if stage not in marks and pattern.search(line):
+                        marks[stage] = time.monotonic()
+
+        reader = threading.Thread(target=pump, daemon=True)
+        reader.start()
+        try:
+            returncode = proc.wait(timeout=args.timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            returncode = proc.wait()
+        reader.join(timeout=5)
+
+    end = time.monotonic()
+    # Spans verify.sh recorded itself (see stage_metrics.py)
+    timings = {stage: {k: round(v, 3) if isinstance(v, float) else v for k, v in entry.items()}
+               for stage, entry in summarize(read_spans(metrics_path)).items()}
+    if not args.keep_workdirs:
+        shutil.rmtree(case_dir, ignore_errors=True)
+
+    if timed_out:
+        actual = "timeout"
+    else:
+        actual = "pass" if returncode == 0 else "fail"
+
+    return {
+        "id": case.case_id,
+        "suite": case.suite,
+        "file": case.path,
+        "expected": case.expected,
+        "actual": actual,
+        "ok": actual == case.expected,
+        "returncode": returncode,
+        "duration": round(end - start, 3),
+        "stages": _compute_stages(marks, start, end),
+        "timings": timings,
+        "log": os.path.relpath(log_path, output_dir),
+        "output_tail": "".join(tail),
+        "command": cmd,
+    }
+
+
+def write_junit(results: List[dict], path: str):
+    suites = ET.Element("testsuites")
+    for suite_name in sorted({r["suite"] for r in results}):
+        members = [r for r in results if r["suite"] == suite_name]
+        suite = ET.SubElement(suites, "testsuite", {
+            "name": suite_name,
+            "tests": str(len(members)),
+            "failures": str(sum(1 for r in members if not r["ok"] and r["actual"] != "timeout")),
+            "errors": str(sum(1 for r in members if r["actual"] == "timeout")),
+            "time": f"{sum(r['duration'] for r in members):.3f}",
+        })
+        for r in members:
+            case = ET.SubElement(suite, "testcase", {
+                "classname": suite_name,
+                "name": os.path.basename(r["file"]),
+                "time": f"{r['duration']:.3f}",
+            })
+            props = ET.SubElement(case, "properties")
+            for stage, seconds in r["stages"].items():
+                ET.SubElement(props, "property", {"name": f"stage.{stage}", "value": f"{seconds:.3f}"})
+            for stage, timing in r.get("timings", {}).items():
+                ET.SubElement(props, "property", {"name": f"timing.{stage}", "value": f"{timing['seconds']:.3f}"})
+            if r["actual"] == "timeout":
+                ET.SubElement(case, "error", {"message": "timed out"}).text = r["output_tail"]
+            elif not r["ok"]:
+                ET.SubElement(case, "failure", {
+                    "message": f"expected {r['expected']}, got {r['actual']}"
+                }).text = r["output_tail"]
+            ET.SubElement(case, "system-out").text = r["output_tail"]
+    ET.ElementTree(suites).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def print_table(results: List[dict]):
+    print("+--------------------------------+-----------+-----------+--------+----------+")
+    print("| Test Name                      | Expected  | Actual    | Status | Time (s) |")
+    print("+--------------------------------+-----------+-----------+--------+----------+")
+    for r in results:
+        mark = "✓" if r["ok"] else "✗"
+        print(f"| {os.path.basename(r['file']):<30} | {r['expected']:<9} | {r['actual']:<9} | {mark}      | {r['duration']:>8.1f} |")
+    print("+--------------------------------+-----------+-----------+--------+----------+")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run verify.sh regression suites in parallel")
+    parser.add_argument("--suite", choices=["examples", "regressions", "all"], default="all",
+                        help="Which suite to run (default: all)")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                        help="Number of cases to run concurrently (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="Per-case timeout in seconds (default: %(default)s)")
+    parser.add_argument("--filter", help="Only run cases whose path contains this substring")
+    parser.add_argument("--output-dir", default=os.path.join(REPO_ROOT, "regression-results"),
+                        help="Directory for logs and reports (default: %(default)s)")
+    parser.add_argument("--json", help="JSON report path (default: OUTPUT_DIR/results.json)")
+    parser.add_argument("--junit", help="JUnit XML report path (default: OUTPUT_DIR/junit.xml)")
+    parser.add_argument("--work-root", default=None, help="Parent directory for per-case work dirs")
+    parser.add_argument("--keep-workdirs", action="store_true", help="Do not delete per-case work dirs")
+    parser.add_argument("--local-llm", action="store_true", help="Pass --local-llm to the examples suite")
+    parser.add_argument("--model", help="Model passed to the examples suite")
+    parser.add_argument("--esbmc-exec", help="Custom ESBMC executable passed to verify.sh")
+    parser.add_argument("--verify-arg", action="append", default=[],
+                        help="Extra argument appended to every verify.sh invocation")
+    args = parser.parse_args()
+
+    if args.esbmc_exec and args.esbmc_exec.startswith("./"):
+        args.esbmc_exec = os.path.join(REPO_ROOT, args.esbmc_exec[2:])
+
+    cases: List[Case] = []
+    if args.suite in ("examples", "all"):
+        cases += load_examples_suite(os.path.join(REPO_ROOT, "regression.sh"))
+    if args.suite in ("regressions", "all"):
+        cases += load_regressions_suite(os.path.join(REPO_ROOT, "regressions"))
+    if args.filter:
+        cases = [c for c in cases if args.filter in c.path]
+    if not cases:
+        print("No test cases selected")
+        sys.exit(1)
+
+    output_dir = os.path.abspath(args.output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    json_path = args.json or os.path.join(output_dir, "results.json")
+    junit_path = args.junit or os.path.join(output_dir, "junit.xml")
+
+    jobs = max(1, args.jobs)
+    print(f"Running {len(cases)} cases with {jobs} workers (timeout {args.timeout:.0f}s)")
+    started = time.time()
+    results: Dict[str, dict] = {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(run_case, case, args, output_dir): case for case in cases}
+        for future in as_completed(futures):
+            case = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {
+                    "id": case.case_id, "suite": case.suite, "file": case.path,
+                    "expected": case.expected, "actual": "error", "ok": False,
+                    "returncode": None, "duration": 0.0, "stages": {}, "timings": {}, "log": None,
+                    "output_tail": str(e), "command": [],
+                }
+            results[case.case_id] = result
+            mark = "✓" if result["ok"] else "✗"
+            print(f"{mark} {case.case_id}: expected {case.expected}, got {result['actual']} "
+                  f"({result['duration']:.1f}s)", flush=True)
+
+    ordered = [results[c.case_id] for c in cases]
+    elapsed = time.time() - started
+    unexpected = [r for r in ordered if not r["ok"]]
+
+    report = {
+        "started": started,
+        "elapsed": round(elapsed, 3),
+        "jobs": jobs,
+        "timeout": args.timeout,
+        "total": len(ordered),
+        "passed": len(ordered) - len(unexpected),
+        "unexpected": len(unexpected),
+        "cases": ordered,
+    }
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    write_junit(ordered, junit_path)
+
+    print()
+    print_table(ordered)
+    print(f"\nTotal: {len(ordered)}  As expected: {report['passed']}  Unexpected: {len(unexpected)}  "
+          f"Elapsed: {elapsed:.1f}s")
+    print(f"JSON report: {json_path}")
+    print(f"JUnit report: {junit_path}")
+    sys.exit(0 if not unexpected else 1)
+
+
+if __name__ == "__main__":
+    main()
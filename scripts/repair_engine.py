@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""Bounded repair loop for LLM translations that do not parse.
+
+verify.sh drives the loop and calls the LLM itself; this module keeps the
+loop's state and makes the decisions:
+
+* ``start``   create or resume the state for (original, translation, model,
+  mode) and restore the latest repaired translation when resuming
+* ``next``    account for the prompt about to be sent and say whether the
+  attempt, wall-clock and token budgets allow it (exit 2 when exhausted;
+  ``--review`` exits 3 when the initial full review was already done)
+* ``check``   run the parse check; exit 0 when it passes, 1 with a feedback
+  file describing only the parse errors that changed, or 2 when the same
+  errors keep coming back
+
+State lives in ``<cache root>/repairs/<key>/`` (see translation_cache.py),
+so an interrupted run resumes with its attempts, budget and latest
+translation instead of starting over.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from translation_cache import cache_root, compute_key
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_MAX_SECONDS = 600
+DEFAULT_MAX_TOKENS = 200000
+DEFAULT_MAX_REPEATS = 2
+MAX_REPORTED_ERRORS = 30
+CHARS_PER_TOKEN = 4
+
+EXIT_OK = 0
+EXIT_CONTINUE = 1
+EXIT_STOP = 2
+EXIT_SKIP = 3
+
+STATE_NAME = "state.json"
+SNAPSHOT_NAME = "translation"
+
+ERROR_RE = re.compile(r"\berror\b", re.IGNORECASE)
+LOCATION_RE = re.compile(r"^(?P<file>[^:\s]+):(?P<line>\d+):(?:(?P<col>\d+):)?\s*")
+
+
+def default_state_root() -> str:
+    return os.path.join(cache_root(), "repairs")
+
+
+def _load(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save(path: str, state: Dict) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _elapsed(state: Dict) -> float:
+    return state["session_base"] + (time.time() - state["session_start"])
+
+
+def _estimate_tokens(paths: List[str]) -> int:
+    chars = 0
+    for path in paths:
+        try:
+            chars += os.path.getsize(path)
+        except OSError:
+            pass
+    return chars // CHARS_PER_TOKEN
+
+
+def parse_errors(output: str) -> List[Tuple[Optional[int], str]]:
+    """Return ``(line, message)`` for each error line in ESBMC/clang output."""
+    errors = []
+    seen = set()
+    for raw in output.splitlines():
+        if not ERROR_RE.search(raw):
+            continue
+        line = None
+        message = raw.strip()
+        m = LOCATION_RE.match(message)
+        if m:
+            line = int(m.group("line"))
+            message = message[m.end():]
+        if (line, message) not in seen:
+            seen.add((line, message))
+            errors.append((line, message))
+    return errors
+
+
+def signature(errors: List[Tuple[Optional[int], str]]) -> str:
+    """Errors without their positions, so edits that only shift lines still match."""
+    return "\n".join(sorted({msg for _, msg in errors}))
+
+
+def build_feedback(errors: List[Tuple[Optional[int], str]], previous: List[str], output: str,
+                   converted: str, attempt: int) -> str:
+    try:
+        with open(converted, errors="replace") as f:
+            source = f.read().splitlines()
+    except OSError:
+        source = []
+    previous_set = set(previous)
+    current_set = {msg for _, msg in errors}
+    new = [e for e in errors if e[1] not in previous_set]
+    still = [e for e in errors if e[1] in previous_set]
+    fixed = len(previous_set - current_set)
+
+    def describe(entries):
+        lines = []
+        for line, msg in entries[:MAX_REPORTED_ERRORS]:
+            where = f"line {line}" if line else "unknown line"
+            lines.append(f"  - {where}: {msg}")
+            if line and 0 < line <= len(source):
+                lines.append(f"      > {source[line - 1].strip()}")
+        if len(entries) > MAX_REPORTED_ERRORS:
+            lines.append(f"  ... {len(entries) - MAX_REPORTED_ERRORS} more")
+        return lines
+
+    out = [f"=== ESBMC PARSE ERRORS (repair attempt {attempt}) ===",
+           f"{os.path.basename(converted)} does not pass `esbmc --parse-tree-only`.",
+           "Fix only the errors below and keep the rest of the file unchanged.",
+           ""]
+    if new:
+        out += ["New errors:"] + describe(new) + [""]
+    if still:
+        out += ["Still failing after the previous fix:"] + describe(still) + [""]
+    if fixed:
+        out += [f"{fixed} error(s) from the previous attempt are fixed; do not reintroduce them.", ""]
+    if not errors:
+        tail = output.strip().splitlines()[-20:]
+        out += ["ESBMC output (no individual errors recognised):"] + [f"  {l}" for l in tail] + [""]
+    return "\n".join(out) + "\n"
+
+
+def cmd_start(args) -> int:
+    key = compute_key([args.original, args.converted] + (args.file or []),
+                      ["repair-v1"] + (args.value or []))
+    state_dir = os.path.join(args.state_root, key)
+    state_path = os.path.join(state_dir, STATE_NAME)
+    snapshot = os.path.join(state_dir, SNAPSHOT_NAME)
+
+    state = None
+    if os.path.exists(state_path):
+        try:
+            state = _load(state_path)
+        except (OSError, ValueError):
+            state = None
+    if state and state.get("status") == "gave_up":
+        # A finished, unsuccessful run starts over rather than failing at once
+        shutil.rmtree(state_dir, ignore_errors=True)
+        state = None
+
+    if state:
+        if os.path.exists(snapshot):
+            shutil.copyfile(snapshot, args.converted)
+        print(f"Resuming repair: {state['attempts']} attempt(s), "
+              f"{state['tokens']} tokens, {state['session_base']:.0f}s used so far", file=sys.stderr)
+    else:
+        os.makedirs(state_dir, exist_ok=True)
+        state = {"status": "running", "attempts": 0, "tokens": 0, "reviewed": False,
+                 "session_base": 0.0, "last_errors": [], "repeats": 0, "history": []}
+
+    state.update({
+        "max_attempts": args.max_attempts, "max_seconds": args.max_seconds,
+        "max_tokens": args.max_tokens, "max_repeats": args.max_repeats,
+        "session_start": time.time(),
+    })
+    _save(state_path, state)
+    print(state_path)
+    return EXIT_OK
+
+
+def _finish(state_path: str, state: Dict, status: str) -> None:
+    state["session_base"] = _elapsed(state)
+    state["session_start"] = time.time()
+    state["status"] = status
+    _save(state_path, state)
+
+
+def cmd_next(args) -> int:
+    state = _load(args.state)
+    if args.review and state["reviewed"]:
+        return EXIT_SKIP
+    tokens = _estimate_tokens(args.files or [])
+    reason = None
+    if state["attempts"] >= state["max_attempts"]:
+        reason = f"attempt limit reached ({state['max_attempts']})"
+    elif _elapsed(state) >= state["max_seconds"]:
+        reason = f"time budget exhausted ({state['max_seconds']}s)"
+    elif state["tokens"] + tokens > state["max_tokens"]:
+        reason = f"token budget exhausted ({state['tokens']} used, next prompt ~{tokens}, limit {state['max_tokens']})"
+    if reason:
+        print(f"Stopping repair: {reason}")
+        _finish(args.state, state, "gave_up")
+        return EXIT_STOP
+
+    state["attempts"] += 1
+    state["tokens"] += tokens
+    if args.review:
+        state["reviewed"] = True
+    state["session_base"] = _elapsed(state)
+    state["session_start"] = time.time()
+    _save(args.state, state)
+    print(f"Repair attempt {state['attempts']}/{state['max_attempts']} "
+          f"(~{tokens} tokens, {state['tokens']}/{state['max_tokens']} used)")
+    return EXIT_OK
+
+
+def cmd_check(args) -> int:
+    state = _load(args.state)
+    cmd = args.cmd[1:] if args.cmd and args.cmd[0] == "--" else args.cmd
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, errors="replace")
+    shutil.copyfile(args.converted, os.path.join(os.path.dirname(args.state), SNAPSHOT_NAME))
+
+    if result.returncode == 0:
+        print("Compilation successful")
+        _finish(args.state, state, "succeeded")
+        return EXIT_OK
+
+    errors = parse_errors(result.stdout)
+    sig = signature(errors)
+    previous = state["last_errors"]
+    state["repeats"] = state["repeats"] + 1 if sig == "\n".join(sorted(previous)) else 0
+    state["history"].append({"attempt": state["attempts"], "errors": len(errors)})
+    print(f"Compilation failing after attempt {state['attempts']}: {len(errors)} error(s)")
+
+    if state["repeats"] >= state["max_repeats"]:
+        print(f"Stopping repair: the same parse errors came back {state['repeats']} times")
+        _finish(args.state, state, "gave_up")
+        return EXIT_STOP
+
+    with open(args.feedback, "w") as f:
+        f.write(build_feedback(errors, previous, result.stdout, args.converted, state["attempts"]))
+    state["last_errors"] = sorted({msg for _, msg in errors})
+    state["session_base"] = _elapsed(state)
+    state["session_start"] = time.time()
+    _save(args.state, state)
+    return EXIT_CONTINUE
+
+
+def cmd_clear(args) -> int:
+    shutil.rmtree(args.state_root, ignore_errors=True)
+    return EXIT_OK
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budgeted, resumable repair loop state for verify.sh")
+    parser.add_argument("--state-root", default=os.environ.get("REPAIR_STATE_DIR", default_state_root()),
+                        help="Directory holding repair states (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("start", help="Create or resume a repair state; prints its path")
+    p.add_argument("--original", required=True, help="Source file being translated")
+    p.add_argument("--converted", required=True, help="Translation being repaired (restored on resume)")
+    p.add_argument("--file", action="append", help="Extra file whose contents identify the run")
+    p.add_argument("--value", action="append", help="Extra value identifying the run (e.g. model=...)")
+    p.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+    p.add_argument("--max-seconds", type=float, default=DEFAULT_MAX_SECONDS)
+    p.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS)
+    p.add_argument("--max-repeats", type=int, default=DEFAULT_MAX_REPEATS,
+                   help="Stop when the same errors come back this many times in a row")
+    p.set_defaults(func=cmd_start)
+
+    p = sub.add_parser("next", help="Charge the next prompt against the budget")
+    p.add_argument("--state", required=True)
+    p.add_argument("--review", action="store_true", help="This is the one-off full review round")
+    p.add_argument("--files", nargs="*", help="Files sent with the prompt (for the token estimate)")
+    p.set_defaults(func=cmd_next)
+
+    p = sub.add_parser("check", help="Run the parse check: check --state S --converted C --feedback F -- CMD")
+    p.add_argument("--state", required=True)
+    p.add_argument("--converted", required=True)
+    p.add_argument("--feedback", required=True, help="Where to write the feedback prompt")
+    p.add_argument("cmd", nargs=argparse.REMAINDER)
+    p.set_defaults(func=cmd_check)
+
+    p = sub.add_parser("clear", help="Remove all repair states")
+    p.set_defaults(func=cmd_clear)
+
+    args = parser.parse_args()
+    if args.command == "check" and not args.cmd:
+        parser.error("check requires a command")
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Bundle the C++ runtime headers into one file for ESBMC runs.
+
+Shedskin output includes ``builtin.hpp``, which pulls in ``list.hpp``,
+``dict.hpp``, ``set.hpp``, ``string.hpp``, ``tuple.hpp`` and the rest, and
+every ESBMC run opens, lexes and guard-checks each of them again. ESBMC has
+no precompiled headers, so the bundle is the nearest equivalent: the
+headers reachable from ``builtin.hpp`` are inlined at their first include,
+in the order the preprocessor would see them. Comments are stripped, blank
+lines collapsed, and repeated unconditional system includes dropped. System
+headers and conditionals are left to ESBMC's own preprocessor: expanding
+them here would bring in the host's C++ library instead of ESBMC's models,
+and would evaluate ``#if`` with the host compiler's macros.
+
+``install`` writes the bundle as ``builtin.hpp`` into a directory and
+replaces every bundled header with a one-line ``#include "builtin.hpp"``,
+so a file that includes one of them before ``builtin.hpp`` (Shedskin output
+never does) gets the whole runtime at that point. Headers outside the
+bundle are copied unchanged. Bundles are cached by the content hash of
+the runtime headers::
+
+    python3 scripts/runtime_bundle.py install "$TEMP_DIR"
+    python3 scripts/runtime_bundle.py build --output bundle.hpp
+"""
+
+import argparse
+import glob
+import os
+import re
+import shutil
+import sys
+import tempfile
+from typing import List, Optional, Tuple
+
+from translation_cache import cache_root, compute_key, get, put
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUNDLE_FORMAT_VERSION = "1"
+ROOT_HEADER = "builtin.hpp"
+
+LOCAL_INCLUDE_RE = re.compile(r'^\s*#\s*include\s*"([^"]+)"')
+SYSTEM_INCLUDE_RE = re.compile(r"^\s*#\s*include\s*<([^>]+)>")
+IF_RE = re.compile(r"^\s*#\s*if")
+ENDIF_RE = re.compile(r"^\s*#\s*endif\b")
+GUARD_RE = re.compile(r"^\s*#\s*ifndef\s+(\w+)\s*\n\s*#\s*define\s+(\w+)")
+
+
+def default_cache_dir() -> str:
+    return os.path.join(cache_root(), "runtime_bundle")
+
+
+def runtime_headers(runtime_dir: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(runtime_dir, "*.hpp")))
+
+
+def strip_comments(text: str) -> str:
+    """Remove C/C++ comments outside string and character literals."""
+    out = []
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c == "/" and text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end < 0 else end
+        elif c == "/" and text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            end = n if end < 0 else end + 2
+            # Keep the line count so a directive never joins the previous line
+            out.append(" " + "\n" * text.count("\n", i, end))
+            i = end
+        elif c in "\"'":
+            j = i + 1
+            while j < n and text[j] != c and text[j] != "\n":
+                j += 2 if text[j] == "\\" else 1
+            out.append(text[i:j + 1])
+            i = j + 1
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+
+def _compact(lines: List[str]) -> List[str]:
+    result = []
+    for line in lines:
+        line = line.rstrip()
+        if line or (result and result[-1]):
+            result.append(line)
+    return result
+
+
+def bundle(runtime_dir: str, root: str = ROOT_HEADER) -> Tuple[str, List[str]]:
+    """Text of the bundle and the headers inlined into it, in inclusion order."""
+    members: List[str] = []
+    system_seen = set()
+    out: List[str] = []
+
+    def inline(name: str) -> None:
+        members.append(name)
+        with open(os.path.join(runtime_dir, name), encoding="utf-8", errors="replace") as f:
+            text = strip_comments(f.read())
+        guard = GUARD_RE.match(text)
+        # Directives at this depth are unconditional within the header
+        base = 1 if guard and guard.group(1) == guard.group(2) else 0
+        depth = 0
+        out.append(f"// ---- {name} ----")
+        for line in text.splitlines():
+            m = LOCAL_INCLUDE_RE.match(line)
+            if m and depth == base and os.path.isfile(os.path.join(runtime_dir, m.group(1))):
+                if m.group(1) not in members:
+                    inline(m.group(1))
+                continue
+            m = SYSTEM_INCLUDE_RE.match(line)
+            if m and depth == base:
+                if m.group(1) in system_seen:
+                    continue
+                system_seen.add(m.group(1))
+            if IF_RE.match(line):
+                depth += 1
+            elif ENDIF_RE.match(line):
+                depth -= 1
+            out.append(line)
+
+    inline(root)
+    header = [f"// Generated by scripts/runtime_bundle.py from {', '.join(members)}"]
+    return "\n".join(header + _compact(out)) + "\n", members
+
+
+def bundle_key(runtime_dir: str) -> str:
+    return compute_key(runtime_headers(runtime_dir), [f"runtime-bundle-v{BUNDLE_FORMAT_VERSION}", ROOT_HEADER])
+
+
+def install(runtime_dir: str, dest: str, cache_dir: Optional[str]) -> List[str]:
+    """Copy the runtime headers into dest with the bundled ones replaced; returns the bundled names."""
+    key = bundle_key(runtime_dir)
+    target = os.path.join(dest, ROOT_HEADER)
+    meta = get(cache_dir, key, target) if cache_dir else None
+    if meta is not None:
+        members = meta["members"]
+    else:
+        text, members = bundle(runtime_dir)
+        with tempfile.NamedTemporaryFile("w", dir=dest, suffix=".hpp", delete=False, encoding="utf-8") as f:
+            f.write(text)
+        os.replace(f.name, target)
+        shutil.copymode(os.path.join(runtime_dir, ROOT_HEADER), target)
+        if cache_dir:
+            put(cache_dir, key, target, {"members": members})
+
+    for path in runtime_headers(runtime_dir):
+        name = os.path.basename(path)
+        if name == ROOT_HEADER:
+            continue
+        if name in members:
+            with open(os.path.join(dest, name), "w", encoding="utf-8") as f:
+                f.write(f'// Bundled into {ROOT_HEADER} by scripts/runtime_bundle.py\n#include "{ROOT_HEADER}"\n')
+        else:
+            shutil.copyfile(path, os.path.join(dest, name))
+    return members
+
+
+def cmd_install(args) -> int:
+    if not os.path.isdir(args.dest):
+        print(f"Error: {args.dest} is not a directory", file=sys.stderr)
+        return 1
+    if not os.path.isfile(os.path.join(args.runtime_dir, ROOT_HEADER)):
+        print(f"Error: {ROOT_HEADER} not found in {args.runtime_dir}", file=sys.stderr)
+        return 1
+    members = install(args.runtime_dir, args.dest, None if args.no_cache else args.cache_dir)
+    print(f"Runtime headers bundled into {ROOT_HEADER}: {', '.join(members)}")
+    return 0
+
+
+def cmd_build(args) -> int:
+    text, _ = bundle(args.runtime_dir)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+def cmd_key(args) -> int:
+    print(bundle_key(args.runtime_dir))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bundle the C++ runtime headers for ESBMC")
+    parser.add_argument("--runtime-dir", default=REPO_ROOT, help="Where the *.hpp files are (default: %(default)s)")
+    parser.add_argument("--cache-dir", default=default_cache_dir(), help="Bundle cache (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("install", help="Write the bundle and header stubs into DEST")
+    p.add_argument("--no-cache", action="store_true", help="Rebuild the bundle without the cache")
+    p.add_argument("dest")
+    p.set_defaults(func=cmd_install)
+
+    p = sub.add_parser("build", help="Print the bundle")
+    p.add_argument("--output", help="Write it here instead")
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser("key", help="Print the cache key of the current headers")
+    p.set_defaults(func=cmd_key)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,26 @@
 #!/usr/bin/env python3
-"""Utility to massage Python files into a Shedskin-friendly subset."""
+"""Utility to massage Python files into a Shedskin-friendly subset.
+
+The rewrites are passes of one fused traversal: each pass hooks the node
+types it cares about, and the tree is walked once. Results are cached per
+module, keyed by the source hash, and a directory is processed in parallel::
+
+    python3 scripts/shedskin_prepare.py input.py output.py
+    python3 scripts/shedskin_prepare.py --jobs 8 aws_examples/ prepared/
+"""
 
 import argparse
 import ast
 import copy
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from translation_cache import cache_root, compute_key, get, put
+
+# Bump when a pass changes its output
+PIPELINE_VERSION = "1"
 
 
 def is_dataclass_decorator(dec):
@@ -22,9 +39,45 @@ def is_enum_base(base):
     return False
 
 
-class DataclassTransformer(ast.NodeTransformer):
-    def visit_ClassDef(self, node):  # noqa: N802
+class RewritePass:
+    """One rewrite in the fused traversal.
+
+    ``enter_<NodeType>(node)`` runs before the node's children are visited
+    and ``leave_<NodeType>(node)`` after them; ``leave_`` returns the node or
+    its replacement. Passes run in pipeline order at every node. Once a pass
+    replaces a node with one of another type, the later passes' hooks for
+    the old type are skipped.
+    """
+
+
+class FusedTransformer(ast.NodeTransformer):
+    """Runs several passes in a single walk of the tree."""
+
+    def __init__(self, passes: List[RewritePass]):
+        self.passes = passes
+        self._hooks: Dict[Tuple[str, type], list] = {}
+
+    def _for(self, phase: str, node_type: type) -> list:
+        key = (phase, node_type)
+        if key not in self._hooks:
+            name = f"{phase}_{node_type.__name__}"
+            self._hooks[key] = [getattr(p, name) for p in self.passes if hasattr(p, name)]
+        return self._hooks[key]
+
+    def visit(self, node):
+        node_type = type(node)
+        for hook in self._for("enter", node_type):
+            hook(node)
         node = self.generic_visit(node)
+        for hook in self._for("leave", node_type):
+            node = hook(node)
+            if type(node) is not node_type:
+                break
+        return node
+
+
+class DataclassTransformer(RewritePass):
+    def leave_ClassDef(self, node):  # noqa: N802
         has_dataclass = any(is_dataclass_decorator(d) for d in node.decorator_list)
         node.decorator_list = [d for d in node.decorator_list if not is_dataclass_decorator(d)]
 
@@ -77,23 +130,49 @@ class DataclassTransformer(ast.NodeTransformer):
         return init_func
 
 
-class LambdaLifter(ast.NodeTransformer):
+class LambdaLifter(RewritePass):
+    """Lambdas become module-level functions, numbered in source order.
+
+    Lambdas in a lifted lambda's own parameter defaults are kept as they are.
+    """
+
     def __init__(self):
         self.counter = 0
         self.new_funcs = []
+        self.names: Dict[int, str] = {}
+        self.lifted_args = set()
+        self.in_lifted_args = 0
 
-    def visit_Module(self, node):  # noqa: N802
-        node = self.generic_visit(node)
+    def leave_Module(self, node):  # noqa: N802
         node.body.extend(self.new_funcs)
         return node
 
-    def visit_Lambda(self, node):  # noqa: N802
-        name = f"__shedskin_lambda_{self.counter}"
+    def enter_Lambda(self, node):  # noqa: N802
+        if self.in_lifted_args:
+            return
+        # Numbered on the way down so an outer lambda precedes the ones inside it
+        self.names[id(node)] = f"__shedskin_lambda_{self.counter}"
         self.counter += 1
+        self.lifted_args.add(id(node.args))
+
+    def enter_arguments(self, node):  # noqa: N802
+        if id(node) in self.lifted_args:
+            self.in_lifted_args += 1
+
+    def leave_arguments(self, node):  # noqa: N802
+        if id(node) in self.lifted_args:
+            self.lifted_args.discard(id(node))
+            self.in_lifted_args -= 1
+        return node
+
+    def leave_Lambda(self, node):  # noqa: N802
+        name = self.names.pop(id(node), None)
+        if name is None:
+            return node
         func_def = ast.FunctionDef(
             name=name,
             args=copy.deepcopy(node.args),
-            body=[ast.Return(value=self.visit(node.body))],
+            body=[ast.Return(value=node.body)],
             decorator_list=[],
             returns=None,
         )
@@ -102,13 +181,12 @@ class LambdaLifter(ast.NodeTransformer):
         return ast.Name(id=name, ctx=ast.Load())
 
 
-class AttrCallRewriter(ast.NodeTransformer):
+class AttrCallRewriter(RewritePass):
     def __init__(self):
         self.need_has = False
         self.need_set = False
 
-    def visit_Module(self, node):  # noqa: N802
-        node = self.generic_visit(node)
+    def leave_Module(self, node):  # noqa: N802
         helpers = []
         if self.need_has:
             helpers.append(self._make_has_helper())
@@ -117,8 +195,7 @@ class AttrCallRewriter(ast.NodeTransformer):
         node.body = helpers + node.body
         return node
 
-    def visit_Call(self, node):  # noqa: N802
-        node = self.generic_visit(node)
+    def leave_Call(self, node):  # noqa: N802
         if isinstance(node.func, ast.Name):
             if node.func.id == "hasattr" and len(node.args) == 2:
                 self.need_has = True
@@ -183,28 +260,97 @@ class AttrCallRewriter(ast.NodeTransformer):
         return helper
 
 
+# Pass classes in the order they run; each source gets fresh instances
+PASSES = (AttrCallRewriter, LambdaLifter, DataclassTransformer)
+
+
 def transform_source(source: str) -> str:
     tree = ast.parse(source)
-    tree = AttrCallRewriter().visit(tree)
-    tree = LambdaLifter().visit(tree)
-    tree = DataclassTransformer().visit(tree)
+    tree = FusedTransformer([cls() for cls in PASSES]).visit(tree)
     ast.fix_missing_locations(tree)
     return ast.unparse(tree)
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Prepare Python file for Shedskin")
-    parser.add_argument("input", help="Input Python file")
-    parser.add_argument("output", help="Output Python file")
-    args = parser.parse_args()
+def default_cache_dir() -> str:
+    return os.path.join(cache_root(), "shedskin_prepare")
+
 
-    with open(args.input, "r", encoding="utf-8") as f:
+def cache_key(input_path: str) -> str:
+    # ast.unparse output differs between Python versions
+    return compute_key([input_path], [f"shedskin-prepare-v{PIPELINE_VERSION}",
+                                      ",".join(cls.__name__ for cls in PASSES),
+                                      "python=%d.%d" % sys.version_info[:2]])
+
+
+def prepare_file(input_path: str, output_path: str, cache_dir: Optional[str]) -> str:
+    """Transform one file; returns "cached" or "transformed"."""
+    key = cache_key(input_path) if cache_dir else None
+    out_dir = os.path.dirname(output_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    if key and get(cache_dir, key, output_path) is not None:
+        return "cached"
+
+    with open(input_path, "r", encoding="utf-8") as f:
         src = f.read()
 
     transformed = transform_source(src)
 
-    with open(args.output, "w", encoding="utf-8") as f:
+    with open(output_path, "w", encoding="utf-8") as f:
         f.write(transformed)
+    if key:
+        put(cache_dir, key, output_path, {"source": os.path.abspath(input_path)})
+    return "transformed"
+
+
+def _prepare_job(job: Tuple[str, str, Optional[str]]) -> Tuple[str, str, Optional[str]]:
+    input_path, output_path, cache_dir = job
+    try:
+        return input_path, prepare_file(input_path, output_path, cache_dir), None
+    except (SyntaxError, UnicodeDecodeError, OSError) as e:
+        return input_path, "error", str(e)
+
+
+def prepare_tree(input_dir: str, output_dir: str, cache_dir: Optional[str], jobs: int) -> int:
+    """Transform every .py file under input_dir into the same layout under output_dir."""
+    work = []
+    for root, dirs, files in os.walk(input_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d != "__pycache__")
+        for name in sorted(files):
+            if name.endswith(".py"):
+                src = os.path.join(root, name)
+                work.append((src, os.path.join(output_dir, os.path.relpath(src, input_dir)), cache_dir))
+
+    counts = {"cached": 0, "transformed": 0, "error": 0}
+    if jobs > 1 and len(work) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_prepare_job, work, chunksize=4))
+    else:
+        results = [_prepare_job(job) for job in work]
+    for path, status, error in results:
+        counts[status] += 1
+        if error:
+            print(f"Error: {path}: {error}", file=sys.stderr)
+    print(f"{len(work)} files: {counts['transformed']} transformed, {counts['cached']} cached, "
+          f"{counts['error']} failed", file=sys.stderr)
+    return 1 if counts["error"] else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepare Python file for Shedskin")
+    parser.add_argument("input", help="Input Python file, or a directory to process recursively")
+    parser.add_argument("output", help="Output Python file, or the output directory")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for a directory (default: %(default)s)")
+    parser.add_argument("--cache-dir", default=default_cache_dir(),
+                        help="Per-module result cache (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the cache")
+    args = parser.parse_args()
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    if os.path.isdir(args.input):
+        sys.exit(prepare_tree(args.input, args.output, cache_dir, max(args.jobs, 1)))
+    prepare_file(args.input, args.output, cache_dir)
 
 
 if __name__ == "__main__":
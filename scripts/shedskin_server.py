@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""Resident Shedskin translation server.
+
+``shedskin translate`` is a fresh interpreter every time: Python start-up,
+the import of shedskin and its dependencies, and the lookup of its library
+modules come before any type inference happens. The server imports
+shedskin once and answers translate requests sent over a Unix socket. Each
+request is handled in a process forked from the warm server, so shedskin's
+global analysis state never leaks from one translation into the next and
+several requests can run at the same time.
+
+The generated ``.cpp``/``.hpp`` files (and ``Makefile``) are written to the
+request's working directory, as ``shedskin translate`` does, and are also
+returned in the response.
+
+The ``translate`` subcommand forwards a ``shedskin translate`` command line
+and exits with ``FALLBACK_EXIT`` (75) when the server is not running, so
+callers can fall back to running shedskin directly::
+
+    python3 scripts/shedskin_server.py start
+    python3 scripts/shedskin_server.py translate program.py
+    python3 scripts/shedskin_server.py stop
+
+Python callers use :class:`Client`.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import pkgutil
+import runpy
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from typing import Callable, Dict, List, Optional
+
+FALLBACK_EXIT = 75
+START_TIMEOUT = 60
+# Files shedskin translate writes into the working directory
+OUTPUT_SUFFIXES = (".cpp", ".hpp")
+OUTPUT_NAMES = ("Makefile",)
+
+
+def socket_path() -> str:
+    return os.environ.get("ESBMC_SHEDSKIN_SOCKET") or os.path.join(
+        tempfile.gettempdir(), f"esbmc-shedskin-{os.getuid()}.sock")
+
+
+class Client:
+    """Sends requests to a running server; every call opens one short connection."""
+
+    def __init__(self, path: Optional[str] = None, timeout: Optional[float] = None):
+        self.path = path or socket_path()
+        self.timeout = timeout
+
+    def request(self, payload: Dict) -> Dict:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            sock.sendall(json.dumps(payload).encode() + b"\n")
+            with sock.makefile("rb") as f:
+                line = f.readline()
+        if not line:
+            raise ConnectionError("Shedskin server closed the connection")
+        return json.loads(line)
+
+    def available(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        try:
+            return Client(self.path, timeout=2).request({"cmd": "ping"}).get("ok", False)
+        except (OSError, ValueError):
+            return False
+
+    def translate(self, args: List[str], cwd: Optional[str] = None) -> Dict:
+        """Run ``shedskin translate ARGS``; the response has ``exit``, ``output`` and ``files``."""
+        return self.request({"cmd": "translate", "args": args, "cwd": os.path.abspath(cwd or os.getcwd())})
+
+
+def _load_shedskin() -> Callable[[], Optional[int]]:
+    """The shedskin command-line entry point, imported together with its modules."""
+    import shedskin
+    from importlib.metadata import entry_points
+
+    found = [ep for ep in entry_points(group="console_scripts") if ep.name == "shedskin"]
+    if found:
+        entry = found[0].load()
+    else:
+        def entry():
+            runpy.run_module("shedskin", run_name="__main__")
+
+    # Import the translator's modules now rather than in every request
+    for module in pkgutil.walk_packages(shedskin.__path__, "shedskin."):
+        try:
+            importlib.import_module(module.name)
+        except Exception:
+            pass
+    return entry
+
+
+def _outputs(cwd: str) -> Dict[str, float]:
+    result = {}
+    for name in os.listdir(cwd):
+        if name.endswith(OUTPUT_SUFFIXES) or name in OUTPUT_NAMES:
+            try:
+                result[name] = os.stat(os.path.join(cwd, name)).st_mtime_ns
+            except OSError:
+                pass
+    return result
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            req = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        cmd = req.get("cmd")
+        if cmd == "ping":
+            resp = {"ok": True, "pid": os.getppid()}
+        elif cmd == "translate":
+            resp = self.translate(req)
+        elif cmd == "shutdown":
+            resp = {"ok": True}
+            os.kill(os.getppid(), signal.SIGTERM)
+        else:
+            resp = {"ok": False, "output": f"Unknown command: {cmd}"}
+        self.wfile.write(json.dumps(resp).encode() + b"\n")
+
+    def translate(self, req: Dict) -> Dict:
+        # Runs in the forked child, which exits after this request
+        cwd = req.get("cwd") or os.getcwd()
+        try:
+            os.chdir(cwd)
+        except OSError as e:
+            return {"ok": False, "exit": 1, "output": f"Error: {e}\n", "files": {}}
+        before = _outputs(cwd)
+        log = tempfile.TemporaryFile()
+        saved = os.dup(1), os.dup(2)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        sys.argv = ["shedskin", "translate"] + list(req.get("args", []))
+        try:
+            code = self.server.entry()
+        except SystemExit as e:
+            code = e.code
+        except Exception:
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+        if code is None:
+            code = 0
+        elif not isinstance(code, int):
+            print(code, file=sys.stderr)
+            code = 1
+        log.seek(0)
+        output = log.read().decode(errors="replace")
+
+        files = {}
+        for name, mtime in _outputs(cwd).items():
+            if before.get(name) != mtime:
+                with open(os.path.join(cwd, name), encoding="utf-8", errors="replace") as f:
+                    files[name] = f.read()
+        return {"ok": code == 0, "exit": code, "output": output, "files": files}
+
+
+class _Server(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    pass
+
+
+def serve(path: str) -> None:
+    if Client(path).available():
+        print(f"Shedskin server already running at {path}", file=sys.stderr)
+        return
+    if os.path.exists(path):
+        os.unlink(path)
+    entry = _load_shedskin()
+    old_umask = os.umask(0o077)
+    try:
+        server = _Server(path, _Handler)
+    finally:
+        os.umask(old_umask)
+    server.entry = entry
+
+    def stop(_signum, _frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    print(f"Shedskin server listening on {path} (pid {os.getpid()})", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def start(path: str) -> bool:
+    """Start the server in the background unless it is running; returns True once it answers."""
+    client = Client(path)
+    if client.available():
+        return True
+    log_path = path + ".log"
+    with open(log_path, "ab") as log:
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "--socket", path, "serve"],
+                         stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True)
+    deadline = time.time() + START_TIMEOUT
+    while time.time() < deadline:
+        if client.available():
+            return True
+        time.sleep(0.2)
+    print(f"Shedskin server did not come up; see {log_path}", file=sys.stderr)
+    return False
+
+
+def translate_command(path: str, argv: List[str]) -> int:
+    """Forward a shedskin translate command line to the server."""
+    client = Client(path)
+    if not os.path.exists(client.path):
+        return FALLBACK_EXIT
+    try:
+        resp = client.translate(argv)
+    except (OSError, ValueError):
+        return FALLBACK_EXIT
+    sys.stdout.write(resp.get("output", ""))
+    sys.stdout.flush()
+    return resp.get("exit", 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident Shedskin translation server")
+    parser.add_argument("--socket", default=socket_path(), help="Unix socket path (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", help="Run the server in the foreground")
+    sub.add_parser("start", help="Start the server in the background")
+    sub.add_parser("stop", help="Stop the server")
+    sub.add_parser("status", help="Report whether the server is running")
+    sub.add_parser("path", help="Print the socket path")
+    sub.add_parser("translate", help="Forward a shedskin translate command line (everything after 'translate')")
+
+    # Everything after "translate" belongs to shedskin, including its options
+    argv = sys.argv[1:]
+    translate_argv: List[str] = []
+    if "translate" in argv:
+        i = argv.index("translate")
+        argv, translate_argv = argv[:i + 1], argv[i + 1:]
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            serve(args.socket)
+        except ImportError as e:
+            print(f"Error: shedskin is not installed: {e}", file=sys.stderr)
+            sys.exit(1)
+    elif args.command == "start":
+        sys.exit(0 if start(args.socket) else 1)
+    elif args.command == "stop":
+        client = Client(args.socket, timeout=5)
+        if client.available():
+            client.request({"cmd": "shutdown"})
+    elif args.command == "status":
+        running = Client(args.socket).available()
+        print(f"{args.socket}: {'running' if running else 'stopped'}")
+        sys.exit(0 if running else 1)
+    elif args.command == "path":
+        print(args.socket)
+    elif args.command == "translate":
+        sys.exit(translate_command(args.socket, translate_argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""Static call-graph slicer for Python programs before translation.
+
+Keeps only the code reachable from an entry point:
+
+* the transitive call graph of the entry, following plain calls by name
+  and method calls by attribute name into the classes that are kept
+* the classes, module-level assignments and imports that reachable code
+  refers to (classes keep their dunder methods and the methods reachable
+  code calls)
+
+Functions that reachable code calls but that lie beyond ``--depth`` become
+stubs returning a nondeterministic value of their (annotated or inferred)
+return type, using the ``nondet_*`` helpers from esbmc.py. Everything else
+is dropped. The entry is one of:
+
+* ``FUNC`` or ``Class.method``: the module-level code is replaced by a
+  harness calling it with nondeterministic arguments
+* ``line:N``: the function containing line N (e.g. an assertion), as above;
+  module-level code when the line is not inside a function
+* ``__main__``: the module-level code itself (dead code elimination)
+
+::
+
+    python3 scripts/slicer.py --entry handle_request app.py -o app_sliced.py
+    python3 scripts/slicer.py --entry line:120 --depth 2 app.py
+"""
+
+import argparse
+import ast
+import copy
+import sys
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple, Union
+
+FunctionNode = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+
+NONDET_IMPORT = "from esbmc import nondet_bool, nondet_int"
+STUB_DOC = "Sliced out by scripts/slicer.py: returns a nondeterministic value."
+MAIN = "__main__"
+
+
+def _names(node: ast.AST) -> Tuple[Set[str], Set[str]]:
+    """Names and attribute names used anywhere under ``node``."""
+    names, attrs = set(), set()
+    for sub in ast.walk(node):
+        if isinstance(sub, ast.Name):
+            names.add(sub.id)
+        elif isinstance(sub, ast.Attribute):
+            attrs.add(sub.attr)
+    return names, attrs
+
+
+def _bound_names(stmt: ast.stmt) -> Set[str]:
+    if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return {stmt.name}
+    if isinstance(stmt, (ast.Import, ast.ImportFrom)):
+        return {(a.asname or a.name).split(".")[0] for a in stmt.names}
+    targets = []
+    if isinstance(stmt, ast.Assign):
+        targets = stmt.targets
+    elif isinstance(stmt, (ast.AnnAssign, ast.AugAssign)):
+        targets = [stmt.target]
+    return {n.id for t in targets for n in ast.walk(t) if isinstance(n, ast.Name)}
+
+
+def _is_definition(stmt: ast.stmt) -> bool:
+    if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef,
+                         ast.Import, ast.ImportFrom, ast.Assign, ast.AnnAssign, ast.AugAssign)):
+        return True
+    # The module docstring
+    return isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant) and isinstance(stmt.value.value, str)
+
+
+def _return_kind(fn: FunctionNode) -> str:
+    """'int', 'bool', 'float', 'none' or 'object', from the annotation or the return statements."""
+    if fn.returns is not None:
+        text = ast.unparse(fn.returns)
+        for kind in ("bool", "int", "float"):
+            if text == kind:
+                return kind
+        return "none" if text == "None" else "object"
+    kinds = set()
+    for sub in ast.walk(fn):
+        if isinstance(sub, ast.Return) and sub.value is not None:
+            v = sub.value
+            if isinstance(v, ast.Constant) and isinstance(v.value, bool):
+                kinds.add("bool")
+            elif isinstance(v, (ast.Compare, ast.BoolOp)) or (isinstance(v, ast.UnaryOp) and isinstance(v.op, ast.Not)):
+                kinds.add("bool")
+            elif isinstance(v, ast.Constant) and isinstance(v.value, int):
+                kinds.add("int")
+            elif isinstance(v, ast.BinOp):
+                kinds.add("int")
+            else:
+                kinds.add("object")
+    if not kinds:
+        return "none"
+    return kinds.pop() if len(kinds) == 1 else "object"
+
+
+def _nondet(kind: str) -> Optional[str]:
+    return {"int": "nondet_int()", "bool": "nondet_bool()",
+            "float": "float(nondet_int())", "object": "None"}.get(kind)
+
+
+def make_stub(fn: FunctionNode) -> FunctionNode:
+    value = _nondet(_return_kind(fn))
+    stub = copy.copy(fn)
+    stub.body = [ast.Expr(ast.Constant(STUB_DOC)),
+                 ast.Return(ast.parse(value, mode="eval").body) if value else ast.Pass()]
+    return stub
+
+
+def _arg_value(arg: ast.arg) -> str:
+    kind = ast.unparse(arg.annotation) if arg.annotation is not None else "int"
+    return _nondet(kind if kind in ("int", "bool", "float") else "object") or "None"
+
+
+def _call_args(fn: FunctionNode, skip_self: bool) -> str:
+    params = fn.args.posonlyargs + fn.args.args
+    if skip_self:
+        params = params[1:]
+    required = params[:len(params) - len(fn.args.defaults)]
+    return ", ".join(_arg_value(a) for a in required)
+
+
+class Slicer:
+    def __init__(self, tree: ast.Module, max_depth: Optional[int] = None):
+        self.tree = tree
+        self.max_depth = max_depth
+        self.functions: Dict[str, FunctionNode] = {}
+        self.classes: Dict[str, ast.ClassDef] = {}
+        self.globals: Dict[str, List[ast.stmt]] = {}
+        for stmt in tree.body:
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.functions[stmt.name] = stmt
+            elif isinstance(stmt, ast.ClassDef):
+                self.classes[stmt.name] = stmt
+            elif _is_definition(stmt):
+                for name in _bound_names(stmt):
+                    self.globals.setdefault(name, []).append(stmt)
+
+        self.kept_functions: Set[str] = set()
+        self.stubbed: Set[str] = set()
+        self.kept_classes: Set[str] = set()
+        self.kept_methods: Dict[str, Set[str]] = {}
+        self.kept_globals: Set[int] = set()
+        self.attrs: Set[str] = set()
+
+    def resolve_entry(self, entry: str) -> Tuple[Optional[str], Optional[str]]:
+        """(class, function) for an entry spec; (None, None) for module-level code."""
+        if entry == MAIN:
+            return None, None
+        if entry.startswith("line:"):
+            line = int(entry[5:])
+            for stmt in self.tree.body:
+                if not (stmt.lineno <= line <= stmt.end_lineno):
+                    continue
+                if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    return None, stmt.name
+                if isinstance(stmt, ast.ClassDef):
+                    for item in stmt.body:
+                        if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and \
+                                item.lineno <= line <= item.end_lineno:
+                            return stmt.name, item.name
+            return None, None
+        cls, _, method = entry.rpartition(".")
+        if cls:
+            if cls not in self.classes or not any(
+                    getattr(i, "name", None) == method for i in self.classes[cls].body):
+                raise SystemExit(f"Error: no method {entry}")
+            return cls, method
+        if entry not in self.functions:
+            raise SystemExit(f"Error: no module-level function {entry}")
+        return None, entry
+
+    def run(self, entry: str) -> Tuple[Optional[str], Optional[str]]:
+        cls, fn = self.resolve_entry(entry)
+        # Breadth-first over (node, depth), so that every function is kept or
+        # stubbed by its shortest call path whatever the set iteration order
+        work: Deque[Tuple[ast.AST, int]] = deque()
+        if fn is None:
+            work += [(stmt, 0) for stmt in self.tree.body if not _is_definition(stmt)]
+        elif cls is None:
+            self.kept_functions.add(fn)
+            work.append((self.functions[fn], 0))
+        else:
+            self._keep_class(cls, work, 0)
+            self.kept_methods[cls].add(fn)
+            self._push(work, self._method(cls, fn), 0)
+
+        while work:
+            node, depth = work.popleft()
+            names, attrs = _names(node)
+            new_attrs = attrs - self.attrs
+            self.attrs |= attrs
+            for name in sorted(names):
+                if name in self.functions and name not in self.kept_functions:
+                    if self.max_depth is not None and depth >= self.max_depth:
+                        self.stubbed.add(name)
+                    else:
+                        self.stubbed.discard(name)
+                        self.kept_functions.add(name)
+                        self._push(work, self.functions[name], depth + 1)
+                elif name in self.classes and name not in self.kept_classes:
+                    self._keep_class(name, work, depth)
+                for stmt in self.globals.get(name, []):
+                    if id(stmt) not in self.kept_globals:
+                        self.kept_globals.add(id(stmt))
+                        self._push(work, stmt, depth)
+            # A new attribute name can make methods of already kept classes reachable
+            for cls_name in sorted(self.kept_classes):
+                self._add_methods(cls_name, new_attrs, work, depth)
+        return cls, fn
+
+    @staticmethod
+    def _push(work: Deque[Tuple[ast.AST, int]], node: ast.AST, depth: int) -> None:
+        # Depths in the queue differ by at most one (0-1 BFS): a node no deeper
+        # than the head goes in front, so the queue stays ordered by depth
+        if work and depth <= work[0][1]:
+            work.appendleft((node, depth))
+        else:
+            work.append((node, depth))
+
+    def _method(self, cls: str, name: str) -> FunctionNode:
+        return next(i for i in self.classes[cls].body if getattr(i, "name", None) == name)
+
+    def _keep_class(self, name: str, work: Deque, depth: int) -> None:
+        self.kept_classes.add(name)
+        self.kept_methods[name] = set()
+        node = self.classes[name]
+        # Bases, decorators and class-level statements other than methods
+        for part in node.bases + node.keywords + node.decorator_list:
+            self._push(work, part, depth)
+        for item in node.body:
+            if not isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self._push(work, item, depth)
+            elif item.name.startswith("__") and item.name.endswith("__"):
+                self.kept_methods[name].add(item.name)
+                self._push(work, item, depth + 1)
+        self._add_methods(name, self.attrs, work, depth)
+
+    def _add_methods(self, cls: str, attrs: Set[str], work: Deque, depth: int) -> None:
+        for item in self.classes[cls].body:
+            if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and \
+                    item.name in attrs and item.name not in self.kept_methods[cls]:
+                self.kept_methods[cls].add(item.name)
+                self._push(work, item, depth + 1)
+
+    def harness(self, cls: Optional[str], fn: str) -> ast.stmt:
+        if cls is None:
+            call = f"{fn}({_call_args(self.functions[fn], False)})"
+        else:
+            method = self._method(cls, fn)
+            decorators = {d.id for d in method.decorator_list if isinstance(d, ast.Name)}
+            if "staticmethod" in decorators:
+                call = f"{cls}.{fn}({_call_args(method, False)})"
+            elif "classmethod" in decorators:
+                call = f"{cls}.{fn}({_call_args(method, True)})"
+            else:
+                init = next((i for i in self.classes[cls].body if getattr(i, "name", None) == "__init__"), None)
+                ctor = f"{cls}({_call_args(init, True) if init else ''})"
+                call = f"{ctor}.{fn}({_call_args(method, True)})"
+        return ast.parse(f"if __name__ == '__main__':\n    {call}\n").body[0]
+
+    def sliced(self, cls: Optional[str], fn: Optional[str]) -> ast.Module:
+        body: List[ast.stmt] = []
+        for stmt in self.tree.body:
+            if isinstance(stmt, ast.ImportFrom) and stmt.module == "__future__":
+                body.append(stmt)
+            elif isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                if stmt.name in self.kept_functions:
+                    body.append(stmt)
+                elif stmt.name in self.stubbed:
+                    body.append(make_stub(stmt))
+            elif isinstance(stmt, ast.ClassDef):
+                if stmt.name in self.kept_classes:
+                    kept = self.kept_methods[stmt.name]
+                    items = [i for i in stmt.body
+                             if not isinstance(i, (ast.FunctionDef, ast.AsyncFunctionDef)) or i.name in kept]
+                    stmt.body = items or [ast.Pass()]
+                    body.append(stmt)
+            elif _is_definition(stmt):
+                if id(stmt) in self.kept_globals:
+                    body.append(stmt)
+            elif fn is None:
+                body.append(stmt)
+        if fn is not None:
+            body.append(self.harness(cls, fn))
+        if self.stubbed or fn is not None:
+            position = next((i for i, s in enumerate(body)
+                             if not (isinstance(s, ast.ImportFrom) and s.module == "__future__")), len(body))
+            body.insert(position, ast.parse(NONDET_IMPORT).body[0])
+        return ast.fix_missing_locations(ast.Module(body=body, type_ignores=[]))
+
+
+def slice_source(source: str, entry: str, max_depth: Optional[int] = None) -> Tuple[str, Dict[str, int]]:
+    tree = ast.parse(source)
+    slicer = Slicer(tree, max_depth)
+    total_functions = len(slicer.functions) + sum(
+        sum(isinstance(i, (ast.FunctionDef, ast.AsyncFunctionDef)) for i in c.body) for c in slicer.classes.values())
+    cls, fn = slicer.run(entry)
+    text = ast.unparse(slicer.sliced(cls, fn)) + "\n"
+    stats = {
+        "lines_before": len(source.splitlines()),
+        "lines_after": len(text.splitlines()),
+        "functions_before": total_functions,
+        "functions_after": len(slicer.kept_functions) + sum(len(m) for m in slicer.kept_methods.values()),
+        "stubs": len(slicer.stubbed),
+        "classes": len(slicer.kept_classes),
+    }
+    return text, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slice a Python program down to what an entry point reaches")
+    parser.add_argument("--entry", required=True,
+                        help="FUNC, Class.method, line:N or __main__ (module-level code)")
+    parser.add_argument("--depth", type=int, help="Stub out functions deeper than this in the call graph")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    parser.add_argument("file", help="Python file to slice")
+    args = parser.parse_args()
+
+    with open(args.file, encoding="utf-8") as f:
+        source = f.read()
+    try:
+        text, stats = slice_source(source, args.entry, args.depth)
+    except SyntaxError as e:
+        print(f"Error: cannot parse {args.file}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    print(f"Sliced {args.file} from {args.entry}: {stats['lines_before']} -> {stats['lines_after']} lines, "
+          f"{stats['functions_before']} -> {stats['functions_after']} functions/methods, "
+          f"{stats['stubs']} stubbed, {stats['classes']} classes", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Per-stage timing spans for verify.sh.
+
+verify.sh appends one JSON object per line to its metrics file
+(``--metrics-file`` or ``VERIFY_METRICS_FILE``) for every stage it times::
+
+    {"run": "4242-1700000000.123", "stage": "llm", "start": 1700000001.5,
+     "end": 1700000019.2, "exit": 0, "model": "openrouter/z-ai/glm-4.6"}
+
+Stages are ``copy_headers``, ``shedskin``, ``llm`` (each run_aider call),
+``parse_check`` (each ``--parse-tree-only`` check), ``esbmc`` (each
+verification run, with ESBMC's own symex/solver times parsed from its
+output) and ``total``. Cheap spans are written by verify.sh directly; ESBMC
+spans go through ``span`` so the output can be parsed::
+
+    python3 scripts/stage_metrics.py span --metrics FILE --run ID --stage esbmc \\
+        --start T --exit RC --esbmc-output OUT [--detail function=foo]
+    python3 scripts/stage_metrics.py report --metrics FILE [--run ID | --all]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Times ESBMC reports itself; incremental BMC prints one line per step, so
+# they are summed
+ESBMC_TIMES = [
+    ("frontend", re.compile(r"GOTO program creation time: ([\d.]+)s")),
+    ("goto_processing", re.compile(r"GOTO program processing time: ([\d.]+)s")),
+    ("symex", re.compile(r"Symex completed in: ([\d.]+)s")),
+    ("slicing", re.compile(r"Slicing time: ([\d.]+)s")),
+    ("solver", re.compile(r"Runtime decision procedure: ([\d.]+)s")),
+]
+VCC_RE = re.compile(r"Generated (\d+) VCC\(s\)")
+CACHE_HIT = "Verdict cache: reused"
+
+STAGE_ORDER = ["copy_headers", "shedskin", "llm", "parse_check", "esbmc"]
+
+
+def parse_esbmc_times(output: str) -> Dict[str, float]:
+    """Sum the phase times ESBMC printed; ``vccs`` is the total VCC count."""
+    times: Dict[str, float] = {}
+    for name, pattern in ESBMC_TIMES:
+        values = [float(v) for v in pattern.findall(output)]
+        if values:
+            times[name] = round(sum(values), 6)
+    vccs = [int(v) for v in VCC_RE.findall(output)]
+    if vccs:
+        times["vccs"] = sum(vccs)
+    return times
+
+
+def append_span(path: str, span: Dict) -> None:
+    # One short write per line, so concurrent writers do not interleave
+    line = json.dumps(span, separators=(",", ":")) + "\n"
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+
+def read_spans(path: str, run: Optional[str] = None) -> List[Dict]:
+    """Spans of one run (the last one in the file when ``run`` is None)."""
+    spans = []
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        return []
+    if run is None and spans:
+        run = spans[-1].get("run")
+    if run == "*":
+        return spans
+    return [s for s in spans if s.get("run") == run]
+
+
+def summarize(spans: List[Dict]) -> "OrderedDict[str, Dict]":
+    """Per-stage call count, total/max seconds, failures and ESBMC phase times."""
+    summary: "OrderedDict[str, Dict]" = OrderedDict()
+    for stage in STAGE_ORDER:
+        summary[stage] = None
+    for span in spans:
+        stage = span.get("stage", "?")
+        seconds = max(0.0, float(span.get("end", 0)) - float(span.get("start", 0)))
+        entry = summary.get(stage) or {"calls": 0, "seconds": 0.0, "max": 0.0, "failed": 0}
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+        entry["max"] = max(entry["max"], seconds)
+        if span.get("exit", 0) not in (0, None):
+            entry["failed"] += 1
+        for name, _ in ESBMC_TIMES:
+            if name in span:
+                entry[name] = entry.get(name, 0.0) + float(span[name])
+        if "vccs" in span:
+            entry["vccs"] = entry.get("vccs", 0) + int(span["vccs"])
+        summary[stage] = entry
+    return OrderedDict((k, v) for k, v in summary.items() if v)
+
+
+def format_report(spans: List[Dict]) -> str:
+    summary = summarize(spans)
+    total = summary.pop("total", None)
+    wall = total["seconds"] if total else sum(e["seconds"] for e in summary.values())
+
+    def share(seconds):
+        return f"{100.0 * seconds / wall:5.1f}%" if wall > 0 else "-"
+
+    def row(name, calls="", seconds="", longest="", pct="", failed=""):
+        return f"| {name:<22} | {calls:>5} | {seconds:>9} | {longest:>8} | {pct:>6} | {failed:>6} |"
+
+    rule = "+------------------------+-------+-----------+----------+--------+--------+"
+    lines = [rule, row("Stage", "Calls", "Total (s)", "Max (s)", "Share", "Failed"), rule]
+    for stage, e in summary.items():
+        lines.append(row(stage, e["calls"], f"{e['seconds']:.2f}", f"{e['max']:.2f}",
+                         share(e["seconds"]), e["failed"]))
+        # ESBMC's own phase times, nested under the stage that ran it
+        for name, _ in ESBMC_TIMES:
+            if name in e:
+                lines.append(row(f"  {name}", seconds=f"{e[name]:.2f}", pct=share(e[name])))
+        if "vccs" in e:
+            lines.append(row("  VCCs generated", seconds=e["vccs"]))
+    lines.append(rule)
+    if total:
+        staged = sum(e["seconds"] for e in summary.values())
+        lines.append(row("total (wall clock)", total["calls"], f"{wall:.2f}", f"{total['max']:.2f}",
+                         share(wall), total["failed"]))
+        lines.append(row("outside stages", seconds=f"{max(0.0, wall - staged):.2f}",
+                         pct=share(max(0.0, wall - staged))))
+        lines.append(rule)
+    return "\n".join(lines)
+
+
+def cmd_span(args) -> int:
+    end = args.end if args.end is not None else time.time()
+    span = {"run": args.run, "stage": args.stage, "start": args.start, "end": end, "exit": args.exit}
+    for item in args.detail or []:
+        key, _, value = item.partition("=")
+        span[key] = value
+    if args.esbmc_output:
+        try:
+            with open(args.esbmc_output, encoding="utf-8", errors="replace") as f:
+                output = f.read()
+        except OSError:
+            output = ""
+        if CACHE_HIT in output:
+            # The replayed output carries the times of the run that was cached
+            span["cached"] = True
+        else:
+            span.update(parse_esbmc_times(output))
+    append_span(args.metrics, span)
+    return 0
+
+
+def cmd_report(args) -> int:
+    spans = read_spans(args.metrics, "*" if args.all else args.run)
+    if not spans:
+        print(f"No timing spans in {args.metrics}", file=sys.stderr)
+        return 1
+    print(format_report(spans))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="verify.sh per-stage timing spans")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("span", help="Append one span (parsing ESBMC output if given)")
+    p.add_argument("--metrics", required=True, help="JSON-lines metrics file")
+    p.add_argument("--run", default="", help="Run identifier")
+    p.add_argument("--stage", required=True)
+    p.add_argument("--start", type=float, required=True, help="Start time (seconds since the epoch)")
+    p.add_argument("--end", type=float, help="End time (default: now)")
+    p.add_argument("--exit", type=int, default=0, help="Exit status of the stage")
+    p.add_argument("--esbmc-output", help="ESBMC output to take symex/solver times from")
+    p.add_argument("--detail", action="append", help="Extra key=value field")
+    p.set_defaults(func=cmd_span)
+
+    p = sub.add_parser("report", help="Print a per-stage breakdown table")
+    p.add_argument("--metrics", required=True, help="JSON-lines metrics file")
+    p.add_argument("--run", help="Run to report (default: the last run in the file)")
+    p.add_argument("--all", action="store_true", help="Aggregate every run in the file")
+    p.set_defaults(func=cmd_report)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
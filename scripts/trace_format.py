@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""Compact binary format for dynamic traces.
+
+A trace file starts with ``MAGIC`` followed by length-prefixed records::
+
+    record  := varint(type) varint(length) payload
+    STRING  := utf-8 bytes                          (id = number of earlier STRINGs)
+    FUNC    := varint(name) varint(file) varint(line)  (id = number of earlier FUNCs)
+    EVENTS  := varint(func << 2 | kind)*
+    OUTPUT  := varint(stream) utf-8 bytes
+
+Strings and functions are interned: each is written once, before the first
+EVENTS record that refers to it, and later referred to by id. Unknown record
+types are skipped, so readers stay compatible with newer writers.
+
+:class:`TraceWriter` buffers encoded events and writes them out in chunks;
+:class:`TraceReader` streams records back, holding only the string and
+function tables in memory. The CLI summarises a trace in one pass::
+
+    python3 scripts/trace_format.py functions trace.bin
+    python3 scripts/trace_format.py summary --json trace.bin
+    python3 scripts/trace_format.py dump trace.bin | head
+"""
+
+import argparse
+import json
+import sys
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+MAGIC = b"ESTRACE\x01"
+
+REC_STRING = 1
+REC_FUNC = 2
+REC_EVENTS = 3
+REC_OUTPUT = 4
+
+START = 0
+RETURN = 1
+RAISE = 2
+EVENT_NAMES = ("start", "return", "raise")
+
+STDOUT = 0
+STDERR = 1
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def encode_varint(value: int, out: bytearray) -> None:
+    """Append ``value`` (>= 0) to ``out`` as an unsigned LEB128 varint."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data: Union[bytes, bytearray, memoryview], pos: int) -> Tuple[int, int]:
+    """Decode a varint at ``pos``; returns ``(value, next_pos)``."""
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _read_varint(stream: BinaryIO) -> Optional[int]:
+    result = 0
+    shift = 0
+    while True:
+        b = stream.read(1)
+        if not b:
+            if shift:
+                raise ValueError("Truncated varint in trace")
+            return None
+        result |= (b[0] & 0x7F) << shift
+        if b[0] < 0x80:
+            return result
+        shift += 7
+
+
+class Function:
+    __slots__ = ("id", "name", "filename", "lineno")
+
+    def __init__(self, id: int, name: str, filename: str, lineno: int):
+        self.id = id
+        self.name = name
+        self.filename = filename
+        self.lineno = lineno
+
+    def __repr__(self) -> str:
+        return f"Function({self.name!r}, {self.filename!r}, {self.lineno})"
+
+
+class TraceWriter:
+    """Streams events to a trace file, flushing every ``chunk_size`` bytes.
+
+    Functions are identified by any hashable key (typically a code object);
+    the first time a key is seen its name, file and line are interned.
+    """
+
+    def __init__(self, target: Union[str, BinaryIO], chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if isinstance(target, str):
+            self._file = open(target, "wb")
+            self._owns_file = True
+        else:
+            self._file = target
+            self._owns_file = False
+        self.chunk_size = chunk_size
+        self._strings: Dict[str, int] = {}
+        self._functions: Dict[object, int] = {}
+        self._defs = bytearray()
+        self._events = bytearray()
+        self.event_count = 0
+        self._file.write(MAGIC)
+
+    def _record(self, out: bytearray, rtype: int, payload: Union[bytes, bytearray]) -> None:
+        encode_varint(rtype, out)
+        encode_varint(len(payload), out)
+        out += payload
+
+    def intern_string(self, value: str) -> int:
+        sid = self._strings.get(value)
+        if sid is None:
+            sid = self._strings[value] = len(self._strings)
+            self._record(self._defs, REC_STRING, value.encode("utf-8", "surrogateescape"))
+        return sid
+
+    def intern_function(self, key: object, name: str, filename: str, lineno: int) -> int:
+        fid = self._functions.get(key)
+        if fid is None:
+            payload = bytearray()
+            encode_varint(self.intern_string(name), payload)
+            encode_varint(self.intern_string(filename), payload)
+            encode_varint(max(0, lineno), payload)
+            fid = self._functions[key] = len(self._functions)
+            self._record(self._defs, REC_FUNC, payload)
+        return fid
+
+    def intern_code(self, code) -> int:
+        """Intern a code object, using its qualified name where available."""
+        fid = self._functions.get(code)
+        if fid is None:
+            fid = self.intern_function(code, getattr(code, "co_qualname", code.co_name),
+                                       code.co_filename, code.co_firstlineno)
+        return fid
+
+    def event(self, fid: int, kind: int) -> None:
+        encode_varint((fid << 2) | kind, self._events)
+        self.event_count += 1
+        if len(self._events) >= self.chunk_size:
+            self.flush()
+
+    def code_event(self, code, kind: int) -> None:
+        fid = self._functions.get(code)
+        if fid is None:
+            fid = self.intern_code(code)
+        self.event(fid, kind)
+
+    def output(self, text: str, stream: int = STDOUT) -> None:
+        """Record a piece of program output, kept in order with the events."""
+        self.flush()
+        payload = bytearray()
+        encode_varint(stream, payload)
+        payload += text.encode("utf-8", "replace")
+        self._record(self._defs, REC_OUTPUT, payload)
+        if len(self._defs) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        out = self._defs
+        if self._events:
+            self._record(out, REC_EVENTS, self._events)
+            self._events = bytearray()
+        if out:
+            self._file.write(out)
+            self._defs = bytearray()
+        self._file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        if self._owns_file:
+            self._file.close()
+
+    def __enter__(self) -> "TraceWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class TraceReader:
+    """Reads a trace file record by record.
+
+    ``strings`` and ``functions`` are filled in as their records are read,
+    so they are complete for every event yielded so far.
+    """
+
+    def __init__(self, source: Union[str, BinaryIO]):
+        if isinstance(source, str):
+            self._file = open(source, "rb")
+            self._owns_file = True
+        else:
+            self._file = source
+            self._owns_file = False
+        if self._file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a trace file (bad magic)")
+        self.strings: List[str] = []
+        self.functions: List[Function] = []
+
+    def records(self) -> Iterator[Tuple[int, bytes]]:
+        """Yield raw ``(type, payload)`` records; a truncated tail is ignored."""
+        while True:
+            rtype = _read_varint(self._file)
+            if rtype is None:
+                return
+            length = _read_varint(self._file)
+            if length is None:
+                return
+            payload = self._file.read(length)
+            if len(payload) < length:
+                return
+            yield rtype, payload
+
+    def _define(self, rtype: int, payload: bytes) -> None:
+        if rtype == REC_STRING:
+            self.strings.append(payload.decode("utf-8", "surrogateescape"))
+        elif rtype == REC_FUNC:
+            name, pos = decode_varint(payload, 0)
+            filename, pos = decode_varint(payload, pos)
+            lineno, _ = decode_varint(payload, pos)
+            self.functions.append(Function(len(self.functions), self.strings[name],
+                                           self.strings[filename], lineno))
+
+    def items(self) -> Iterator[Tuple[str, object, object]]:
+        """Yield ``("event", kind, Function)`` and ``("output", stream, text)`` in file order."""
+        functions = self.functions
+        for rtype, payload in self.records():
+            if rtype == REC_EVENTS:
+                pos = 0
+                end = len(payload)
+                while pos < end:
+                    value, pos = decode_varint(payload, pos)
+                    yield "event", value & 3, functions[value >> 2]
+            elif rtype == REC_OUTPUT:
+                stream, pos = decode_varint(payload, 0)
+                yield "output", stream, payload[pos:].decode("utf-8", "replace")
+            else:
+                self._define(rtype, payload)
+
+    def events(self) -> Iterator[Tuple[int, Function]]:
+        """Yield ``(kind, Function)`` for every event."""
+        for item, kind, func in self.items():
+            if item == "event":
+                yield kind, func
+
+    def close(self) -> None:
+        if self._owns_file:
+            self._file.close()
+
+    def __enter__(self) -> "TraceReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def summarize(path: str) -> Dict:
+    """One pass over a trace: per-function event counts in first-call order."""
+    counts: Dict[int, List[int]] = {}
+    order: List[Function] = []
+    total = 0
+    output_bytes = 0
+    with TraceReader(path) as reader:
+        for item, kind, value in reader.items():
+            if item == "output":
+                output_bytes += len(value)
+                continue
+            total += 1
+            c = counts.get(value.id)
+            if c is None:
+                c = counts[value.id] = [0, 0, 0]
+                order.append(value)
+            c[kind] += 1
+    return {
+        "events": total,
+        "output_bytes": output_bytes,
+        "functions": [
+            {"name": f.name, "file": f.filename, "line": f.lineno,
+             "calls": counts[f.id][START], "returns": counts[f.id][RETURN], "raises": counts[f.id][RAISE]}
+            for f in order
+        ],
+    }
+
+
+def called_function_names(path: str) -> List[str]:
+    """Sorted unique names of called public functions (what extract_function_calls wants)."""
+    names = set()
+    with TraceReader(path) as reader:
+        for kind, func in reader.events():
+            if kind == START:
+                name = func.name.rsplit(".", 1)[-1]
+                if not name.startswith("_") and not name.startswith("<"):
+                    names.add(name)
+    return sorted(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect binary dynamic traces")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("functions", help="Print the names of called functions, one per line")
+    p.add_argument("trace")
+    p = sub.add_parser("summary", help="Per-function call/return/raise counts")
+    p.add_argument("--json", action="store_true", help="Print JSON")
+    p.add_argument("trace")
+    p = sub.add_parser("dump", help="Print every event and output record as text")
+    p.add_argument("trace")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "functions":
+            for name in called_function_names(args.trace):
+                print(name)
+        elif args.command == "summary":
+            summary = summarize(args.trace)
+            if args.json:
+                print(json.dumps(summary, indent=2))
+            else:
+                print(f"{summary['events']} events, {summary['output_bytes']} bytes of output")
+                for f in summary["functions"]:
+                    print(f"{f['calls']:>10} calls {f['raises']:>6} raises  {f['name']} ({f['file']}:{f['line']})")
+        elif args.command == "dump":
+            with TraceReader(args.trace) as reader:
+                for item, kind, value in reader.items():
+                    if item == "event":
+                        print(f"{EVENT_NAMES[kind]} {value.name} {value.filename}:{value.lineno}")
+                    else:
+                        print(f"output[{'stdout' if kind == STDOUT else 'stderr'}] {value!r}")
+    except BrokenPipeError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Content-addressed on-disk cache for LLM translations produced by verify.sh.
+
+A cache key is a hash of everything that influences the translation: the
+source bytes, the model id, the prompt file contents and the conversion
+flags. Each entry stores the final C file that passed ``--parse-tree-only``
+so unchanged inputs can skip the LLM entirely.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Iterable, List, Optional, Tuple
+
+CACHE_FORMAT_VERSION = "1"
+DEFAULT_MAX_SIZE_MB = 512
+DEFAULT_MAX_AGE_DAYS = 30
+OUTPUT_NAME = "output.c"
+META_NAME = "meta.json"
+
+
+def cache_root() -> str:
+    """Return the root directory shared by all esbmc-python-cpp caches."""
+    root = os.environ.get("ESBMC_PYTHON_CPP_CACHE")
+    if not root:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        root = os.path.join(base, "esbmc-python-cpp")
+    return root
+
+
+def default_cache_dir() -> str:
+    return os.path.join(cache_root(), "translations")
+
+
+def compute_key(files: Iterable[str], values: Iterable[str]) -> str:
+    """Hash file contents and string values into a stable hex key.
+
+    Every field is length-prefixed so that concatenation ambiguities cannot
+    produce the same digest for different inputs. Missing files hash as empty.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"translation-cache-v{CACHE_FORMAT_VERSION}\0".encode())
+    for path in files:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            data = b""
+        digest.update(b"F%d:" % len(data))
+        digest.update(data)
+    for value in values:
+        data = value.encode("utf-8")
+        digest.update(b"V%d:" % len(data))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def _entry_dir(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, key[:2], key)
+
+
+def get(cache_dir: str, key: str, dest: str) -> Optional[dict]:
+    """Copy a cached translation to ``dest`` and return its metadata, or None on a miss."""
+    entry = _entry_dir(cache_dir, key)
+    output = os.path.join(entry, OUTPUT_NAME)
+    if not os.path.isfile(output):
+        return None
+    meta = {}
+    try:
+        with open(os.path.join(entry, META_NAME), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        pass
+    shutil.copyfile(output, dest)
+    # Mark the entry as recently used so that eviction is least-recently-used.
+    now = time.time()
+    try:
+        os.utime(entry, (now, now))
+    except OSError:
+        pass
+    return meta
+
+
+def put(cache_dir: str, key: str, src: str, meta: Optional[dict] = None) -> str:
+    """Store ``src`` under ``key`` atomically and return the entry directory."""
+    entry = _entry_dir(cache_dir, key)
+    parent = os.path.dirname(entry)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=parent)
+    try:
+        shutil.copyfile(src, os.path.join(staging, OUTPUT_NAME))
+        record = dict(meta or {})
+        record.setdefault("created", time.time())
+        record["size"] = os.path.getsize(src)
+        with open(os.path.join(staging, META_NAME), "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2, sort_keys=True)
+        if os.path.isdir(entry):
+            shutil.rmtree(entry, ignore_errors=True)
+        os.replace(staging, entry)
+    finally:
+        if os.path.isdir(staging):
+            shutil.rmtree(staging, ignore_errors=True)
+    return entry
+
+
+def _entries(cache_dir: str) -> List[Tuple[float, int, str]]:
+    """Return (last_used, size_bytes, path) for every cache entry."""
+    result = []
+    if not os.path.isdir(cache_dir):
+        return result
+    for shard in os.listdir(cache_dir):
+        shard_dir = os.path.join(cache_dir, shard)
+        if not os.path.isdir(shard_dir):
+            continue
+        for name in os.listdir(shard_dir):
+            entry = os.path.join(shard_dir, name)
+            if name.startswith(".") or not os.path.isdir(entry):
+                continue
+            size = 0
+            for fname in os.listdir(entry):
+                try:
+                    size += os.path.getsize(os.path.join(entry, fname))
+                except OSError:
+                    pass
+            try:
+                last_used = os.path.getmtime(entry)
+            except OSError:
+                continue
+            result.append((last_used, size, entry))
+    return result
+
+
+def evict(cache_dir: str, max_size_mb: float = DEFAULT_MAX_SIZE_MB,
+          max_age_days: float = DEFAULT_MAX_AGE_DAYS) -> int:
+    """Drop entries unused for ``max_age_days``, then least-recently-used ones above ``max_size_mb``.
+
+    Returns the number of removed entries.
+    """
+    entries = sorted(_entries(cache_dir))
+    removed = 0
+    now = time.time()
+    kept = []
+    for last_used, size, path in entries:
+        if max_age_days > 0 and now - last_used > max_age_days * 86400:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        else:
+            kept.append((last_used, size, path))
+
+    if max_size_mb > 0:
+        budget = max_size_mb * 1024 * 1024
+        total = sum(size for _, size, _ in kept)
+        for last_used, size, path in kept:
+            if total <= budget:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed cache for LLM translations")
+    parser.add_argument("--cache-dir", default=os.environ.get("TRANSLATION_CACHE_DIR", default_cache_dir()),
+                        help="Cache directory (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    key_p = sub.add_parser("key", help="Print the cache key for the given inputs")
+    key_p.add_argument("--file", action="append", default=[], help="File whose contents are part of the key")
+    key_p.add_argument("--value", action="append", default=[], help="String value that is part of the key")
+
+    get_p = sub.add_parser("get", help="Copy a cached translation to DEST (exit 1 on miss)")
+    get_p.add_argument("key")
+    get_p.add_argument("dest")
+    get_p.add_argument("--field", help="Print this metadata field on a hit")
+
+    put_p = sub.add_parser("put", help="Store SRC under KEY")
+    put_p.add_argument("key")
+    put_p.add_argument("src")
+    put_p.add_argument("--meta", action="append", default=[], metavar="NAME=VALUE",
+                       help="Extra metadata stored with the entry")
+    put_p.add_argument("--max-size-mb", type=float, default=DEFAULT_MAX_SIZE_MB)
+    put_p.add_argument("--max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS)
+
+    evict_p = sub.add_parser("evict", help="Apply size/age eviction")
+    evict_p.add_argument("--max-size-mb", type=float, default=DEFAULT_MAX_SIZE_MB)
+    evict_p.add_argument("--max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS)
+
+    sub.add_parser("clear", help="Remove every cached translation")
+
+    args = parser.parse_args()
+
+    if args.command == "key":
+        print(compute_key(args.file, args.value))
+    elif args.command == "get":
+        meta = get(args.cache_dir, args.key, args.dest)
+        if meta is None:
+            sys.exit(1)
+        if args.field:
+            print(meta.get(args.field, ""))
+    elif args.command == "put":
+        meta = {}
+        for item in args.meta:
+            name, _, value = item.partition("=")
+            meta[name] = value
+        put(args.cache_dir, args.key, args.src, meta)
+        evict(args.cache_dir, args.max_size_mb, args.max_age_days)
+    elif args.command == "evict":
+        removed = evict(args.cache_dir, args.max_size_mb, args.max_age_days)
+        print(f"Evicted {removed} cache entries")
+    elif args.command == "clear":
+        shutil.rmtree(args.cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
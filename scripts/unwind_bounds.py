@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Adaptive unwind-bound search helpers for ESBMC.
+
+Instead of a fixed ladder of ``--unwind`` values, each verification step
+runs ``--incremental-bmc --max-k-step K`` under a time budget and the next
+bound is chosen from what ESBMC reported:
+
+* loops whose unwinding stopped below ``K`` are pinned with ``--unwindset``
+  at the number of iterations they actually needed,
+* if the step ran out of bound, ``K`` grows (doubling, up to a maximum),
+* if the step ran out of time, ``K`` shrinks to the last bound ESBMC
+  completed within the budget.
+
+The bound that produced a verdict is remembered per (normalized C code,
+function) in ``<cache root>/unwind_bounds.json``, so later runs on the same
+code start from it::
+
+    python3 scripts/unwind_bounds.py show
+    python3 scripts/unwind_bounds.py clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from translation_cache import cache_root
+from verdict_cache import normalize_c
+
+DEFAULT_BOUND = 10
+MAX_BOUND = 160
+MAX_ENTRIES = 2000
+
+UNWIND_RE = re.compile(r"Unwinding loop (\d+) iteration (\d+)")
+UNWIND_ASSERT_RE = re.compile(r"unwinding assertion loop (\d+)")
+K_STEP_RE = re.compile(r"(?:Checking base case, k = |K-Induction Loop Iteration )(\d+)")
+
+
+class UnwindReport:
+    """What one ESBMC run reported about its loop unwinding."""
+
+    def __init__(self, loops: Dict[int, int], exhausted: Set[int], k: int):
+        self.loops = loops          # loop id -> highest iteration unwound
+        self.exhausted = exhausted  # loops whose unwinding assertion failed
+        self.k = k                  # highest incremental-BMC step started
+
+
+def parse_report(output: str) -> UnwindReport:
+    loops: Dict[int, int] = {}
+    for loop, iteration in UNWIND_RE.findall(output):
+        loop, iteration = int(loop), int(iteration)
+        if iteration > loops.get(loop, 0):
+            loops[loop] = iteration
+    exhausted = {int(loop) for loop in UNWIND_ASSERT_RE.findall(output)}
+    steps = [int(k) for k in K_STEP_RE.findall(output)]
+    return UnwindReport(loops, exhausted, max(steps) if steps else 0)
+
+
+def format_unwindset(unwindset: Dict[int, int]) -> str:
+    return ",".join(f"{loop}:{bound}" for loop, bound in sorted(unwindset.items()))
+
+
+def next_bound(bound: int, report: UnwindReport, timed_out: bool,
+               unwindset: Dict[int, int], max_bound: int = MAX_BOUND) -> Tuple[int, Dict[int, int]]:
+    """Choose the next global bound and per-loop bounds after an inconclusive step."""
+    if timed_out:
+        # The step before the one that was cut off fit in the budget
+        reached = report.k - 1 if report.k > 1 else 0
+        smaller = reached if 0 < reached < bound else bound // 2
+        return max(1, smaller), dict(unwindset)
+
+    pinned = {loop: b for loop, b in unwindset.items() if loop not in report.exhausted}
+    for loop, iteration in report.loops.items():
+        if loop not in report.exhausted and iteration < bound - 1:
+            # This loop terminated on its own; fix its bound so it stops growing
+            pinned[loop] = iteration + 1
+    return min(max_bound, bound * 2), pinned
+
+
+def code_key(code: str, function: str) -> str:
+    digest = hashlib.sha256(normalize_c(code).encode("utf-8", "surrogateescape")).hexdigest()
+    return f"{digest}:{function}"
+
+
+def default_path() -> str:
+    return os.path.join(cache_root(), "unwind_bounds.json")
+
+
+class BoundMemory:
+    """Best unwind bound per (code, function), persisted as JSON."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_path()
+        self.lock = threading.Lock()
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, code: str, function: str = "main") -> Optional[Tuple[int, Dict[int, int]]]:
+        entry = self._load().get(code_key(code, function))
+        if not entry:
+            return None
+        return entry["bound"], {int(loop): b for loop, b in entry.get("unwindset", {}).items()}
+
+    def put(self, code: str, function: str, bound: int, unwindset: Dict[int, int], verdict: str) -> None:
+        with self.lock:
+            data = self._load()
+            data[code_key(code, function)] = {
+                "bound": bound,
+                "unwindset": {str(loop): b for loop, b in unwindset.items()},
+                "verdict": verdict,
+                "updated": time.time(),
+            }
+            if len(data) > MAX_ENTRIES:
+                for key, _ in sorted(data.items(), key=lambda kv: kv[1].get("updated", 0))[:len(data) - MAX_ENTRIES]:
+                    del data[key]
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=".unwind-", dir=os.path.dirname(self.path))
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remembered ESBMC unwind bounds")
+    parser.add_argument("--path", default=default_path(), help="Bound memory file (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("show", help="Print the remembered bounds")
+    sub.add_parser("clear", help="Forget all remembered bounds")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        data = BoundMemory(args.path)._load()
+        for key, entry in sorted(data.items(), key=lambda kv: kv[1].get("updated", 0)):
+            digest, _, function = key.partition(":")
+            loops = format_unwindset({int(k): v for k, v in entry.get("unwindset", {}).items()})
+            print(f"{digest[:12]} {function}: k={entry['bound']} {loops} ({entry.get('verdict', '?')})")
+    elif args.command == "clear":
+        try:
+            os.unlink(args.path)
+        except FileNotFoundError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
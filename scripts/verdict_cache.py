@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""On-disk cache of ESBMC verdicts.
+
+The same C translation is often verified many times: retries with the same
+options, regression re-runs, and runs with and without ``--function``. A
+cache key is a hash of
+
+* the C sources named on the command line, with comments and whitespace
+  normalized within each line (line numbers are kept, as the stored
+  counterexample refers to them), plus the local headers they
+  ``#include "..."``,
+* the ESBMC version (``esbmc --version``),
+* the full command vector, with source paths replaced by placeholders and
+  ``--timeout``/``--memlimit`` dropped (they only decide whether a verdict is
+  reached, and only verdicts are stored).
+
+Only conclusive results (``VERIFICATION SUCCESSFUL`` or ``VERIFICATION
+FAILED``) are stored, together with the output, counterexample, exit code and
+the time the original run took. ``run`` executes a command through the
+cache, replaying the stored output on a hit::
+
+    python3 scripts/verdict_cache.py run -- esbmc file.c --unwind 10
+    python3 scripts/verdict_cache.py run --esbmc "docker exec w esbmc" -- docker exec w esbmc file.c
+
+Set ``ESBMC_VERDICT_CACHE=0`` to disable the cache for Python callers.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from esbmc_portfolio import FAILED, SUCCESS, parse_verdict
+from translation_cache import cache_root, evict
+
+CACHE_FORMAT_VERSION = "2"
+DEFAULT_MAX_SIZE_MB = 256
+DEFAULT_MAX_AGE_DAYS = 30
+SOURCE_EXTENSIONS = (".c", ".h", ".cc", ".cpp", ".cxx", ".hpp")
+# Options that only limit resources; a verdict reached under them is the same verdict
+IGNORED_OPTIONS = ("--timeout", "--memlimit")
+ENTRY_NAME = "verdict.json"
+
+_TOKEN_RE = re.compile(
+    r'"(?:\\.|[^"\\\n])*"'        # string literal
+    r"|'(?:\\.|[^'\\\n])*'"       # character literal
+    r"|//[^\n]*"                  # line comment
+    r"|/\*.*?\*/"                 # block comment
+    r"|\s+",                      # whitespace
+    re.DOTALL)
+_SPACE_RE = re.compile(r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'| +')
+_PUNCTUATION = set("(){}[];,")
+_LOCAL_INCLUDE_RE = re.compile(r'^\s*#\s*include\s*"([^"]+)"', re.MULTILINE)
+
+
+def default_cache_dir() -> str:
+    return os.path.join(cache_root(), "verdicts")
+
+
+def enabled() -> bool:
+    return os.environ.get("ESBMC_VERDICT_CACHE", "1").lower() not in ("0", "false", "no", "off")
+
+
+def normalize_c(text: str) -> str:
+    """Drop comments and redundant whitespace outside literals, line by line.
+
+    Every line keeps its number, since cached counterexamples refer to
+    lines: a comment spanning lines leaves its line breaks behind. Within a
+    line, whitespace next to ``(){}[];,`` is removed.
+    """
+
+    def replace(m: "re.Match") -> str:
+        token = m.group(0)
+        if token[0] in "\"'":
+            return token
+        # Comments and whitespace become one separator, keeping line breaks
+        return "\n" * token.count("\n") or " "
+
+    def squeeze(m: "re.Match") -> str:
+        token = m.group(0)
+        if token[0] != " ":
+            return token
+        before = m.string[m.start() - 1] if m.start() > 0 else ""
+        after = m.string[m.end()] if m.end() < len(m.string) else ""
+        return "" if before in _PUNCTUATION or after in _PUNCTUATION else " "
+
+    lines = _TOKEN_RE.sub(replace, text).split("\n")
+    return "\n".join(_SPACE_RE.sub(squeeze, line.strip()) for line in lines).rstrip("\n")
+
+
+def _source_digest(path: str, include_dirs: Sequence[str], seen: set) -> str:
+    """Hash of a normalized source file and, recursively, its local includes."""
+    digest = hashlib.sha256()
+    real = os.path.realpath(path)
+    if real in seen:
+        return ""
+    seen.add(real)
+    try:
+        with open(path, "r", encoding="utf-8", errors="surrogateescape") as f:
+            text = f.read()
+    except OSError:
+        return "missing"
+    normalized = normalize_c(text)
+    digest.update(normalized.encode("utf-8", "surrogateescape"))
+    for name in _LOCAL_INCLUDE_RE.findall(text):
+        for base in [os.path.dirname(path)] + list(include_dirs):
+            candidate = os.path.join(base, name)
+            if os.path.isfile(candidate):
+                digest.update(f"\0{name}\0{_source_digest(candidate, include_dirs, seen)}".encode())
+                break
+    return digest.hexdigest()
+
+
+_versions: Dict[str, str] = {}
+
+
+def esbmc_version(esbmc: Sequence[str], cwd: Optional[str] = None) -> str:
+    """``esbmc --version`` output for the given command prefix, memoized per process."""
+    cache_id = "\0".join(esbmc)
+    exe = shutil.which(esbmc[0]) if len(esbmc) == 1 else None
+    if exe:
+        # A local binary is identified by its path and modification time
+        st = os.stat(exe)
+        cache_id = f"{exe}\0{st.st_mtime_ns}\0{st.st_size}"
+    if cache_id not in _versions:
+        try:
+            result = subprocess.run(list(esbmc) + ["--version"], cwd=cwd, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, text=True, errors="replace", timeout=60)
+            _versions[cache_id] = result.stdout.strip() if result.returncode == 0 else ""
+        except (OSError, subprocess.TimeoutExpired):
+            _versions[cache_id] = ""
+    return _versions[cache_id]
+
+
+def compute_key(command: Sequence[str], version: str, cwd: Optional[str] = None) -> str:
+    """Key for running ``command`` in ``cwd`` with an ESBMC reporting ``version``."""
+    cwd = cwd or os.getcwd()
+    include_dirs = []
+    for i, arg in enumerate(command):
+        if arg == "-I" and i + 1 < len(command):
+            include_dirs.append(os.path.join(cwd, command[i + 1]))
+        elif arg.startswith("-I") and len(arg) > 2:
+            include_dirs.append(os.path.join(cwd, arg[2:]))
+
+    digest = hashlib.sha256()
+    digest.update(f"verdict-cache-v{CACHE_FORMAT_VERSION}\0".encode())
+    digest.update(f"V{len(version)}:{version}".encode())
+    skip = False
+    for arg in command:
+        if skip:
+            skip = False
+            continue
+        if arg in IGNORED_OPTIONS:
+            skip = True
+            continue
+        if any(arg.startswith(opt + "=") for opt in IGNORED_OPTIONS):
+            continue
+        path = os.path.join(cwd, arg)
+        if arg.endswith(SOURCE_EXTENSIONS) and os.path.isfile(path):
+            value = "<source>" + _source_digest(path, include_dirs, set())
+        else:
+            value = arg
+        digest.update(f"A{len(value)}:{value}".encode())
+    return digest.hexdigest()
+
+
+def counterexample(output: str) -> str:
+    start = output.find("[Counterexample]")
+    if start < 0:
+        return ""
+    end = output.find("VERIFICATION FAILED", start)
+    return output[start:end if end >= 0 else len(output)].strip()
+
+
+def _entry_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, key[:2], key, ENTRY_NAME)
+
+
+def get(cache_dir: str, key: str) -> Optional[Dict]:
+    path = _entry_path(cache_dir, key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    now = time.time()
+    try:
+        os.utime(os.path.dirname(path), (now, now))
+    except OSError:
+        pass
+    return entry
+
+
+def put(cache_dir: str, key: str, output: str, returncode: int, elapsed: float,
+        command: Sequence[str]) -> bool:
+    """Store a result if it is conclusive; returns whether it was stored."""
+    verdict = parse_verdict(output)
+    if verdict not in (SUCCESS, FAILED):
+        return False
+    entry_dir = os.path.dirname(_entry_path(cache_dir, key))
+    os.makedirs(entry_dir, exist_ok=True)
+    record = {
+        "verdict": verdict,
+        "returncode": returncode,
+        "output": output,
+        "counterexample": counterexample(output),
+        "elapsed": elapsed,
+        "command": list(command),
+        "created": time.time(),
+    }
+    fd, tmp = tempfile.mkstemp(prefix=".staging-", dir=entry_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+    os.replace(tmp, os.path.join(entry_dir, ENTRY_NAME))
+    return True
+
+
+def run(command: Sequence[str], cwd: Optional[str] = None, esbmc: Optional[Sequence[str]] = None,
+        cache_dir: Optional[str] = None, echo: Optional[Callable[[str], None]] = None) -> Dict:
+    """Run ``command`` through the cache.
+
+    Returns a dict with ``output``, ``returncode``, ``elapsed`` (of the run
+    that produced the verdict), ``verdict`` and ``cached``. ``echo`` receives
+    output as it is produced (or the stored output on a hit).
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    version = esbmc_version(esbmc or command[:1], cwd)
+    key = compute_key(command, version, cwd)
+    entry = get(cache_dir, key)
+    if entry is not None:
+        if echo:
+            echo(entry["output"])
+        return dict(entry, cached=True, key=key)
+
+    start = time.time()
+    lines: List[str] = []
+    proc = subprocess.Popen(list(command), cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, errors="replace", bufsize=1)
+    for line in proc.stdout:
+        lines.append(line)
+        if echo:
+            echo(line)
+    returncode = proc.wait()
+    elapsed = time.time() - start
+    output = "".join(lines)
+    put(cache_dir, key, output, returncode, elapsed, command)
+    return {"verdict": parse_verdict(output), "returncode": returncode, "output": output,
+            "counterexample": counterexample(output), "elapsed": elapsed, "cached": False, "key": key}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache of conclusive ESBMC verdicts")
+    parser.add_argument("--cache-dir", default=os.environ.get("VERDICT_CACHE_DIR", default_cache_dir()),
+                        help="Cache directory (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="Run an ESBMC command through the cache: run [--esbmc CMD] -- CMD ...")
+    run_p.add_argument("--esbmc", help="Command that starts ESBMC, used for --version (default: CMD's first word)")
+    run_p.add_argument("cmd", nargs=argparse.REMAINDER)
+
+    key_p = sub.add_parser("key", help="Print the cache key for a command")
+    key_p.add_argument("--esbmc", help="Command that starts ESBMC, used for --version")
+    key_p.add_argument("cmd", nargs=argparse.REMAINDER)
+
+    evict_p = sub.add_parser("evict", help="Apply size/age eviction")
+    evict_p.add_argument("--max-size-mb", type=float, default=DEFAULT_MAX_SIZE_MB)
+    evict_p.add_argument("--max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS)
+
+    sub.add_parser("clear", help="Remove every cached verdict")
+
+    args = parser.parse_args()
+    if args.command in ("run", "key"):
+        cmd = args.cmd[1:] if args.cmd and args.cmd[0] == "--" else args.cmd
+        if not cmd:
+            parser.error("no command given")
+        esbmc = shlex.split(args.esbmc) if args.esbmc else cmd[:1]
+
+    if args.command == "run":
+        def echo(text):
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        try:
+            result = run(cmd, esbmc=esbmc, cache_dir=args.cache_dir, echo=echo)
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(127)
+        if result["cached"]:
+            print(f"Verdict cache: reused {result['verdict']} result (originally {result['elapsed']:.2f}s)",
+                  file=sys.stderr)
+        elif result["verdict"] in (SUCCESS, FAILED):
+            evict(args.cache_dir, DEFAULT_MAX_SIZE_MB, DEFAULT_MAX_AGE_DAYS)
+        sys.exit(result["returncode"])
+    elif args.command == "key":
+        print(compute_key(cmd, esbmc_version(esbmc)))
+    elif args.command == "evict":
+        removed = evict(args.cache_dir, args.max_size_mb, args.max_age_days)
+        print(f"Evicted {removed} cache entries")
+    elif args.command == "clear":
+        shutil.rmtree(args.cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,38 @@
 #define __SET_HPP
 
 #include "list.hpp"
+#include "dict.hpp"
 
 namespace shedskin {
 
+// Hash set on the same __ss_table as dict: elements are stored densely in
+// insertion order and an open-addressing index (linear probing) maps hashes
+// to element positions. Hashing and equality come from __ss_hash<T>.
 template<class T>
 class set : public pyobj {
 private:
-    list<T>* items;
+    typedef __ss_set_entry<T> entry;
+    __ss_table<T, entry> table_;
+
+    const T& item(__ss_int e) const {
+        return table_.entries_[e].key;
+    }
+
+    void insert_new(const T& value, unsigned int h) {
+        entry e = {value};
+        table_.insert_new(e, h);
+    }
+
+    void add_hashed(const T& value, unsigned int h) {
+        if (table_.find_slot(value, h) < 0) {
+            insert_new(value, h);
+        }
+    }
 
 public:
-    set() : items(new list<T>()) {}
-    
-    set(list<T>* init) : items(new list<T>()) {
+    set() {}
+
+    set(list<T>* init) {
         if(init) {
             for(__ss_int i = 0; i < len(init); i++) {
                 add(init->__getfast__(i));
@@ -21,17 +41,20 @@ public:
         }
     }
 
-    void add(const T& value) {
-        if(!contains(value)) {
-            items->append(value);
+    set(const set<T>& other) : table_(other.table_) {}
+
+    set(set<T>* other) {
+        if (other) {
+            table_ = other->table_;
         }
     }
 
+    void add(const T& value) {
+        add_hashed(value, __ss_hash<T>::hash(value));
+    }
+
     bool contains(const T& value) const {
-        for(__ss_int i = 0; i < len(items); i++) {
-            if(items->__getfast__(i) == value) return true;
-        }
-        return false;
+        return table_.find_slot(value, __ss_hash<T>::hash(value)) >= 0;
     }
 
     bool __contains__(const T& value) const {
@@ -39,51 +62,124 @@ public:
     }
 
     void discard(const T& value) {
-        for (__ss_int i = 0; i < len(items); i++) {
-            if (items->__getfast__(i) == value) {
-                items->__remove__(i);
-                return;
-            }
+        __ss_int slot = table_.find_slot(value, __ss_hash<T>::hash(value));
+        if (slot >= 0) {
+            table_.erase_slot(slot);
         }
     }
 
+    // Remove a value; raises if it is not present
+    void remove(const T& value) {
+        __ss_int slot = table_.find_slot(value, __ss_hash<T>::hash(value));
+        if (slot < 0) {
+            throw std::out_of_range("set.remove(x): x not in set");
+        }
+        table_.erase_slot(slot);
+    }
+
+    // Remove and return the oldest element
     T pop() {
-        if (len(items) == 0) {
+        if (table_.size_ == 0) {
             throw std::out_of_range("pop from an empty set");
         }
-        T value = items->__getfast__(0);
-        items->__remove__(0);
+        __ss_int e = 0;
+        while (!table_.live_[e]) {
+            e++;
+        }
+        T value = item(e);
+        discard(value);
         return value;
     }
 
+    void clear() {
+        table_.clear();
+    }
+
     __ss_int __len__() const {
-        return len(items);
+        return table_.size_;
     }
 
+    // Element at position `index` in insertion order
     T __getitem__(__ss_int index) const {
-        if(index < 0 || index >= len(items)) return T();
-        return items->__getfast__(index);
+        if(index < 0 || index >= table_.size_) return T();
+        for (__ss_int e = 0; e < table_.used_; e++) {
+            if (table_.live_[e] && index-- == 0) {
+                return item(e);
+            }
+        }
+        return T();
+    }
+
+    // Elements in either set
+    set<T>* __ss_union(const set<T>* other) const {
+        set<T>* result = new set<T>(*this);
+        if (other) {
+            for (__ss_int e = 0; e < other->table_.used_; e++) {
+                if (other->table_.live_[e]) {
+                    result->add_hashed(other->item(e), other->table_.hashes_[e]);
+                }
+            }
+        }
+        return result;
+    }
+
+    // Elements in both sets
+    set<T>* intersection(const set<T>* other) const {
+        set<T>* result = new set<T>();
+        if (!other) return result;
+        // Probe the larger set while walking the smaller one
+        const set<T>* small = table_.size_ <= other->table_.size_ ? this : other;
+        const set<T>* large = small == this ? other : this;
+        for (__ss_int e = 0; e < small->table_.used_; e++) {
+            unsigned int h = small->table_.hashes_[e];
+            if (small->table_.live_[e] && large->table_.find_slot(small->item(e), h) >= 0) {
+                result->insert_new(small->item(e), h);
+            }
+        }
+        return result;
+    }
+
+    // Elements in this set but not in other
+    set<T>* difference(const set<T>* other) const {
+        set<T>* result = new set<T>();
+        for (__ss_int e = 0; e < table_.used_; e++) {
+            if (table_.live_[e] && (!other || other->table_.find_slot(item(e), table_.hashes_[e]) < 0)) {
+                result->insert_new(item(e), table_.hashes_[e]);
+            }
+        }
+        return result;
+    }
+
+    set<T>* __or__(const set<T>* other) const {
+        return __ss_union(other);
+    }
+
+    set<T>* __and__(const set<T>* other) const {
+        return intersection(other);
+    }
+
+    set<T>* __sub__(const set<T>* other) const {
+        return difference(other);
     }
 
     class for_in_loop {
-        typename list<T>::Iterator it;
-        typename list<T>::Iterator end_it;
+        const set<T>* owner;
+        __ss_int pos;
     public:
-        for_in_loop() : it(nullptr), end_it(nullptr) {}
-        for_in_loop(set<T>& s) : it(s.items->begin()), end_it(s.items->end()) {}
+        for_in_loop() : owner(nullptr), pos(0) {}
+        for_in_loop(set<T>& s) : owner(&s), pos(0) {}
         bool __next__(T& ref) {
-            if (it != end_it) {
-                ref = *it;
-                ++it;
-                return true;
+            if (!owner) return false;
+            while (pos < owner->table_.used_) {
+                __ss_int e = pos++;
+                if (owner->table_.live_[e]) {
+                    ref = owner->item(e);
+                    return true;
+                }
             }
             return false;
         }
     };
-
-    ~set() {
-        delete items;
-    }
 };
 
 } // namespace shedskin
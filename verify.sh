@@ -25,7 +25,29 @@ INPUT_FILES=()            # Array to store multiple input files
 MAIN_FILE=""              # Main file to be verified
 FORCE_CONVERT=false       # Flag to force conversion of all lines/functions
 USE_LOCAL_LLM=false       # Flag for using local LLM via aider.sh
+LOCAL_LLM_API_BASE=${LOCAL_LLM_API_BASE:-http://localhost:8080/v1}  # Endpoint --local-llm points aider at
+LOCAL_LLM_API_KEY=${LOCAL_LLM_API_KEY:-dummy}  # API key --local-llm sends there
 C_FILE_MODE=false         # Flag for processing .c files directly
+USE_CACHE=true            # Reuse cached LLM translations for unchanged inputs
+JOBS=1                    # Number of concurrent per-function ESBMC runs (--analyze)
+USE_PORTFOLIO=false       # Race several ESBMC strategies and keep the first verdict
+PORTFOLIO_CONFIGS=""      # Comma-separated portfolio configs (empty: scripts/esbmc_portfolio.py defaults)
+USE_LLM_SERVICE=true      # Send aider requests to the resident LLM service when it is running
+START_LLM_SERVICE=false   # Start the resident LLM service if it is not running
+USE_SHEDSKIN_SERVER=true  # Send shedskin translate to the resident server when it is running
+START_SHEDSKIN_SERVER=false  # Start the resident shedskin server if it is not running
+REPAIR_MAX_ATTEMPTS=${REPAIR_MAX_ATTEMPTS:-5}        # LLM rounds allowed in --validate-translation
+REPAIR_MAX_SECONDS=${REPAIR_MAX_SECONDS:-600}       # Wall-clock budget for the repair loop
+REPAIR_MAX_TOKENS=${REPAIR_MAX_TOKENS:-200000}      # Estimated prompt-token budget for the repair loop
+REPAIR_MAX_REPEATS=${REPAIR_MAX_REPEATS:-2}         # Give up when the same parse errors return this often
+METRICS_FILE="${VERIFY_METRICS_FILE:-}"             # Append per-stage timing spans (JSON lines) here
+PROFILE=false             # Print a per-stage timing breakdown at exit
+INCREMENTAL=false         # --multi-file: translate per module and reuse unchanged units
+SLICE_ENTRY=""            # Keep only code reachable from this entry point (scripts/slicer.py)
+SLICE_DEPTH=""            # Stub calls deeper than this many levels below the entry
+REPLAY_CEX=false          # Replay counterexamples on the original Python (scripts/cex_replay.py)
+FUZZ_SECONDS=""           # Fuzz the Python program this long before translating (scripts/nondet_fuzz.py)
+USE_RUNTIME_BUNDLE=true   # Copy the C++ runtime headers as one bundled builtin.hpp (scripts/runtime_bundle.py)
 
 
 # Prompt file paths
@@ -34,15 +56,97 @@ VALIDATION_INSTRUCTION_FILE="prompts/validation_prompt.txt"
 EXPLANATION_INSTRUCTION_FILE="prompts/explanation_prompt.txt"
 MULTI_FILE_INSTRUCTION_FILE="prompts/multi_file_prompt.txt"
 
+# Per-stage timing spans (see scripts/stage_metrics.py); no-ops without a metrics file
+now_seconds() {
+    if [ -n "$EPOCHREALTIME" ]; then
+        echo "${EPOCHREALTIME/,/.}"
+    else
+        date +%s.%N
+    fi
+}
+
+# metrics_span STAGE START EXIT [KEY=VALUE ...]
+metrics_span() {
+    [ -z "$METRICS_FILE" ] && return 0
+    local stage=$1 start=$2 status=$3 end extra="" field value
+    end=$(now_seconds)
+    shift 3
+    for field in "$@"; do
+        value=${field#*=}
+        value=${value//\\/\\\\}
+        value=${value//\"/\\\"}
+        extra+=",\"${field%%=*}\":\"$value\""
+    done
+    printf '{"run":"%s","stage":"%s","start":%s,"end":%s,"exit":%d%s}\n' \
+        "$METRICS_RUN" "$stage" "$start" "$end" "$status" "$extra" >> "$METRICS_FILE"
+}
+
+# metrics_esbmc_span START EXIT OUTPUT_FILE [KEY=VALUE ...]: also records ESBMC's symex/solver times
+metrics_esbmc_span() {
+    [ -z "$METRICS_FILE" ] && return 0
+    local start=$1 status=$2 output=$3 field details=()
+    shift 3
+    for field in "$@"; do
+        details+=(--detail "$field")
+    done
+    python3 "$OLD_PWD/scripts/stage_metrics.py" span --metrics "$METRICS_FILE" --run "$METRICS_RUN" \
+        --stage esbmc --start "$start" --exit "$status" --esbmc-output "$output" "${details[@]}"
+}
+
+# timed_stage STAGE COMMAND...: run COMMAND and record its span
+timed_stage() {
+    local stage=$1 start status
+    shift
+    if [ -z "$METRICS_FILE" ]; then
+        "$@"
+        return
+    fi
+    start=$(now_seconds)
+    "$@"
+    status=$?
+    metrics_span "$stage" "$start" $status
+    return $status
+}
+
+print_profile() {
+    local status=$?
+    metrics_span total "$METRICS_START" $status
+    if [ "$PROFILE" = true ]; then
+        echo "========================================"
+        echo "Stage timing breakdown ($METRICS_FILE):"
+        python3 "$OLD_PWD/scripts/stage_metrics.py" report --metrics "$METRICS_FILE" --run "$METRICS_RUN"
+    fi
+    return $status
+}
+
 # Run aider from venv
 run_aider() {
+    local start status
+    start=$(now_seconds)
+    run_aider_command "$@"
+    status=$?
+    metrics_span llm "$start" $status "model=$LLM_MODEL"
+    return $status
+}
+
+run_aider_command() {
     if [ "$USE_LOCAL_LLM" = true ]; then
-        # Set environment variables for local LLM
-        export OPENAI_API_KEY=dummy
-        export OPENAI_API_BASE=http://localhost:8080/v1
+        # Set environment variables for local LLM; they replace any cloud
+        # provider settings so prompts never leave the local endpoint
+        export OPENAI_API_KEY=$LOCAL_LLM_API_KEY
+        export OPENAI_API_BASE=$LOCAL_LLM_API_BASE
         echo "Using local LLM with OPENAI_API_BASE=$OPENAI_API_BASE"
     fi
 
+    # Prefer the resident service (scripts/llm_service.py); it exits with 75
+    # when it is not running or cannot handle these arguments
+    if [ "$USE_LLM_SERVICE" = true ] && [ -S "$LLM_SERVICE_SOCKET" ]; then
+        python3 "$OLD_PWD/scripts/llm_service.py" --socket "$LLM_SERVICE_SOCKET" aider "$@"
+        local service_exit=$?
+        [ $service_exit -ne 75 ] && return $service_exit
+        echo "LLM service unavailable, running aider directly" >&2
+    fi
+
     if [ -d "$OLD_PWD/venv" ]; then
         PYTHON_BIN="$OLD_PWD/venv/bin/python"
         AIDER_BIN="$OLD_PWD/venv/bin/aider"
@@ -57,12 +161,37 @@ run_aider() {
     fi
 }
 
+# Translation cache helpers (see scripts/translation_cache.py)
+translation_cache() {
+    python3 "$OLD_PWD/scripts/translation_cache.py" "$@"
+}
+
+translation_cache_key() {
+    local input_file=$1
+    translation_cache key \
+        --file "$input_file" \
+        --file "$SOURCE_INSTRUCTION_FILE" \
+        --value "model=$LLM_MODEL" \
+        --value "extension=${input_file##*.}" \
+        --value "direct=$DIRECT_TRANSLATION" \
+        --value "force-convert=$FORCE_CONVERT" \
+        --value "analyze=$USE_ANALYSIS" \
+        --value "function=$TEST_FUNCTION_NAME"
+}
+
+# Run esbmc inside a persistent worker container (see scripts/esbmc_container.py)
+esbmc_docker() {
+    $ESBMC_CONTAINER_CMD exec -- esbmc "$@"
+}
+
 show_usage() {
-    echo "Usage: ./verify.sh [--docker] [--llm] [--image IMAGE_NAME | --container CONTAINER_ID] [--esbmc-opts \"ESBMC_OPTIONS\"] [--esbmc-exec EXECUTABLE] [--model MODEL_NAME] [--translate MODE] [--function FUNCTION_NAME] [--explain] [--fast] [--validate-translation MODE] [--analyze] [--direct] [--multi-file MAIN_FILE] [--force-convert] [--local-llm] [--c-file] <filename> [<filename2> <filename3> ...]"
+    echo "Usage: ./verify.sh [--docker] [--llm] [--image IMAGE_NAME | --container CONTAINER_ID] [--esbmc-opts \"ESBMC_OPTIONS\"] [--esbmc-exec EXECUTABLE] [--model MODEL_NAME] [--translate MODE] [--function FUNCTION_NAME] [--explain] [--fast] [--validate-translation MODE] [--analyze] [--direct] [--multi-file MAIN_FILE] [--force-convert] [--local-llm] [--c-file] [--no-cache] [--jobs N] [--portfolio] [--portfolio-configs LIST] [--llm-service | --no-llm-service] [--shedskin-server | --no-shedskin-server] [--max-repair-attempts N] [--repair-budget SECONDS] [--metrics-file FILE] [--profile] [--incremental] [--slice ENTRY] [--slice-depth N] [--replay] [--fuzz SECONDS] [--no-runtime-bundle] <filename> [<filename2> <filename3> ...]"
     echo "Options:"
     echo "  --docker              Run ESBMC in Docker container"
     echo "  --image IMAGE_NAME    Specify Docker image (default: esbmc)"
     echo "  --container ID        Specify existing container ID"
+    echo "                        (without --container, a persistent worker container is started"
+    echo "                        once and reused; stop it with scripts/esbmc_container.py stop)"
     echo "  --esbmc-opts OPTS     Additional ESBMC options (in quotes)"
     echo "  --esbmc-exec EXECUTABLE  Specify custom ESBMC executable path (default: esbmc)"
     echo "  --function FUNCTION_NAME   Test function mode (adds --function)"
@@ -73,22 +202,59 @@ show_usage() {
     echo "  --validate-translation MODE Validate and fix translated code (partial|complete)"
     echo "                        partial: Basic validation of syntax and structure"
     echo "                        complete: Ensure full functional equivalence"
+    echo "  --max-repair-attempts N  LLM rounds allowed while validating (default: 5)"
+    echo "  --repair-budget SECONDS  Wall-clock budget for validation repairs (default: 600)"
+    echo "                        (also REPAIR_MAX_TOKENS and REPAIR_MAX_REPEATS in the environment;"
+    echo "                        an interrupted validation resumes where it stopped)"
     echo "  --explain             Explain ESBMC violations in terms of source code"
+    echo "  --replay              Re-run the original Python with the counterexample's nondet values"
+    echo "                        to confirm the violation; with --explain, only violations that do"
+    echo "                        not reproduce are sent to the LLM (scripts/cex_replay.py)"
+    echo "  --fuzz SECONDS        Run the Python program with generated nondet values for up to SECONDS"
+    echo "                        first; a failed assertion is reported with its values and skips"
+    echo "                        translation and ESBMC (scripts/nondet_fuzz.py). Other exceptions do not"
+    echo "                        count. The program is really executed, file and OS side effects included"
+    echo "  --no-runtime-bundle   Copy the C++ runtime headers one by one instead of as a single"
+    echo "                        bundled builtin.hpp (scripts/runtime_bundle.py)"
     echo "  --fast                Enable fast mode (adds --unwind 10 --no-unwinding-assertions)"
     echo "  --analyze             Analyze and test functions that may have errors"
+    echo "  --jobs N              Verify up to N analyzed functions concurrently (default: 1)"
+    echo "  --portfolio           Race incremental-BMC, k-induction, fixed unwind and other solvers"
+    echo "                        and keep the first conclusive verdict (scripts/esbmc_portfolio.py)"
+    echo "  --portfolio-configs LIST  Comma-separated configs to race (implies --portfolio)"
     echo "  --direct              Use direct LLM translation (Python to C) without shedskin"
     echo "  --multi-file MAIN_FILE Verify multiple files with MAIN_FILE as entry point"
     echo "                        (Can be used with or without --llm)"
     echo "                        Can also accept a glob pattern like '*.py' or 'src/*.py'"
+    echo "  --incremental         With --multi-file --llm, translate each module into its own C unit in"
+    echo "                        import order and re-translate only modules whose source or imported"
+    echo "                        interfaces changed (scripts/multi_module.py)"
+    echo "  --slice ENTRY         Before translating, drop code not reachable from ENTRY (FUNC,"
+    echo "                        Class.method, line:N or __main__) and stub what is cut off with"
+    echo "                        nondet returns (scripts/slicer.py)"
+    echo "  --slice-depth N       With --slice, stub calls more than N levels below the entry"
     echo "  --force-convert       Force conversion of all functions with reasonable implementations"
     echo "  --model MODEL_NAME    Specify LLM model for both cloud and local LLMs"
     echo "                        Examples: openrouter/anthropic/claude-3-sonnet"
     echo "                                  openrouter/google/gemini-2.0-flash-001"
     echo "                                  openai/gpt-4"
     echo "                                  local-model-name (use with --local-llm)"
-    echo "  --local-llm           Use local LLM via aider.sh (sets OPENAI_API_KEY=dummy and OPENAI_API_BASE=http://localhost:8080/v1)"
+    echo "  --local-llm           Use local LLM via aider.sh (sets OPENAI_API_KEY=dummy and OPENAI_API_BASE=http://localhost:8080/v1;"
+    echo "                        override them with LOCAL_LLM_API_KEY and LOCAL_LLM_API_BASE, e.g. for scripts/llm_stub.py)"
     echo "                        Use --model to specify which local model to use"
     echo "  --c-file              Process .c files directly without conversion (for debugging)"
+    echo "  --llm-service         Start the resident LLM service (scripts/llm_service.py) if needed"
+    echo "                        and send all aider requests to it"
+    echo "  --no-llm-service      Always start a separate aider process per request"
+    echo "  --shedskin-server     Start the resident shedskin server (scripts/shedskin_server.py) if"
+    echo "                        needed and send shedskin translations to it"
+    echo "  --no-shedskin-server  Always run shedskin as a separate process"
+    echo "  --no-cache            Do not read or write the LLM translation and ESBMC verdict caches"
+    echo "                        (cache dir: \$ESBMC_PYTHON_CPP_CACHE or ~/.cache/esbmc-python-cpp)"
+    echo "  --metrics-file FILE   Append per-stage timing spans as JSON lines to FILE"
+    echo "                        (default: \$VERIFY_METRICS_FILE; see scripts/stage_metrics.py)"
+    echo "  --profile             Print a per-stage timing breakdown (LLM, parse checks, Shedskin,"
+    echo "                        ESBMC symex/solver) when verify.sh exits"
     exit 1
 }
 
@@ -137,92 +303,95 @@ check_threading() {
     fi
 }
 
+# Repair loop state and budgets live in scripts/repair_engine.py
+repair_engine() {
+    python3 "$OLD_PWD/scripts/repair_engine.py" "$@"
+}
+
 validate_translation() {
     local original_file=$1
     local converted_file=$2
     local validation_mode=$3
-    local attempt=1
-    local success=false
+    local analysis_message=""
+    local parse_cmd=(esbmc)
+    [ "$USE_DOCKER" = true ] && parse_cmd=($ESBMC_CONTAINER_CMD exec --cwd "$(pwd)" -- esbmc)
 
     echo "Validating translation in $validation_mode mode..."
 
-    local VALIDATION_LOG=$(mktemp)
     local COMBINED_FILE=$(mktemp)
+    local FEEDBACK_FILE=$(mktemp)
+    local state
+    state=$(repair_engine start \
+        --original "$original_file" --converted "$converted_file" \
+        --file "$VALIDATION_INSTRUCTION_FILE" \
+        --value "model=$LLM_MODEL" --value "mode=$validation_mode" --value "analyze=$USE_ANALYSIS" \
+        --max-attempts "$REPAIR_MAX_ATTEMPTS" --max-seconds "$REPAIR_MAX_SECONDS" \
+        --max-tokens "$REPAIR_MAX_TOKENS" --max-repeats "$REPAIR_MAX_REPEATS")
+    if [ $? -ne 0 ] || [ -z "$state" ]; then
+        echo "Error: could not initialise the repair loop"
+        rm -f "$COMBINED_FILE" "$FEEDBACK_FILE"
+        return 1
+    fi
 
-    while [ "$success" = false ]; do
-        echo "Translation attempt $attempt..."
-
-        if [ "$USE_ANALYSIS" = true ]; then
-            local analysis_message="3. Pay special attention to these potentially problematic functions:\n"
-            ANALYZED_FUNCTIONS=$(analyze_code_for_errors "$input_file" | tr -d '[:space:]')
-            if [ ! -z "$ANALYZED_FUNCTIONS" ]; then
-                for func in $(echo "$ANALYZED_FUNCTIONS" | tr ',' ' '); do
-                    if [[ $func =~ ^[a-zA-Z0-9_]+$ ]]; then
-                        analysis_message+="   - Ensure function '$func' is correctly converted:\n"
-                        analysis_message+="     * Same function name preserved in C\n"
-                        analysis_message+="     * Equivalent parameter types and return type\n"
-                        analysis_message+="     * All function logic maintained exactly\n"
-                        analysis_message+="     * The function converts to c must be the same even the content is very important \n"
-                    fi
-                done
+    # One full review with the original code; later rounds only send parse errors
+    if [ "$USE_ANALYSIS" = true ]; then
+        analysis_message="3. Pay special attention to these potentially problematic functions:\n"
+        [ -z "$ANALYZED_FUNCTIONS" ] && ANALYZED_FUNCTIONS=$(analyze_code_for_errors "$original_file" | tr -d '[:space:]')
+        for func in $(echo "$ANALYZED_FUNCTIONS" | tr ',' ' '); do
+            if [[ $func =~ ^[a-zA-Z0-9_]+$ ]]; then
+                analysis_message+="   - Ensure function '$func' is correctly converted:\n"
+                analysis_message+="     * Same function name preserved in C\n"
+                analysis_message+="     * Equivalent parameter types and return type\n"
+                analysis_message+="     * All function logic maintained exactly\n"
+                analysis_message+="     * The function converts to c must be the same even the content is very important \n"
             fi
-        fi
-
-        {
-            echo "=== TRANSLATION STATUS REQUEST ==="
-            echo "Please review the current translation state and:"
-            echo "1. Implement any missing functions if needed"
-            echo "2. Fix any compilation errors in the current code"
-            echo "$analysis_message"
-            echo ""
-            echo "=== ORIGINAL CODE ==="
-            cat "$original_file"
-            echo -e "\n=== CURRENT TRANSLATION ==="
-            cat "$converted_file"
-        } > "$COMBINED_FILE"
+        done
+    fi
 
-        run_aider --no-git --no-show-model-warnings --model "$LLM_MODEL" --yes \
-            --message-file "$VALIDATION_INSTRUCTION_FILE" \
-            --read "$COMBINED_FILE" "$converted_file"
+    {
+        echo "=== TRANSLATION STATUS REQUEST ==="
+        echo "Please review the current translation state and:"
+        echo "1. Implement any missing functions if needed"
+        echo "2. Fix any compilation errors in the current code"
+        echo -e "$analysis_message"
+        echo ""
+        echo "=== ORIGINAL CODE ==="
+        cat "$original_file"
+        echo -e "\n=== CURRENT TRANSLATION ==="
+        cat "$converted_file"
+    } > "$COMBINED_FILE"
+
+    repair_engine next --state "$state" --review \
+        --files "$VALIDATION_INSTRUCTION_FILE" "$COMBINED_FILE" "$converted_file"
+    case $? in
+        0)
+            run_aider --no-git --no-show-model-warnings --model "$LLM_MODEL" --yes \
+                --message-file "$VALIDATION_INSTRUCTION_FILE" \
+                --read "$COMBINED_FILE" "$converted_file"
+            ;;
+        3) echo "Review already done in an earlier run, resuming repairs" ;;
+        *) rm -f "$COMBINED_FILE" "$FEEDBACK_FILE"; return 1 ;;
+    esac
 
+    local result=1
+    while true; do
         echo "Checking if code compiles..."
-        if [ "$USE_DOCKER" = true ]; then
-            CMDRUN="docker run --rm -v $(pwd):/workspace -w /workspace $DOCKER_IMAGE esbmc"
-                 # Run esbmc in the container with current directory mounted
-            CMRUN='docker exec -w "/workspace" "${CONTAINER_NAME}" $ESBMC_EXECUTABLE "$@"'
-        else
-            CMDRUN="esbmc"
-        fi
-
-        if [ "$USE_DOCKER" = true ]; then
-            # For Docker, we need to capture the exit code differently
-            $CMDRUN --parse-tree-only "$converted_file" 2>/dev/null
-            docker_exit_code=$?
-            if [ $docker_exit_code -eq 0 ]; then
-                echo "Compilation successful"
-                success=true
-            else
-                echo "Compilation failing on attempt $attempt (exit code: $docker_exit_code) - will retry with fixes..."
-                echo "Requesting LLM to fix compilation errors and try again..."
-                sleep 1
-            fi
-        else
-            # For local execution, use the original method
-            if $CMDRUN --parse-tree-only "$converted_file" 2>/dev/null; then
-                echo "Compilation successful"
-                success=true
-            else
-                echo "Compilation failing on attempt $attempt - will retry with fixes..."
-                echo "Requesting LLM to fix compilation errors and try again..."
-                sleep 1
-            fi
-        fi
-
-        ((attempt++))
+        timed_stage parse_check repair_engine check --state "$state" --converted "$converted_file" \
+            --feedback "$FEEDBACK_FILE" -- "${parse_cmd[@]}" --parse-tree-only "$converted_file"
+        case $? in
+            0) result=0; break ;;
+            1) ;;
+            *) break ;;
+        esac
+
+        repair_engine next --state "$state" --files "$FEEDBACK_FILE" "$converted_file" || break
+        echo "Requesting LLM to fix the reported parse errors..."
+        run_aider --no-git --no-show-model-warnings --model "$LLM_MODEL" --yes \
+            --message-file "$FEEDBACK_FILE" "$converted_file"
     done
 
-    rm -f "$VALIDATION_LOG" "$COMBINED_FILE"
-    return 0
+    rm -f "$COMBINED_FILE" "$FEEDBACK_FILE"
+    return $result
 }
 
 attempt_llm_conversion() {
@@ -232,6 +401,17 @@ attempt_llm_conversion() {
     local attempt=1
     local success=false
     local file_extension="${input_file##*.}"
+    local cache_key=""
+    local cached_functions=""
+
+    if [ "$USE_CACHE" = true ]; then
+        cache_key=$(translation_cache_key "$input_file")
+        if [ ! -z "$cache_key" ] && cached_functions=$(translation_cache get --field analyzed_functions "$cache_key" "$output_file"); then
+            echo "Using cached translation for $input_file (key ${cache_key:0:12})"
+            [ "$USE_ANALYSIS" = true ] && ANALYZED_FUNCTIONS="$cached_functions"
+            return 0
+        fi
+    fi
 
     local TEMP_PROMPT="$TEMP_DIR/aider_prompt.txt"
     if [ "$USE_ANALYSIS" = true ]; then
@@ -340,7 +520,7 @@ attempt_llm_conversion() {
             
             if [ "$USE_DOCKER" = true ]; then
                 run_aider --no-git --no-show-model-warnings --model "$LLM_MODEL" --test --auto-test \
-                    --test-cmd "docker run --rm -v $(pwd):/workspace -w /workspace $DOCKER_IMAGE esbmc --parse-tree-only $output_file" \
+                    --test-cmd "$ESBMC_CONTAINER_CMD exec --cwd $(pwd) -- esbmc --parse-tree-only $output_file" \
                     --yes --message-file "$TEMP_PROMPT" --read "$input_file" "$output_file"
             else
                 run_aider --no-git --no-show-model-warnings --model "$LLM_MODEL" --test --auto-test \
@@ -350,7 +530,7 @@ attempt_llm_conversion() {
         fi
 
         if [ "$USE_DOCKER" = true ]; then
-            CMDRUN="docker run --rm -v $(pwd):/workspace -w /workspace $DOCKER_IMAGE esbmc"
+            CMDRUN="esbmc_docker"
         else
             CMDRUN="$ESBMC_EXECUTABLE"
         fi
@@ -387,7 +567,7 @@ attempt_llm_conversion() {
             
             # Run with explicit error output for debugging
             echo "Running command with stderr visible:" >&2
-            ESBMC_ERROR_OUTPUT=$("$CMDRUN" --parse-tree-only "$output_file" 2>&1)
+            ESBMC_ERROR_OUTPUT=$(timed_stage parse_check "$CMDRUN" --parse-tree-only "$output_file" 2>&1)
             docker_exit_code=$?
             echo "ESBMC command exit code: $docker_exit_code" >&2
             echo "Exit code meaning: "
@@ -423,7 +603,7 @@ attempt_llm_conversion() {
             echo "Command to be executed: $CMDRUN --parse-tree-only \"$output_file\"" >&2
             
             # Capture error output for local execution too
-            ESBMC_ERROR_OUTPUT=$("$CMDRUN" --parse-tree-only "$output_file" 2>&1)
+            ESBMC_ERROR_OUTPUT=$(timed_stage parse_check "$CMDRUN" --parse-tree-only "$output_file" 2>&1)
             local_exit_code=$?
             
             if [ $local_exit_code -eq 0 ]; then
@@ -444,6 +624,15 @@ attempt_llm_conversion() {
     done
 
     rm -f "$TEMP_PROMPT"
+
+    if [ "$success" = true ] && [ ! -z "$cache_key" ]; then
+        translation_cache put "$cache_key" "$output_file" \
+            --meta "source=$input_file" \
+            --meta "model=$LLM_MODEL" \
+            --meta "analyzed_functions=$ANALYZED_FUNCTIONS" \
+            || echo "Warning: failed to store translation in cache"
+    fi
+
     return $([ "$success" = true ] && echo 0 || echo 1)
 }
 
@@ -474,6 +663,37 @@ explain_violation() {
     rm "$temp_file"
 }
 
+# Run "shedskin translate" with the given arguments. Prefer the resident
+# server (scripts/shedskin_server.py); it exits with 75 when it is not running
+run_shedskin() {
+    if [ "$USE_SHEDSKIN_SERVER" = true ] && [ -S "$SHEDSKIN_SERVER_SOCKET" ]; then
+        python3 "$OLD_PWD/scripts/shedskin_server.py" --socket "$SHEDSKIN_SERVER_SOCKET" translate "$@"
+        local server_exit=$?
+        [ $server_exit -ne 75 ] && return $server_exit
+        echo "Shedskin server unavailable, running shedskin directly" >&2
+    fi
+    shedskin translate "$@"
+}
+
+# Replay the counterexample in an ESBMC output file on the original Python.
+# Returns 0 when Python fails the same way, so the violation is confirmed.
+replay_counterexample() {
+    local output_file=$1
+    [ "$EXTENSION" != "py" ] && return 2
+    timed_stage replay python3 "$OLD_PWD/scripts/cex_replay.py" --source-dir "$TEMP_DIR" replay --output "$output_file" "$FILENAME"
+}
+
+# Called after a failed ESBMC run: replay and/or explain the violation
+report_violation() {
+    local output_file=$1
+    if [ "$REPLAY_CEX" = true ] && replay_counterexample "$output_file"; then
+        [ "$EXPLAIN_VIOLATION" = true ] && echo "Violation reproduced in Python, skipping LLM explanation"
+        return 0
+    fi
+    [ "$EXPLAIN_VIOLATION" = true ] && explain_violation "$FILENAME" "$TARGET_FILE" "$(cat "$output_file")"
+    return 0
+}
+
 # Parse command line arguments
 while [[ $# -gt 0 ]]; do
     case $1 in
@@ -493,6 +713,39 @@ while [[ $# -gt 0 ]]; do
             fi
             shift
             ;;
+        --no-cache) USE_CACHE=false; shift ;;
+        --llm-service) USE_LLM_SERVICE=true; START_LLM_SERVICE=true; shift ;;
+        --no-llm-service) USE_LLM_SERVICE=false; START_LLM_SERVICE=false; shift ;;
+        --shedskin-server) USE_SHEDSKIN_SERVER=true; START_SHEDSKIN_SERVER=true; shift ;;
+        --no-shedskin-server) USE_SHEDSKIN_SERVER=false; START_SHEDSKIN_SERVER=false; shift ;;
+        --jobs)
+            [[ "$2" =~ ^[1-9][0-9]*$ ]] || { echo "Error: --jobs requires a positive integer"; show_usage; }
+            JOBS="$2"
+            shift 2
+            ;;
+        --max-repair-attempts)
+            [[ "$2" =~ ^[1-9][0-9]*$ ]] || { echo "Error: --max-repair-attempts requires a positive integer"; show_usage; }
+            REPAIR_MAX_ATTEMPTS="$2"
+            shift 2
+            ;;
+        --repair-budget)
+            [[ "$2" =~ ^[1-9][0-9]*$ ]] || { echo "Error: --repair-budget requires a number of seconds"; show_usage; }
+            REPAIR_MAX_SECONDS="$2"
+            shift 2
+            ;;
+        --portfolio) USE_PORTFOLIO=true; shift ;;
+        --profile) PROFILE=true; shift ;;
+        --metrics-file)
+            [ -z "$2" ] && { echo "Error: --metrics-file requires a file name"; show_usage; }
+            METRICS_FILE="$2"
+            shift 2
+            ;;
+        --portfolio-configs)
+            [ -z "$2" ] && { echo "Error: --portfolio-configs requires a list of configs"; show_usage; }
+            USE_PORTFOLIO=true
+            PORTFOLIO_CONFIGS="$2"
+            shift 2
+            ;;
         --c-file)
             C_FILE_MODE=true
             echo "Processing .c file directly (no conversion)"
@@ -516,6 +769,9 @@ while [[ $# -gt 0 ]]; do
             FORCE_CONVERT=true
             shift
             ;;
+        --incremental) INCREMENTAL=true; shift ;;
+        --slice) SLICE_ENTRY="$2"; shift 2 ;;
+        --slice-depth) SLICE_DEPTH="$2"; shift 2 ;;
         --validate-translation)
             case "$2" in
                 partial|complete)
@@ -530,6 +786,13 @@ while [[ $# -gt 0 ]]; do
             esac
             ;;
         --explain) EXPLAIN_VIOLATION=true; shift ;;
+        --replay) REPLAY_CEX=true; shift ;;
+        --no-runtime-bundle) USE_RUNTIME_BUNDLE=false; shift ;;
+        --fuzz)
+            [[ "$2" =~ ^[0-9]+([.][0-9]+)?$ ]] || { echo "Error: --fuzz requires a number of seconds"; show_usage; }
+            FUZZ_SECONDS="$2"
+            shift 2
+            ;;
         --fast) FAST_MODE=true; shift ;;
         --translate)
             [ -z "$2" ] && { echo "Error: --translate requires mode (fast|reasoning)"; show_usage; }
@@ -695,10 +958,57 @@ else
     DIRNAME=$(dirname "$FULLPATH")
 fi
 
+if [ "$INCREMENTAL" = true ] && { [ "$MULTI_FILE_MODE" != true ] || [ "$USE_LLM" != true ]; }; then
+    echo "Warning: --incremental only applies to --multi-file with LLM translation"
+fi
+
+if [ -n "$SLICE_ENTRY" ] && { [ "$MULTI_FILE_MODE" = true ] || [ "$EXTENSION" != "py" ]; }; then
+    echo "Warning: --slice only applies to a single Python file, ignoring it"
+    SLICE_ENTRY=""
+fi
+
 TEMP_DIR=$(mktemp -d)
 echo "Working directory: $TEMP_DIR"
 OLD_PWD=$(pwd)
 
+# Timing spans are appended from TEMP_DIR and from subshells, so use an absolute path
+[ "$PROFILE" = true ] && [ -z "$METRICS_FILE" ] && METRICS_FILE="$TEMP_DIR/metrics.jsonl"
+if [ -n "$METRICS_FILE" ]; then
+    [[ "$METRICS_FILE" != /* ]] && METRICS_FILE="$OLD_PWD/$METRICS_FILE"
+    METRICS_START=$(now_seconds)
+    METRICS_RUN="$$-$METRICS_START"
+    trap print_profile EXIT
+fi
+
+if [ "$USE_DOCKER" = true ]; then
+    DOCKER_IMAGE=${DOCKER_IMAGE:-esbmc}
+    if [ ! -z "$CONTAINER_ID" ]; then
+        ESBMC_CONTAINER_CMD="python3 $OLD_PWD/scripts/esbmc_container.py --container $CONTAINER_ID"
+    else
+        ESBMC_CONTAINER_CMD="python3 $OLD_PWD/scripts/esbmc_container.py --image $DOCKER_IMAGE"
+    fi
+fi
+
+if [ "$USE_LLM_SERVICE" = true ]; then
+    LLM_SERVICE_SOCKET=$(python3 "$OLD_PWD/scripts/llm_service.py" path)
+    if [ "$START_LLM_SERVICE" = true ] && [ "$USE_LLM" = true ]; then
+        # The service imports aider itself, so run it with the venv interpreter when there is one
+        LLM_SERVICE_PYTHON=python3
+        [ -x "$OLD_PWD/venv/bin/python" ] && LLM_SERVICE_PYTHON="$OLD_PWD/venv/bin/python"
+        "$LLM_SERVICE_PYTHON" "$OLD_PWD/scripts/llm_service.py" start || echo "Warning: LLM service failed to start, using aider directly"
+    fi
+fi
+
+if [ "$USE_SHEDSKIN_SERVER" = true ] && [ "$DIRECT_TRANSLATION" != true ] && [ "$EXTENSION" = "py" ]; then
+    SHEDSKIN_SERVER_SOCKET=$(python3 "$OLD_PWD/scripts/shedskin_server.py" path)
+    if [ "$START_SHEDSKIN_SERVER" = true ]; then
+        # The server imports shedskin itself, so run it with the venv interpreter when there is one
+        SHEDSKIN_SERVER_PYTHON=python3
+        [ -x "$OLD_PWD/venv/bin/python" ] && SHEDSKIN_SERVER_PYTHON="$OLD_PWD/venv/bin/python"
+        "$SHEDSKIN_SERVER_PYTHON" "$OLD_PWD/scripts/shedskin_server.py" start || echo "Warning: shedskin server failed to start, using shedskin directly"
+    fi
+fi
+
 # Check if prompts directory exists
 [ ! -d "prompts" ] && { echo "Error: prompts directory not found"; exit 1; }
 [ ! -f "prompts/explanation_prompt.txt" ] && { echo "Error: explanation_prompt.txt not found in prompts directory"; exit 1; }
@@ -708,6 +1018,7 @@ mkdir -p prompts
 cp "$SOURCE_INSTRUCTION_FILE" prompts/aider_prompt.txt 2>/dev/null
 
 # Copy files to temp directory
+COPY_START=$(now_seconds)
 cp -r module_import/* "$TEMP_DIR/" 2>/dev/null
 if [ "$MULTI_FILE_MODE" = true ]; then
     for file in "${INPUT_FILES[@]}"; do
@@ -742,9 +1053,18 @@ else
 fi
 [ -f "esbmc.py" ] && cp "esbmc.py" "$TEMP_DIR/"
 [ -d "prompts" ] && cp -r prompts "$TEMP_DIR/"
-for file in *.hpp; do
-    [ -f "$file" ] && cp "$file" "$TEMP_DIR/${file}"
-done
+# When ESBMC will verify the shedskin C++ output, the runtime headers are
+# bundled into one builtin.hpp, cached by their content hash; otherwise (or
+# if bundling fails) they are copied one by one
+RUNTIME_BUNDLE_ARGS=()
+[ "$USE_CACHE" != true ] && RUNTIME_BUNDLE_ARGS+=(--no-cache)
+if [ "$USE_RUNTIME_BUNDLE" != true ] || [ "$USE_LLM" = true ] || [ "$EXTENSION" != "py" ] || \
+        [ ! -f builtin.hpp ] || ! python3 scripts/runtime_bundle.py install "${RUNTIME_BUNDLE_ARGS[@]}" "$TEMP_DIR" > /dev/null; then
+    for file in *.hpp; do
+        [ -f "$file" ] && cp "$file" "$TEMP_DIR/${file}"
+    done
+fi
+metrics_span copy_headers "$COPY_START" 0
 
 # Create multi-file prompt if it doesn't exist
 if [ "$MULTI_FILE_MODE" = true ] && [ ! -f "$TEMP_DIR/prompts/multi_file_prompt.txt" ]; then
@@ -767,6 +1087,32 @@ fi
 
 cd "$TEMP_DIR"
 [ -d "$OLD_PWD/venv" ] && source "$OLD_PWD/venv/bin/activate"
+
+if [ -n "$SLICE_ENTRY" ]; then
+    # Translate and verify only what the entry point can reach; the full
+    # program is kept next to it for reference
+    cp "$FILENAME" "${BASENAME}.full.py"
+    SLICE_ARGS=(--entry "$SLICE_ENTRY")
+    [ -n "$SLICE_DEPTH" ] && SLICE_ARGS+=(--depth "$SLICE_DEPTH")
+    if ! timed_stage slice python3 "$OLD_PWD/scripts/slicer.py" "${SLICE_ARGS[@]}" -o "$FILENAME" "${BASENAME}.full.py"; then
+        echo "Error: slicing $FILENAME from $SLICE_ENTRY failed"
+        exit 1
+    fi
+fi
+
+if [ -n "$FUZZ_SECONDS" ] && [ "$EXTENSION" = "py" ]; then
+    # A concrete assertion failure settles the verdict without translation or
+    # ESBMC; any other outcome leaves it to model checking
+    echo "Fuzzing $FILENAME for up to ${FUZZ_SECONDS}s..."
+    timed_stage fuzz python3 "$OLD_PWD/scripts/nondet_fuzz.py" --time "$FUZZ_SECONDS" \
+        --witness "$TEMP_DIR/fuzz_witness.json" "$FILENAME"
+    if [ $? -eq 1 ]; then
+        echo "VERIFICATION FAILED (found by fuzzing, witness: $TEMP_DIR/fuzz_witness.json)"
+        cd "$OLD_PWD"
+        echo "Temporary files available in: $TEMP_DIR"
+        exit 1
+    fi
+fi
 [ ! -z "$TRANSLATION_MODE" ] && echo "Using translation mode: $TRANSLATION_MODE with model: $LLM_MODEL"
 
 # Function to check for incomplete implementations and fix them
@@ -1039,7 +1385,7 @@ attempt_multi_file_conversion() {
         else
             if [ "$USE_DOCKER" = true ]; then
                 run_aider --no-git --no-show-model-warnings --model "$LLM_MODEL" --test --auto-test \
-                    --test-cmd "docker run --rm -v $(pwd):/workspace -w /workspace $DOCKER_IMAGE esbmc --parse-tree-only $(pwd)/$output_file" \
+                    --test-cmd "$ESBMC_CONTAINER_CMD exec --cwd $(pwd) -- esbmc --parse-tree-only $(pwd)/$output_file" \
                     --yes --message-file "$TEMP_PROMPT" --read "$combined_file" "$(pwd)/$output_file"
             else
                 run_aider --no-git --no-show-model-warnings --model "$LLM_MODEL" --test --auto-test \
@@ -1058,20 +1404,16 @@ attempt_multi_file_conversion() {
         fi
 
         if [ "$USE_DOCKER" = true ]; then
-            CMDRUN="docker run --rm -v $(pwd):/workspace -w /workspace $DOCKER_IMAGE esbmc"
+            CMDRUN="esbmc_docker"
         else
             CMDRUN="$ESBMC_EXECUTABLE"
         fi
 
-        if [ "$USE_DOCKER" = true ]; then
-            file_path="/workspace/$output_file"
-        else
-            file_path="$output_file"
-        fi
+        file_path="$output_file"
 
         if [ "$USE_DOCKER" = true ]; then
             # For Docker, we need to capture the exit code differently
-            $CMDRUN --parse-tree-only "$file_path" 2>/dev/null
+            timed_stage parse_check $CMDRUN --parse-tree-only "$file_path" 2>/dev/null
             docker_exit_code=$?
             if [ $docker_exit_code -eq 0 ]; then
                 echo "Successfully generated valid C code on attempt $attempt"
@@ -1082,7 +1424,7 @@ attempt_multi_file_conversion() {
             fi
         else
             # For local execution, use the original method
-            if $CMDRUN --parse-tree-only "$file_path" 2>/dev/null; then
+            if timed_stage parse_check $CMDRUN --parse-tree-only "$file_path" 2>/dev/null; then
                 echo "Successfully generated valid C code on attempt $attempt"
                 success=true
             else
@@ -1116,6 +1458,121 @@ attempt_multi_file_conversion() {
     return $([ "$success" = true ] && echo 0 || echo 1)
 }
 
+# Translate one module into MODULE.h and MODULE.c (or only MODULE.c against
+# an existing header) with the headers of its imports as read-only context
+attempt_module_conversion() {
+    local module=$1
+    local py_file=$2
+    local status=$3
+    local imports=$4
+    local is_main=$5
+    local max_attempts=3
+    local attempt=1
+    local prompt="$TEMP_DIR/module_prompt_$module.txt"
+    local context=(--read "$py_file")
+    local edit=("$module.c")
+    local cmdrun="$ESBMC_EXECUTABLE"
+    local dep error_output
+
+    [[ "$cmdrun" == ./* ]] && cmdrun="$OLD_PWD/${cmdrun#./}"
+    [ "$USE_DOCKER" = true ] && cmdrun="esbmc_docker"
+    for dep in ${imports//,/ }; do
+        context+=(--read "$dep.h")
+    done
+    if [ "$status" = "body" ]; then
+        context+=(--read "$module.h")
+    else
+        edit=("$module.h" "$module.c")
+    fi
+
+    {
+        echo "Convert the Python module '$module' ($(basename "$py_file")) into a C translation unit that can be verified by ESBMC."
+        if [ "$status" = "body" ]; then
+            echo "$module.h is fixed: do NOT change it. Write $module.c, implementing everything it declares;"
+            echo "$module.c must #include \"$module.h\"."
+        else
+            echo "Write two files:"
+            echo "- $module.h: the module's interface, with an include guard, declaring every top-level"
+            echo "  function, class (as struct types plus functions) and global variable (extern)"
+            echo "- $module.c: the definitions; it must #include \"$module.h\""
+        fi
+        if [ -n "$imports" ]; then
+            echo "The module imports: ${imports//,/, }. Use them ONLY through their headers"
+            echo "(#include \"<name>.h\"), which are provided read-only; never redefine what they declare."
+        fi
+        if [ "$is_main" = true ]; then
+            echo "This is the program entry point: $module.c must define int main() running the module's top-level code."
+        else
+            echo "This is a library module: do NOT define main(). Give file-local helpers the static"
+            echo "keyword and a '${module}_' prefix, since all units are linked into one file."
+        fi
+        echo "CRITICAL: NEVER define ESBMC-specific functions like __ESBMC_assume or __ESBMC_assert,"
+        echo "and do not include ESBMC internal headers."
+        if [ "$FORCE_CONVERT" = true ]; then
+            echo "IMPORTANT: Implement ALL functions with complete, reasonable implementations."
+        fi
+        cat "$SOURCE_INSTRUCTION_FILE" 2>/dev/null
+    } > "$prompt"
+
+    while [ $attempt -le $max_attempts ]; do
+        echo "Translating module $module ($status), attempt $attempt of $max_attempts..."
+        run_aider --no-git --no-show-model-warnings --model "$LLM_MODEL" --yes \
+            --message-file "$prompt" "${context[@]}" "${edit[@]}"
+
+        error_output=$(timed_stage parse_check $cmdrun --parse-tree-only "$module.c" 2>&1)
+        if [ $? -eq 0 ]; then
+            echo "Module $module translated on attempt $attempt"
+            rm -f "$prompt"
+            return 0
+        fi
+        echo "ESBMC parse tree check failed for $module.c on attempt $attempt"
+        {
+            echo ""
+            echo "=== PREVIOUS ATTEMPT ERROR ==="
+            echo "$module.c failed to parse with these errors; fix them:"
+            echo "$error_output" | tail -n 40
+        } >> "$prompt"
+        ((attempt++))
+    done
+    rm -f "$prompt"
+    return 1
+}
+
+# Incremental --multi-file translation: one unit per module, reusing cached
+# units whose source and imported interfaces did not change, linked into
+# combined.c in import order
+translate_modules_incrementally() {
+    local plan_file="$TEMP_DIR/module_plan.tsv"
+    local plan_args=(--main "$TEMP_DIR/$MAIN_FILE" --prompt "$SOURCE_INSTRUCTION_FILE"
+        --value "model=$LLM_MODEL" --value "force-convert=$FORCE_CONVERT")
+    local order=()
+    local status module py_file header_key body_key imports is_main
+
+    [ "$USE_CACHE" = true ] || plan_args+=(--no-cache)
+    python3 "$OLD_PWD/scripts/multi_module.py" plan "${plan_args[@]}" "${FILE_PATHS[@]}" > "$plan_file" || return 1
+
+    while IFS=$'\t' read -r status module py_file header_key body_key imports; do
+        order+=("$module")
+        if [ "$status" = "cached" ]; then
+            echo "Module $module unchanged, reusing cached translation (key ${body_key:0:12})"
+            continue
+        fi
+        is_main=false
+        [ "$module.py" = "$MAIN_FILE" ] && is_main=true
+        attempt_module_conversion "$module" "$py_file" "$status" "$imports" "$is_main" || {
+            echo "Failed to translate module $module"
+            return 1
+        }
+        if [ "$USE_CACHE" = true ]; then
+            python3 "$OLD_PWD/scripts/multi_module.py" store \
+                --header-key "$header_key" --body-key "$body_key" "$module" \
+                || echo "Warning: failed to store module $module in cache"
+        fi
+    done < "$plan_file"
+
+    python3 "$OLD_PWD/scripts/multi_module.py" link --output combined.c "${order[@]}"
+}
+
 # Check if we're in C file mode
 if [ "$C_FILE_MODE" = true ]; then
     echo "Processing C file directly (no conversion needed)..."
@@ -1179,7 +1636,16 @@ elif [ "$MULTI_FILE_MODE" = true ]; then
     fi
 
     # Convert all Python files to C files first
-    if [ "$USE_LLM" = true ]; then
+    if [ "$USE_LLM" = true ] && [ "$INCREMENTAL" = true ]; then
+        echo "Translating Python modules incrementally..."
+        if translate_modules_incrementally; then
+            TARGET_FILE="combined.c"
+            echo "Linked module translations into $TARGET_FILE"
+        else
+            echo "Failed to convert multiple Python files to C using LLM"
+            exit 1
+        fi
+    elif [ "$USE_LLM" = true ]; then
         echo "Converting all Python files to C using LLM..."
 
         # First, convert the main file
@@ -1255,7 +1721,7 @@ elif [ "$MULTI_FILE_MODE" = true ]; then
 
         # Run shedskin on the main file
         echo "Running shedskin on main file: $MAIN_FILE"
-        shedskin translate "$MAIN_FILE"
+        timed_stage shedskin run_shedskin "$MAIN_FILE"
         SHEDSKIN_EXIT=$?
 
         if [ $SHEDSKIN_EXIT -eq 0 ]; then
@@ -1347,7 +1813,7 @@ else
             fi
         else
             echo "Processing Python file with shedskin..."
-            shedskin translate "$FILENAME"
+            timed_stage shedskin run_shedskin "$FILENAME"
             SHEDSKIN_EXIT=$?
 
             if [ $SHEDSKIN_EXIT -eq 0 ]; then
@@ -1450,7 +1916,35 @@ if [ "$FAST_MODE" = true ]; then
     ESBMC_EXTRA_OPTS="$ESBMC_EXTRA_OPTS --unwind 10 --no-unwinding-assertions"
 fi
 
-ESBMC_CMD="$ESBMC_EXECUTABLE --segfault-handler \
+ESBMC_RUNNER="$ESBMC_EXECUTABLE"
+if [ "$USE_DOCKER" = true ] && [ "$ESBMC_EXECUTABLE" = "esbmc" ]; then
+    ESBMC_RUNNER="esbmc_docker"
+fi
+
+# In portfolio mode the runner replaces --incremental-bmc with each of its
+# configurations and returns the first conclusive result
+if [ "$USE_PORTFOLIO" = true ]; then
+    PORTFOLIO_ESBMC="$ESBMC_EXECUTABLE"
+    [ "$ESBMC_RUNNER" = "esbmc_docker" ] && PORTFOLIO_ESBMC="$ESBMC_CONTAINER_CMD exec -- esbmc"
+    ESBMC_RUNNER="python3 $OLD_PWD/scripts/esbmc_portfolio.py --esbmc \"$PORTFOLIO_ESBMC\""
+    [ -n "$PORTFOLIO_CONFIGS" ] && ESBMC_RUNNER="$ESBMC_RUNNER --configs $PORTFOLIO_CONFIGS"
+    ESBMC_RUNNER="$ESBMC_RUNNER --"
+fi
+
+# Conclusive verdicts are cached by normalized C source, ESBMC version and
+# options (scripts/verdict_cache.py); --no-cache disables it
+if [ "$USE_CACHE" = true ]; then
+    VERDICT_ESBMC="$ESBMC_EXECUTABLE"
+    [[ "$VERDICT_ESBMC" == ./* ]] && VERDICT_ESBMC="$OLD_PWD/${VERDICT_ESBMC#./}"
+    if [ "$ESBMC_RUNNER" = "esbmc_docker" ]; then
+        ESBMC_RUNNER="$ESBMC_CONTAINER_CMD exec -- esbmc"
+        VERDICT_ESBMC="$ESBMC_RUNNER"
+    fi
+    [ "$USE_PORTFOLIO" = true ] && VERDICT_ESBMC="$PORTFOLIO_ESBMC"
+    ESBMC_RUNNER="python3 $OLD_PWD/scripts/verdict_cache.py run --esbmc \"$VERDICT_ESBMC\" -- $ESBMC_RUNNER"
+fi
+
+ESBMC_CMD="$ESBMC_RUNNER --segfault-handler \
     -I/usr/include -I/usr/local/include -I. $ESBMC_EXTRA \
     $TARGET_FILE --incremental-bmc --no-bounds-check --no-pointer-check --no-align-check --add-symex-value-sets $THREAD_OPTIONS"
 
@@ -1469,33 +1963,102 @@ run_esbmc_for_function() {
     echo "$current_cmd"
     echo "----------------------------------------"
 
+    local span_start=$(now_seconds)
     eval "$current_cmd" 2>&1 | tee "$current_output_file"
     local exit_code=${PIPESTATUS[0]}
+    metrics_esbmc_span "$span_start" $exit_code "$current_output_file" "function=$function_name"
 
     # If verification failed and explanation was requested, explain the violation
-    if [ $exit_code -ne 0 ] && [ "$EXPLAIN_VIOLATION" = true ]; then
+    if [ $exit_code -ne 0 ] && { [ "$EXPLAIN_VIOLATION" = true ] || [ "$REPLAY_CEX" = true ]; }; then
         echo -e "\nAnalyzing verification failure for function: $function_name..."
-        explain_violation "$FILENAME" "$TARGET_FILE" "$(cat $current_output_file)"
+        report_violation "$current_output_file"
     fi
 
     rm "$current_output_file"
     return $exit_code
 }
 
+# Run ESBMC for several functions with at most $JOBS concurrent workers.
+# Each worker writes its output and exit code to its own files; results are
+# reported in the order the functions were given once every worker finished,
+# so the combined output and exit status do not depend on scheduling.
+run_esbmc_for_functions_parallel() {
+    local results_dir="$TEMP_DIR/function_results"
+    local functions=("$@")
+    local failed=()
+    local exit_status=0
+    local i
+
+    rm -rf "$results_dir"
+    mkdir -p "$results_dir"
+
+    echo "Verifying ${#functions[@]} functions with up to $JOBS parallel jobs..."
+    for i in "${!functions[@]}"; do
+        while [ "$(jobs -rp | wc -l)" -ge "$JOBS" ]; do
+            sleep 0.2
+        done
+        (
+            span_start=$(now_seconds)
+            eval "$ESBMC_CMD $ESBMC_EXTRA_OPTS --function ${functions[$i]}" > "$results_dir/$i.out" 2>&1
+            code=$?
+            echo $code > "$results_dir/$i.rc"
+            metrics_esbmc_span "$span_start" $code "$results_dir/$i.out" "function=${functions[$i]}"
+        ) &
+    done
+    wait
+
+    for i in "${!functions[@]}"; do
+        local func="${functions[$i]}"
+        local code=1
+        [ -s "$results_dir/$i.rc" ] && code=$(cat "$results_dir/$i.rc")
+
+        echo "----------------------------------------"
+        echo "Testing function: $func"
+        echo "ESBMC command to be executed:"
+        echo "$ESBMC_CMD $ESBMC_EXTRA_OPTS --function $func"
+        echo "----------------------------------------"
+        cat "$results_dir/$i.out" 2>/dev/null
+        echo "Function $func: exit code $code"
+
+        if [ "$code" -ne 0 ]; then
+            exit_status=1
+            failed+=("$i")
+        fi
+    done
+
+    if [ "$EXPLAIN_VIOLATION" = true ] || [ "$REPLAY_CEX" = true ]; then
+        for i in "${failed[@]}"; do
+            echo -e "\nAnalyzing verification failure for function: ${functions[$i]}..."
+            report_violation "$results_dir/$i.out"
+        done
+    fi
+
+    return $exit_status
+}
+
 # Variable to track overall exit status
 OVERALL_EXIT=0
 
 if [ "$USE_ANALYSIS" = true ]; then
     echo "Running ESBMC for multiple functions..."
     if [ ! -z "$ANALYZED_FUNCTIONS" ]; then
+        FUNCTIONS_TO_VERIFY=()
         for func in $(echo "$ANALYZED_FUNCTIONS" | tr ',' ' '); do
             if [[ $func =~ ^[a-zA-Z0-9_]+$ ]]; then
+                FUNCTIONS_TO_VERIFY+=("$func")
+            fi
+        done
+
+        if [ "$JOBS" -gt 1 ] && [ ${#FUNCTIONS_TO_VERIFY[@]} -gt 1 ]; then
+            run_esbmc_for_functions_parallel "${FUNCTIONS_TO_VERIFY[@]}" || OVERALL_EXIT=1
+        else
+            for func in "${FUNCTIONS_TO_VERIFY[@]}"; do
                 run_esbmc_for_function "$func"
                 if [ $? -ne 0 ]; then
                     OVERALL_EXIT=1
                 fi
-            fi
-        done
+            done
+        fi
     fi
 elif [ "$TEST_FUNCTION" = true ]; then
     # Single function test mode
@@ -1534,13 +2097,15 @@ else
         head -5 "$TARGET_FILE" >&2
     fi
     
+    SPAN_START=$(now_seconds)
     eval "$ESBMC_CMD" 2>&1 | tee "$ESBMC_OUTPUT_FILE"
     OVERALL_EXIT=${PIPESTATUS[0]}
+    metrics_esbmc_span "$SPAN_START" $OVERALL_EXIT "$ESBMC_OUTPUT_FILE"
     echo "ESBMC final exit code: $OVERALL_EXIT" >&2
 
-    if [ $OVERALL_EXIT -ne 0 ] && [ "$EXPLAIN_VIOLATION" = true ]; then
+    if [ $OVERALL_EXIT -ne 0 ] && { [ "$EXPLAIN_VIOLATION" = true ] || [ "$REPLAY_CEX" = true ]; }; then
         echo -e "\nAnalyzing verification failure..."
-        explain_violation "$FILENAME" "$TARGET_FILE" "$(cat $ESBMC_OUTPUT_FILE)"
+        report_violation "$ESBMC_OUTPUT_FILE"
     fi
 
     rm "$ESBMC_OUTPUT_FILE"
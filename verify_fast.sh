@@ -51,9 +51,12 @@ OLD_PWD=$(pwd)
 cp "$FULLPATH" "$TEMP_DIR/${FILENAME}.py"
 [ -f "esbmc.py" ] && cp "esbmc.py" "$TEMP_DIR/"
 if [ -f "builtin.hpp" ]; then
-   for file in *.hpp; do
-       cp "$file" "$TEMP_DIR/${file}"
-   done
+   # One bundled builtin.hpp (scripts/runtime_bundle.py), or the headers one by one
+   if ! python3 scripts/runtime_bundle.py install "$TEMP_DIR" > /dev/null 2>&1; then
+       for file in *.hpp; do
+           cp "$file" "$TEMP_DIR/${file}"
+       done
+   fi
 fi
 
 cd "$TEMP_DIR"
@@ -63,8 +66,13 @@ cd "$TEMP_DIR"
 
 # Run shedskin
 echo "Running shedskin on ${FILENAME}.py..."
-shedskin translate "${FILENAME}.py"
-SHEDSKIN_EXIT=$?
+# Prefer the resident shedskin server; it exits with 75 when it is not running
+SHEDSKIN_EXIT=75
+[ -f "$OLD_PWD/scripts/shedskin_server.py" ] && { python3 "$OLD_PWD/scripts/shedskin_server.py" translate "${FILENAME}.py"; SHEDSKIN_EXIT=$?; }
+if [ $SHEDSKIN_EXIT -eq 75 ]; then
+    shedskin translate "${FILENAME}.py"
+    SHEDSKIN_EXIT=$?
+fi
 [ $SHEDSKIN_EXIT -ne 0 ] && echo "Warning: shedskin compilation had errors (exit code $SHEDSKIN_EXIT)"
 
 # Run ESBMC if cpp file exists
@@ -80,13 +88,12 @@ if [ -f "${FILENAME}.cpp" ]; then
                "${FILENAME}.cpp" --incremental-bmc --no-pointer-check --no-align-check --add-symex-value-sets
            docker exec "$CONTAINER_ID" rm -rf /workspace/*
        else
-           docker run --rm \
-               -v "$(pwd)":/workspace \
-               -w /workspace \
-               "$DOCKER_IMAGE" \
+           # Reuse a persistent worker container instead of docker run --rm
+           python3 "$OLD_PWD/scripts/esbmc_container.py" --image "$DOCKER_IMAGE" exec -- \
                esbmc --std c++17 --segfault-handler \
                -I/usr/include -I/usr/local/include -I. \
                "${FILENAME}.cpp" --incremental-bmc --no-pointer-check --no-align-check --add-symex-value-sets
+           ESBMC_EXIT=$?
        fi
    else
        GCC_LIB_PATH=$(dirname $(gcc -print-libgcc-file-name))